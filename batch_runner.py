@@ -0,0 +1,208 @@
+"""Chạy giải thuật tìm chu trình Hamilton hàng loạt trên các file đồ thị JSON, không cần giao diện.
+
+Ví dụ:
+    python batch_runner.py thu_muc_do_thi/ --algorithm branch_and_bound --workers 8 --timeout 30 -o ket_qua.jsonl
+
+Mỗi file cho một dòng JSON (JSON Lines) ngay khi giải xong:
+    {"file": ..., "algorithm": ..., "success": ..., "cycle": [...], "nodes": ..., "time": ..., "stats": {...}}
+"stats" là SearchStats.as_dict(): số nút, số lần quay lui, số lần cắt nhánh theo lý do,
+độ sâu lớn nhất, thời gian từng giai đoạn và số nút/giây.
+
+--order / --seed / --restart-nodes chọn thứ tự thử đỉnh của backtracking (xem
+hamiltonian_cycle_with_steps), ví dụ --order most_constrained.
+
+--profile đo mỗi file bằng cProfile và tracemalloc (nhập file, giải thuật, ghi kết quả)
+và lưu báo cáo cạnh file đồ thị: <tên file>.<giải thuật>.profile.txt (kèm file .prof).
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+
+from graph import Graph, import_topology
+from graph_file import GRAPH_SUFFIXES
+from graph_algorithms import (
+    hamiltonian_cycle_with_steps, hamiltonian_cycle_branch_and_bound,
+    hamiltonian_cycle_brute_force, hamiltonian_cycle_dp, BACKTRACK_ORDERS
+)
+from search_control import SearchControl
+from run_profiler import RunProfiler, phase, report_path
+
+ALGORITHMS = {
+    "backtracking": hamiltonian_cycle_with_steps,
+    "branch_and_bound": hamiltonian_cycle_branch_and_bound,
+    "brute_force": hamiltonian_cycle_brute_force,
+    "dp": hamiltonian_cycle_dp,
+}
+
+
+def solve_file(file_path, algorithm="branch_and_bound", start_vertex=None, timeout=None, profile=False,
+               options=None):
+    """Giải một file đồ thị, trả về dict kết quả có thể ghi ra JSON
+
+    profile=True: đo bằng RunProfiler và lưu báo cáo cạnh file đồ thị (record["profile"])
+    options: tham số thêm cho giải thuật (order, seed, restart_nodes của backtracking)
+    """
+    record = {"file": str(file_path), "algorithm": algorithm}
+    if options:
+        record["options"] = options
+    profiler = RunProfiler() if profile else None
+    if profiler is not None:
+        profiler.start()
+    started = time.perf_counter()
+    try:
+        with phase(profiler, "Nhập file"):
+            graph = Graph()
+            import_topology(graph, file_path)
+        control = SearchControl(timeout=timeout) if timeout else None
+        with phase(profiler, "Giải thuật"):
+            result = ALGORITHMS[algorithm](graph, start_vertex=start_vertex, trace="off", control=control,
+                                           **(options or {}))
+    except Exception as e:
+        # Lỗi của một file (file hỏng, giải thuật lỗi...) chỉ làm hỏng bản ghi của file đó
+        if profiler is not None:
+            profiler.stop()
+        return failed_record(file_path, algorithm, e, time.perf_counter() - started, record)
+
+    with phase(profiler, "Ghi kết quả"):
+        record.update({
+            "vertices": len(graph.vertices),
+            "edges": len(graph.edges),
+            "success": result['success'],
+            "cycle": result['path'],
+            "nodes": result['nodes'],
+            "time": time.perf_counter() - started,
+        })
+        if result.get('cancelled'):
+            record["cancelled"] = result['cancelled']
+        if result.get('prunes'):
+            record["prunes"] = result['prunes']
+        if 'restarts' in result:
+            record["restarts"] = result['restarts']
+        record["stats"] = result['stats'].as_dict()
+    if profiler is not None:
+        profiler.stop()
+        try:
+            record["profile"] = str(profiler.save(report_path(file_path, algorithm), f"{file_path} - {algorithm}"))
+        except OSError as e:
+            record["profile_error"] = str(e)
+    return record
+
+
+def failed_record(file_path, algorithm, error, elapsed=0.0, record=None):
+    """Bản ghi của file không giải được, có trường "error" mô tả lỗi"""
+    record = record if record is not None else {"file": str(file_path), "algorithm": algorithm}
+    if isinstance(error, (OSError, ValueError, KeyError, TypeError)):
+        message = str(error)
+    else:
+        message = f"{type(error).__name__}: {error}"
+    record.update({"success": False, "cycle": None, "nodes": 0, "time": elapsed, "error": message})
+    return record
+
+
+def collect_files(paths, pattern=None):
+    """Danh sách file từ các đường dẫn (thư mục được duyệt theo pattern, sắp xếp theo tên)
+
+    pattern=None: mọi file đồ thị có đuôi trong GRAPH_SUFFIXES (.json, .hgb)
+    """
+    files = []
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.is_dir():
+            found = path.rglob(pattern or "*")
+            files.extend(sorted(p for p in found if p.is_file()
+                                and (pattern or p.suffix.lower() in GRAPH_SUFFIXES)))
+        else:
+            files.append(path)
+    return files
+
+
+def run_batch(files, algorithm="branch_and_bound", start_vertex=None, timeout=None, workers=None, profile=False,
+              options=None):
+    """Giải nhiều file, sinh kết quả theo thứ tự hoàn thành.
+
+    workers=1 chạy tuần tự trong tiến trình hiện tại; ngược lại dùng ProcessPoolExecutor
+    với số công việc đang chờ giới hạn để bộ nhớ không tăng theo số file. Lỗi của một
+    file (kể cả tiến trình con bị dừng đột ngột) cho một bản ghi "error", không dừng cả lượt.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for file_path in files:
+            yield solve_file(file_path, algorithm, start_vertex, timeout, profile, options)
+        return
+
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # future -> file đang giải, để ghi được bản ghi lỗi khi future.result() ném lỗi
+        pending = {}
+
+        def submit(file_path):
+            try:
+                pending[pool.submit(solve_file, file_path, algorithm, start_vertex, timeout, profile, options)] = file_path
+            except Exception as e:
+                return failed_record(file_path, algorithm, e)
+            return None
+
+        for file_path in files:
+            record = submit(file_path)
+            if record is not None:
+                yield record
+            if len(pending) >= workers * 4:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield failed_record(file_path, algorithm, e)
+                file_path = next(files, None)
+                if file_path is not None:
+                    record = submit(file_path)
+                    if record is not None:
+                        yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tìm chu trình Hamilton hàng loạt trên các file đồ thị JSON")
+    parser.add_argument("paths", nargs="+", help="file đồ thị (.json, .hgb) hoặc thư mục chứa các file đồ thị")
+    parser.add_argument("-a", "--algorithm", choices=sorted(ALGORITHMS), default="branch_and_bound")
+    parser.add_argument("-s", "--start", default=None, help="đỉnh bắt đầu (mặc định: đỉnh đầu tiên)")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="giới hạn thời gian mỗi file (giây)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="số tiến trình (mặc định: số lõi CPU)")
+    parser.add_argument("-p", "--pattern", default=None,
+                        help="mẫu tên file khi duyệt thư mục (mặc định: mọi file .json và .hgb)")
+    parser.add_argument("-o", "--output", default=None, help="file JSON Lines kết quả (mặc định: stdout)")
+    parser.add_argument("--profile", action="store_true",
+                        help="đo bằng cProfile + tracemalloc, lưu báo cáo cạnh từng file đồ thị")
+    parser.add_argument("--order", choices=BACKTRACK_ORDERS, default=None,
+                        help="thứ tự thử đỉnh kề của backtracking (mặc định: theo thứ tự đỉnh)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="hạt giống ngẫu nhiên của backtracking: thử các đỉnh ngang hạng theo thứ tự ngẫu nhiên")
+    parser.add_argument("--restart-nodes", type=int, default=None,
+                        help="backtracking khởi động lại với thứ tự ngẫu nhiên mới sau số nút này (gấp đôi mỗi lần)")
+    args = parser.parse_args(argv)
+
+    options = {name: value for name, value in (("order", args.order), ("seed", args.seed),
+                                               ("restart_nodes", args.restart_nodes)) if value is not None}
+    if options and args.algorithm != "backtracking":
+        parser.error("--order, --seed, --restart-nodes chỉ dùng với --algorithm backtracking")
+
+    files = collect_files(args.paths, args.pattern)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in run_batch(files, args.algorithm, args.start, args.timeout, args.workers, args.profile, options):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
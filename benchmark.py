@@ -0,0 +1,303 @@
+"""Đo hiệu năng các giải thuật tìm chu trình Hamilton trên các họ đồ thị chuẩn, không cần giao diện.
+
+Ví dụ:
+    python benchmark.py -o ket_qua.json
+    python benchmark.py --family petersen --family hypercube -a branch_and_bound --repeat 3
+    python benchmark.py --compare cu.json moi.json --threshold 0.2
+    python benchmark.py -a backtracking --order most_constrained -o rang_buoc.json
+
+Kết quả là một file JSON {"format": "hamilton-benchmark", ..., "results": [...]}, mỗi
+phần tử ứng với một cặp (đồ thị, giải thuật): thời gian (giây, nhỏ nhất qua các lần
+lặp), số nút tìm kiếm, số bước được ghi, số lần quay lui, độ sâu lớn nhất, số lần cắt
+nhánh theo từng luật, bộ nhớ đỉnh (byte, đo bằng tracemalloc ở một lần chạy riêng). Chế độ --compare so sánh hai file kết quả và trả về mã lỗi 1 nếu có
+hồi quy (chậm hơn / tốn bộ nhớ hơn quá ngưỡng, số nút tăng, hoặc kết luận thay đổi).
+--order / --seed / --restart-nodes áp dụng cho backtracking và được ghi vào "options"
+của báo cáo; so sánh hai lần chạy với thứ tự khác nhau bằng --compare.
+"""
+from functools import partial
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from graph import Graph, generate_random_graph
+from graph_algorithms import (
+    hamiltonian_cycle_with_steps, hamiltonian_cycle_branch_and_bound,
+    hamiltonian_cycle_brute_force, hamiltonian_cycle_dp, BACKTRACK_ORDERS
+)
+from search_control import SearchControl
+
+BENCHMARK_FORMAT = "hamilton-benchmark"
+BENCHMARK_VERSION = 1
+
+ALGORITHMS = {
+    "backtracking": hamiltonian_cycle_with_steps,
+    "branch_and_bound": hamiltonian_cycle_branch_and_bound,
+    "brute_force": hamiltonian_cycle_brute_force,
+    "dp": hamiltonian_cycle_dp,
+}
+
+# Số đỉnh tối đa cho từng giải thuật (lớn hơn thì bỏ qua vì chắc chắn hết thời gian)
+MAX_VERTICES = {
+    "brute_force": 10,
+    "dp": 20,
+}
+
+
+def gnp_graph(n, p, seed):
+    """Đồ thị ngẫu nhiên G(n, p) của generate_random_graph, cố định theo seed"""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        graph = Graph()
+        generate_random_graph(graph, num_vertices=n, edge_probability=p)
+    finally:
+        random.setstate(state)
+    return graph
+
+
+def generalized_petersen(n, k):
+    """Đồ thị Petersen tổng quát GP(n, k): vòng ngoài u0..u(n-1), nan hoa ui-vi, vòng sao vi-v(i+k)"""
+    vertices = [(f"u{i}", None) for i in range(n)] + [(f"v{i}", None) for i in range(n)]
+    edges = []
+    for i in range(n):
+        edges.append((f"u{i}", f"u{(i + 1) % n}"))
+        edges.append((f"u{i}", f"v{i}"))
+        edges.append((f"v{i}", f"v{(i + k) % n}"))
+    graph = Graph()
+    graph.load(vertices, edges)
+    return graph
+
+
+def hypercube(d):
+    """Siêu khối d chiều: 2^d đỉnh (chuỗi nhị phân), hai đỉnh kề nhau nếu khác đúng một bit"""
+    names = [format(i, f"0{d}b") for i in range(1 << d)]
+    edges = [(names[i], names[i ^ (1 << b)]) for i in range(1 << d) for b in range(d) if i < i ^ (1 << b)]
+    graph = Graph()
+    graph.load([(name, None) for name in names], edges)
+    return graph
+
+
+def grid(rows, cols):
+    """Lưới rows x cols; không có chu trình Hamilton khi rows * cols lẻ"""
+    def name(r, c):
+        return f"{r}_{c}"
+    vertices = [(name(r, c), None) for r in range(rows) for c in range(cols)]
+    edges = [(name(r, c), name(r, c + 1)) for r in range(rows) for c in range(cols - 1)]
+    edges += [(name(r, c), name(r + 1, c)) for r in range(rows - 1) for c in range(cols)]
+    graph = Graph()
+    graph.load(vertices, edges)
+    return graph
+
+
+# Bộ đồ thị mặc định: (tên, họ, hàm dựng, tham số). GP(n, 2) với n ≡ 5 (mod 6) là các
+# đồ thị 3-chính quy không có chu trình Hamilton (Petersen là GP(5, 2)): giải thuật phải
+# duyệt hết cây tìm kiếm mới kết luận được.
+SUITE = [
+    ("gnp-8", "gnp", gnp_graph, (8, 0.5, 1)),
+    ("gnp-12", "gnp", gnp_graph, (12, 0.4, 1)),
+    ("gnp-16", "gnp", gnp_graph, (16, 0.3, 2)),
+    ("gnp-20", "gnp", gnp_graph, (20, 0.3, 1)),
+    ("petersen", "petersen", generalized_petersen, (5, 2)),
+    ("hypercube-3", "hypercube", hypercube, (3,)),
+    ("hypercube-4", "hypercube", hypercube, (4,)),
+    ("hypercube-5", "hypercube", hypercube, (5,)),
+    ("grid-4x4", "grid", grid, (4, 4)),
+    ("grid-5x5", "grid", grid, (5, 5)),
+    ("grid-6x6", "grid", grid, (6, 6)),
+    ("gp-8-3", "generalized_petersen", generalized_petersen, (8, 3)),
+    ("gp-10-3", "generalized_petersen", generalized_petersen, (10, 3)),
+    ("gp-11-2", "cubic_non_hamiltonian", generalized_petersen, (11, 2)),
+    ("gp-17-2", "cubic_non_hamiltonian", generalized_petersen, (17, 2)),
+    ("gp-23-2", "cubic_non_hamiltonian", generalized_petersen, (23, 2)),
+]
+
+
+def run_case(graph, algorithm, timeout=None, repeat=1, measure_memory=True, options=None):
+    """Chạy một giải thuật trên một đồ thị, trả về dict số liệu có thể ghi ra JSON
+
+    options: tham số thêm cho giải thuật (order, seed, restart_nodes của backtracking)
+    """
+    solver = ALGORITHMS[algorithm]
+    if options:
+        solver = partial(solver, **options)
+    best = None
+    for _ in range(max(1, repeat)):
+        control = SearchControl(timeout=timeout)
+        started = time.perf_counter()
+        result = solver(graph, trace="counters", control=control)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+        if result.get('cancelled'):
+            break
+
+    record = {
+        "success": result['success'],
+        "nodes": result['nodes'],
+        "steps": result['total_steps'],
+        "time": best,
+        "backtracks": result['stats'].backtracks,
+        "max_depth": result['stats'].max_depth,
+        "prunes": result['stats'].prunes,
+    }
+    if 'restarts' in result:
+        record["restarts"] = result['restarts']
+    if result.get('cancelled'):
+        record["cancelled"] = result['cancelled']
+    elif measure_memory:
+        # Lần chạy riêng: tracemalloc làm chậm giải thuật nên không dùng để đo thời gian
+        tracemalloc.start()
+        try:
+            solver(graph, trace="counters", control=SearchControl(timeout=timeout))
+            record["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def run_suite(families=None, algorithms=None, timeout=10.0, repeat=3, measure_memory=True, progress=None,
+              options=None):
+    """Chạy bộ đồ thị SUITE (lọc theo họ) với các giải thuật, sinh từng bản ghi kết quả
+
+    options: tham số thêm cho backtracking (order, seed, restart_nodes)
+    """
+    algorithms = algorithms or list(ALGORITHMS)
+    for name, family, build, args in SUITE:
+        if families and family not in families:
+            continue
+        graph = build(*args)
+        n = len(graph.vertices)
+        for algorithm in algorithms:
+            record = {"case": name, "family": family, "vertices": n, "edges": len(graph.edges),
+                      "algorithm": algorithm}
+            if n > MAX_VERTICES.get(algorithm, n):
+                record["skipped"] = f"quá {MAX_VERTICES[algorithm]} đỉnh"
+            else:
+                record.update(run_case(graph, algorithm, timeout, repeat, measure_memory,
+                                       options if algorithm == "backtracking" else None))
+            if progress is not None:
+                progress(record)
+            yield record
+
+
+def compare(base, new, threshold=0.25, min_time=0.005, min_memory=65536):
+    """So sánh hai kết quả benchmark; trả về danh sách (mức, cặp, mô tả).
+
+    Mức "regression": kết luận thay đổi, số nút tăng, thời gian hoặc bộ nhớ tăng quá
+    threshold (tỉ lệ; bỏ qua chênh lệch dưới min_time giây / min_memory byte), hoặc hết thời
+    gian ở lần mới. Mức "improvement": giảm tương ứng. Các cặp chỉ có ở một bên được
+    ghi với mức "missing" / "new".
+    """
+    def key(record):
+        return record["case"], record["algorithm"]
+
+    base_records = {key(r): r for r in base["results"] if "skipped" not in r}
+    new_records = {key(r): r for r in new["results"] if "skipped" not in r}
+    findings = []
+    for pair, old in base_records.items():
+        label = f"{pair[0]} / {pair[1]}"
+        cur = new_records.get(pair)
+        if cur is None:
+            findings.append(("missing", label, "không có trong kết quả mới"))
+            continue
+        if "cancelled" in cur and "cancelled" not in old:
+            findings.append(("regression", label, f"hết thời gian (trước: {old['time']:.4f} s)"))
+            continue
+        if "cancelled" in old and "cancelled" not in cur:
+            findings.append(("improvement", label, f"không còn hết thời gian ({cur['time']:.4f} s)"))
+            continue
+        if "cancelled" in old:
+            continue
+        if old["success"] != cur["success"]:
+            findings.append(("regression", label, f"kết luận thay đổi: {old['success']} → {cur['success']}"))
+        if cur["nodes"] != old["nodes"]:
+            level = "regression" if cur["nodes"] > old["nodes"] else "improvement"
+            findings.append((level, label, f"số nút {old['nodes']} → {cur['nodes']}"))
+        if abs(cur["time"] - old["time"]) >= min_time:
+            ratio = cur["time"] / old["time"] if old["time"] else float("inf")
+            if ratio > 1 + threshold:
+                findings.append(("regression", label, f"thời gian {old['time']:.4f} → {cur['time']:.4f} s (x{ratio:.2f})"))
+            elif ratio < 1 / (1 + threshold):
+                findings.append(("improvement", label, f"thời gian {old['time']:.4f} → {cur['time']:.4f} s (x{ratio:.2f})"))
+        if ("peak_memory" in old and "peak_memory" in cur and old["peak_memory"]
+                and cur["peak_memory"] - old["peak_memory"] >= min_memory):
+            ratio = cur["peak_memory"] / old["peak_memory"]
+            if ratio > 1 + threshold:
+                findings.append(("regression", label, f"bộ nhớ đỉnh {old['peak_memory']} → {cur['peak_memory']} byte (x{ratio:.2f})"))
+    for pair in new_records.keys() - base_records.keys():
+        findings.append(("new", f"{pair[0]} / {pair[1]}", "chỉ có trong kết quả mới"))
+    return findings
+
+
+def format_record(record):
+    label = f"{record['case']:<12} {record['algorithm']:<17}"
+    if "skipped" in record:
+        return f"{label} bỏ qua ({record['skipped']})"
+    status = record.get("cancelled") or ("có chu trình" if record["success"] else "không có chu trình")
+    memory = f"{record['peak_memory'] / 1024:9.1f} KiB" if "peak_memory" in record else " " * 13
+    return f"{label} {record['time']:9.4f} s {record['nodes']:>10} nút {record['steps']:>10} bước {memory}  {status}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo hiệu năng các giải thuật tìm chu trình Hamilton")
+    parser.add_argument("-a", "--algorithm", action="append", choices=sorted(ALGORITHMS),
+                        help="giải thuật cần đo (lặp lại để chọn nhiều; mặc định: tất cả)")
+    parser.add_argument("-f", "--family", action="append", choices=sorted({family for _, family, _, _ in SUITE}),
+                        help="họ đồ thị cần đo (lặp lại để chọn nhiều; mặc định: tất cả)")
+    parser.add_argument("-t", "--timeout", type=float, default=10.0, help="giới hạn thời gian mỗi lần chạy (giây)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="số lần chạy, lấy thời gian nhỏ nhất")
+    parser.add_argument("--no-memory", action="store_true", help="không đo bộ nhớ đỉnh (bỏ lần chạy với tracemalloc)")
+    parser.add_argument("-o", "--output", default=None, help="file JSON kết quả (mặc định: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("CU", "MOI"), help="so sánh hai file kết quả")
+    parser.add_argument("--threshold", type=float, default=0.25, help="ngưỡng hồi quy thời gian / bộ nhớ (tỉ lệ)")
+    parser.add_argument("--order", choices=BACKTRACK_ORDERS, default=None,
+                        help="thứ tự thử đỉnh kề của backtracking (mặc định: theo thứ tự đỉnh)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="hạt giống ngẫu nhiên của backtracking: thử các đỉnh ngang hạng theo thứ tự ngẫu nhiên")
+    parser.add_argument("--restart-nodes", type=int, default=None,
+                        help="backtracking khởi động lại với thứ tự ngẫu nhiên mới sau số nút này (gấp đôi mỗi lần)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as f:
+                runs.append(json.load(f))
+        findings = compare(runs[0], runs[1], args.threshold)
+        for level, label, message in findings:
+            print(f"{level:<12} {label}: {message}")
+        regressions = sum(1 for level, _, _ in findings if level == "regression")
+        print(f"{regressions} hồi quy, {len(findings) - regressions} thay đổi khác")
+        return 1 if regressions else 0
+
+    options = {name: value for name, value in (("order", args.order), ("seed", args.seed),
+                                               ("restart_nodes", args.restart_nodes)) if value is not None}
+    results = list(run_suite(args.family, args.algorithm, args.timeout, args.repeat, not args.no_memory,
+                             progress=lambda record: print(format_record(record), file=sys.stderr),
+                             options=options))
+    report = {
+        "format": BENCHMARK_FORMAT,
+        "version": BENCHMARK_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timeout": args.timeout,
+        "repeat": args.repeat,
+        "options": options,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+class DisjointSet:
+    """Cấu trúc hợp các tập rời nhau (union-find) dùng để theo dõi miền liên thông.
+
+    Gộp theo kích thước và nén đường đi (path halving) nên find / union có chi phí
+    khấu hao O(α(n)) - gần như hằng số. Chỉ hỗ trợ thêm phần tử và gộp tập; khi cần
+    xóa thì dựng lại từ đầu.
+    """
+
+    def __init__(self, items=()):
+        self._parent = {}
+        self._size = {}
+        # Số tập hiện có
+        self.count = 0
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+            self.count += 1
+
+    def find(self, item):
+        """Phần tử đại diện của tập chứa item"""
+        parent = self._parent
+        while parent[item] != item:
+            # Nối item lên ông của nó: đường đi ngắn lại một nửa sau mỗi lần tìm
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Gộp hai tập chứa a và b; trả về False nếu chúng đã cùng một tập"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        size = self._size
+        if size[root_a] < size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        size[root_a] += size[root_b]
+        del size[root_b]
+        self.count -= 1
+        return True
+
+    def connected(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def size_of(self, item):
+        """Số phần tử của tập chứa item"""
+        return self._size[self.find(item)]
+
+    def __contains__(self, item):
+        return item in self._parent
+
+    def __len__(self):
+        return len(self._parent)
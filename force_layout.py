@@ -0,0 +1,230 @@
+import math
+import random
+
+from graph import Point
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy không bắt buộc: không có thì dùng bản thuần Python (cùng giải thuật, chậm hơn)
+    np = None
+
+# Khoảng cách bình phương nhỏ nhất khi tính lực đẩy (tránh chia cho 0 khi hai đỉnh trùng nhau)
+MIN_DISTANCE2 = 0.01
+# Dừng sớm khi không đỉnh nào dịch chuyển quá ngưỡng này (pixel) trong một vòng lặp
+CONVERGED_SHIFT = 0.1
+# Số cặp đỉnh tối đa xử lý cùng lúc trong bản NumPy (giới hạn bộ nhớ tạm)
+PAIR_CHUNK = 1_000_000
+
+
+def force_layout_steps(positions, edges, width=600, height=500, iterations=300, margin=40, seed=None,
+                       use_numpy=None):
+    """Bố cục lực đẩy Fruchterman–Reingold, sinh tọa độ sau mỗi vòng lặp.
+
+    positions: tọa độ ban đầu của từng đỉnh (Point hoặc None - đặt ngẫu nhiên)
+    edges: các cặp chỉ số đỉnh (i, j)
+    Sinh (số vòng đã chạy, [(x, y), ...]) để giao diện cập nhật dần trong lúc hội tụ.
+
+    Đỉnh kề nhau hút nhau với lực d²/k, mọi cặp đỉnh đẩy nhau với lực k²/d, trong đó
+    k = √(diện tích / số đỉnh). Lực đẩy chỉ tính giữa các đỉnh cách nhau dưới 2k, tìm
+    qua lưới ô cạnh 2k (mỗi đỉnh chỉ xét 9 ô quanh nó) nên mỗi vòng lặp tốn khoảng
+    O(V + E) thay vì O(V²) khi các đỉnh phân bố đều. Mỗi vòng một đỉnh dịch chuyển tối
+    đa bằng "nhiệt độ", nhiệt độ giảm tuyến tính về 0 sau iterations vòng.
+    use_numpy: None - dùng NumPy nếu đã cài
+    """
+    n = len(positions)
+    if n == 0:
+        return
+    rng = random.Random(seed)
+    x0, y0 = margin, margin
+    x1, y1 = max(margin, width - margin), max(margin, height - margin)
+    bounds = (x0, y0, x1, y1)
+    k = math.sqrt(max((x1 - x0) * (y1 - y0), 1) / n)
+    start_temperature = max(x1 - x0, y1 - y0, 1) / 10
+
+    # Nhiễu nhỏ để các đỉnh trùng tọa độ có hướng đẩy nhau
+    xs, ys = [], []
+    for pos in positions:
+        if pos is None:
+            xs.append(rng.uniform(x0, x1))
+            ys.append(rng.uniform(y0, y1))
+        else:
+            xs.append(min(max(pos.x + rng.uniform(-0.5, 0.5), x0), x1))
+            ys.append(min(max(pos.y + rng.uniform(-0.5, 0.5), y0), y1))
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        pos = np.column_stack((np.array(xs, dtype=float), np.array(ys, dtype=float)))
+        edge_array = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    for iteration in range(iterations):
+        temperature = start_temperature * (1 - iteration / iterations)
+        if use_numpy:
+            shift = step_numpy(pos, edge_array, k, temperature, bounds)
+            yield iteration + 1, pos.tolist()
+        else:
+            shift = step_python(xs, ys, edges, k, temperature, bounds)
+            yield iteration + 1, list(zip(xs, ys))
+        if shift < CONVERGED_SHIFT:
+            return
+
+
+def step_python(xs, ys, edges, k, temperature, bounds):
+    """Một vòng lặp Fruchterman–Reingold trên danh sách tọa độ; trả về dịch chuyển lớn nhất"""
+    n = len(xs)
+    cell = 2 * k
+    cutoff2 = cell * cell
+    k2 = k * k
+    fx = [0.0] * n
+    fy = [0.0] * n
+
+    grid = {}
+    for i in range(n):
+        key = (int(xs[i] // cell), int(ys[i] // cell))
+        bucket = grid.get(key)
+        if bucket is None:
+            grid[key] = [i]
+        else:
+            bucket.append(i)
+
+    # Lực đẩy giữa các đỉnh trong cùng ô hoặc ô kề
+    for (cx, cy), members in grid.items():
+        near = []
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                bucket = grid.get((cx + ox, cy + oy))
+                if bucket:
+                    near.extend(bucket)
+        for i in members:
+            xi, yi = xs[i], ys[i]
+            sx = sy = 0.0
+            for j in near:
+                dx = xi - xs[j]
+                dy = yi - ys[j]
+                d2 = dx * dx + dy * dy
+                if d2 >= cutoff2 or j == i:
+                    continue
+                f = k2 / max(d2, MIN_DISTANCE2)
+                sx += dx * f
+                sy += dy * f
+            fx[i] = sx
+            fy[i] = sy
+
+    # Lực hút dọc theo cạnh
+    for a, b in edges:
+        dx = xs[a] - xs[b]
+        dy = ys[a] - ys[b]
+        f = math.sqrt(dx * dx + dy * dy) / k
+        fx[a] -= dx * f
+        fy[a] -= dy * f
+        fx[b] += dx * f
+        fy[b] += dy * f
+
+    x0, y0, x1, y1 = bounds
+    shift = 0.0
+    for i in range(n):
+        length = math.hypot(fx[i], fy[i])
+        if length == 0:
+            continue
+        step = min(length, temperature)
+        xs[i] = min(max(xs[i] + fx[i] * step / length, x0), x1)
+        ys[i] = min(max(ys[i] + fy[i] * step / length, y0), y1)
+        if step > shift:
+            shift = step
+    return shift
+
+
+def pair_chunks(counts, budget):
+    """Chia dãy đỉnh thành các đoạn [lo, hi) có tổng số cặp không quá budget (ít nhất một đỉnh)"""
+    cumulative = np.cumsum(counts)
+    n = len(counts)
+    lo = 0
+    while lo < n:
+        base = cumulative[lo - 1] if lo else 0
+        hi = max(int(np.searchsorted(cumulative, base + budget, "right")), lo + 1)
+        yield lo, min(hi, n)
+        lo = hi
+
+
+def step_numpy(pos, edges, k, temperature, bounds):
+    """Một vòng lặp Fruchterman–Reingold trên mảng NumPy pos (n x 2, sửa tại chỗ); trả về dịch chuyển lớn nhất"""
+    n = len(pos)
+    cell = 2 * k
+    cutoff2 = cell * cell
+    force = np.zeros_like(pos)
+
+    # Sắp xếp đỉnh theo ô; các đỉnh của một ô nằm liền nhau trong order
+    cells = np.floor(pos / cell).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    stride = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            near = keys + (ox * stride + oy)
+            start = np.searchsorted(sorted_keys, near, "left")
+            counts = np.searchsorted(sorted_keys, near, "right") - start
+            for lo, hi in pair_chunks(counts, PAIR_CHUNK):
+                chunk = counts[lo:hi]
+                total = int(chunk.sum())
+                if total == 0:
+                    continue
+                # Mọi cặp (i, j) với j thuộc ô lân cận của i
+                i = np.repeat(np.arange(lo, hi), chunk)
+                offset = np.repeat(start[lo:hi] - (np.cumsum(chunk) - chunk), chunk)
+                j = order[offset + np.arange(total)]
+                delta = pos[i] - pos[j]
+                d2 = np.einsum("ij,ij->i", delta, delta)
+                keep = (d2 < cutoff2) & (i != j)
+                i, delta = i[keep], delta[keep]
+                f = (k * k) / np.maximum(d2[keep], MIN_DISTANCE2)
+                force[:, 0] += np.bincount(i, weights=delta[:, 0] * f, minlength=n)
+                force[:, 1] += np.bincount(i, weights=delta[:, 1] * f, minlength=n)
+
+    if len(edges):
+        a, b = edges[:, 0], edges[:, 1]
+        delta = pos[a] - pos[b]
+        pull = delta * (np.sqrt(np.einsum("ij,ij->i", delta, delta)) / k)[:, None]
+        for axis in (0, 1):
+            force[:, axis] -= np.bincount(a, weights=pull[:, axis], minlength=n)
+            force[:, axis] += np.bincount(b, weights=pull[:, axis], minlength=n)
+
+    length = np.hypot(force[:, 0], force[:, 1])
+    step = np.minimum(length, temperature)
+    pos += force * (step / np.maximum(length, 1e-12))[:, None]
+    x0, y0, x1, y1 = bounds
+    np.clip(pos[:, 0], x0, x1, out=pos[:, 0])
+    np.clip(pos[:, 1], y0, y1, out=pos[:, 1])
+    return float(step.max())
+
+
+def layout_input(graph):
+    """(tên đỉnh, tọa độ, cạnh theo chỉ số) của đồ thị để truyền cho force_layout_steps"""
+    names = graph.vertex_names()
+    positions = [pos for _, pos in graph.vertices]
+    edges = [(graph.index_of(u), graph.index_of(v)) for u, v in graph.edges]
+    return names, positions, edges
+
+
+def apply_layout(graph, names, coords):
+    """Gán tọa độ mới (làm tròn) cho các đỉnh còn tồn tại và đặt lại điểm điều khiển các cạnh liên quan"""
+    moved = set()
+    for name, (x, y) in zip(names, coords):
+        if graph.has_vertex(name):
+            graph.set_position(name, Point(round(x), round(y)))
+            moved.add(name)
+    for edge in graph.edges:
+        if edge[0] in moved or edge[1] in moved:
+            graph.create_default_control_point(edge)
+
+
+def format_graph_force(graph, width=600, height=500, iterations=300, seed=None):
+    """Sắp xếp đồ thị theo bố cục lực đẩy (chạy đến khi hội tụ)"""
+    names, positions, edges = layout_input(graph)
+    coords = None
+    for _, coords in force_layout_steps(positions, edges, width, height, iterations, seed=seed):
+        pass
+    if coords is not None:
+        apply_layout(graph, names, coords)
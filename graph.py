@@ -1,44 +1,323 @@
-from collections import deque
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import gc
 import math
 import random
-from PyQt5.QtCore import QPoint, QPointF
-import json
+import hashlib
+
+from disjoint_set import DisjointSet
+from graph_analysis import GraphAnalysis
+
+
+# Tọa độ đỉnh / điểm điều khiển dạng số thuần (không phụ thuộc PyQt5).
+# namedtuple không có __dict__ nên nhẹ và pickle nhanh khi gửi đồ thị sang tiến trình con;
+# GraphArea chuyển sang QPointF khi vẽ và nhận lại Point khi người dùng kéo thả.
+Point = namedtuple("Point", ("x", "y"))
+
+
+def edge_key(name1, name2):
+    """Khóa của cạnh vô hướng: (A, B) và (B, A) cho cùng một khóa"""
+    return frozenset((name1, name2))
+
+
+def default_control_point(pos1, pos2):
+    """Điểm điều khiển mặc định: ở giữa cạnh, lệch lên trên một chút"""
+    return Point((pos1.x + pos2.x) / 2, (pos1.y + pos2.y) / 2 - 30)
+
+
+@contextmanager
+def paused_gc():
+    """Tạm tắt bộ thu gom rác theo chu kỳ khi dựng đồ thị lớn.
+
+    Tạo hàng trăm nghìn tuple / set liên tiếp khiến bộ thu gom chạy lặp lại vô ích
+    (các đối tượng này không tạo chu trình tham chiếu).
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def build_structures(vertices, edges):
+    """Kiểm tra và dựng các cấu trúc của Graph trong một lần duyệt (O(V + E)).
+
+    Đỉnh trùng tên chỉ giữ đỉnh đầu tiên; cạnh trùng (kể cả ngược chiều) và cạnh có
+    đầu mút không tồn tại bị bỏ. Trả về (vertices, chỉ mục, danh sách kề, tập cạnh).
+    """
+    unique = []
+    index = {}
+    for vertex in vertices:
+        name = vertex[0]
+        if name not in index:
+            index[name] = len(unique)
+            unique.append(vertex)
+    adjacency = {name: set() for name in index}
+    stored = {}
+    for edge in edges:
+        u, v = edge
+        neighbors_u = adjacency.get(u)
+        # Trùng cạnh được phát hiện qua danh sách kề, không cần tạo khóa trước
+        if neighbors_u is None or v in neighbors_u:
+            continue
+        neighbors_v = adjacency.get(v)
+        if neighbors_v is None:
+            continue
+        stored[frozenset((u, v))] = edge if type(edge) is tuple else (u, v)
+        neighbors_u.add(v)
+        neighbors_v.add(u)
+    return unique, index, adjacency, stored
 
 
 class Graph:
     def __init__(self):
         self.vertices = []
-        self.edges = []
+        # Tập cạnh: khóa vô hướng -> cạnh theo chiều được thêm vào. dict giữ thứ tự thêm
+        # nên vẫn duyệt được theo thứ tự để hiển thị, còn thêm / xóa / kiểm tra là O(1)
+        self._edges = {}
         # Thêm dictionary để lưu điểm điều khiển cho cạnh cong
         self.edge_control_points = {}
+        # Chỉ mục tên đỉnh -> vị trí trong danh sách vertices (tra cứu O(1))
+        self._index = {}
+        # Danh sách kề lưu sẵn, được đồng bộ khi thêm/xóa đỉnh và cạnh
+        self._adjacency = {}
+        # Tăng mỗi khi cấu trúc (đỉnh, cạnh) thay đổi; đổi tọa độ / điểm điều khiển thì không
+        self.topology_version = 0
+        # Tăng mỗi khi tọa độ đỉnh hoặc điểm điều khiển thay đổi (dùng cho bộ đệm vẽ)
+        self.geometry_version = 0
+        self._fingerprint = None
+        self._fingerprint_version = -1
+        # Miền liên thông (DisjointSet), cập nhật dần khi thêm đỉnh / cạnh; None: cần dựng lại
+        self._components = None
+        # Dữ liệu phân tích dùng chung của phiên bản cấu trúc hiện tại (GraphAnalysis)
+        self._analysis = None
+        # Nhật ký hoàn tác (history.History) nếu có: mọi thay đổi được báo qua history.record(...)
+        self.history = None
+
+    @classmethod
+    def from_arrays(cls, names, xs, ys, edges, control_points=None):
+        """Tạo đồ thị từ các mảng tên đỉnh, tọa độ x, y và danh sách cạnh (xem load)"""
+        graph = cls()
+        graph.load([(name, Point(x, y)) for name, x, y in zip(names, xs, ys)], edges, control_points)
+        return graph
+
+    def load(self, vertices, edges, control_points=None):
+        """Thay toàn bộ đồ thị bằng dữ liệu mới trong một lần (nhập file, sinh đồ thị).
+
+        Dữ liệu được kiểm tra và loại trùng một lần bằng băm, điểm điều khiển mặc định
+        được tính trong một lượt cho mọi cạnh; control_points ({cạnh: Point}) ghi đè
+        điểm mặc định của các cạnh tồn tại. Trạng thái mới chỉ được gán vào đồ thị khi
+        đã dựng xong, nên lỗi giữa chừng không làm hỏng đồ thị hiện tại.
+        """
+        with paused_gc():
+            vertices, index, adjacency, stored = build_structures(vertices, edges)
+            points = self._bulk_control_points(vertices, stored, control_points or {})
+        self._swap_state(vertices, index, adjacency, stored, points)
+
+    @staticmethod
+    def _bulk_control_points(vertices, stored, control_points):
+        """Điểm điều khiển cho mọi cạnh trong một lượt: lấy từ control_points nếu có, nếu không dùng điểm mặc định"""
+        positions = dict(vertices)
+        points = {}
+        for edge in stored.values():
+            u, v = edge
+            point = control_points.get(edge)
+            if point is None:
+                point = control_points.get((v, u))
+            if point is None:
+                pos1, pos2 = positions[u], positions[v]
+                if pos1 is None or pos2 is None:
+                    continue
+                point = Point((pos1.x + pos2.x) / 2, (pos1.y + pos2.y) / 2 - 30)
+            points[edge] = point
+            points[(v, u)] = point
+        return points
+
+    def add_edges_bulk(self, edges):
+        """Thêm nhiều cạnh vào đồ thị hiện tại trong một lượt; trả về số cạnh thực sự được thêm"""
+        adjacency = self._adjacency
+        stored = self._edges
+        added = []
+        for edge in edges:
+            u, v = edge
+            if u not in adjacency or v not in adjacency:
+                continue
+            key = frozenset((u, v))
+            if key in stored:
+                continue
+            edge = (u, v)
+            stored[key] = edge
+            adjacency[u].add(v)
+            adjacency[v].add(u)
+            added.append(edge)
+        if not added:
+            return 0
+        self.topology_version += 1
+        if self._components is not None:
+            for u, v in added:
+                self._components.union(u, v)
+        for edge in added:
+            if self.history is not None:
+                self.history.record(("add_edge", edge))
+            self.create_default_control_point(edge)
+        return len(added)
+
+    def _swap_state(self, vertices, index, adjacency, stored, control_points):
+        if self.history is not None:
+            self.history.record(("state", self._state(), (list(vertices), list(stored.values()), dict(control_points))))
+        self.vertices = vertices
+        self._index = index
+        self._adjacency = adjacency
+        self._edges = stored
+        self.edge_control_points = control_points
+        self._components = None
+        self.topology_version += 1
+        self.geometry_version += 1
+
+    @property
+    def edges(self):
+        """Các cạnh theo thứ tự thêm vào (chỉ đọc; dùng add_edge / remove_edge để thay đổi)"""
+        return self._edges.values()
+
+    def get_edge(self, name1, name2):
+        """Cạnh nối name1 và name2 theo chiều được lưu, None nếu không có"""
+        return self._edges.get(edge_key(name1, name2))
+
+    def has_vertex(self, name):
+        return name in self._index
+
+    def index_of(self, name):
+        """Vị trí của đỉnh trong danh sách vertices, None nếu không tồn tại"""
+        return self._index.get(name)
+
+    def vertex_names(self):
+        return [name for name, _ in self.vertices]
+
+    def get_position(self, name):
+        """Lấy tọa độ của đỉnh theo tên"""
+        i = self._index.get(name)
+        if i is None:
+            return None
+        return self.vertices[i][1]
+
+    def set_position(self, name, pos):
+        """Đặt tọa độ mới cho đỉnh"""
+        i = self._index.get(name)
+        if i is not None:
+            if self.history is not None:
+                self.history.record(("position", name, self.vertices[i][1], pos))
+            self.vertices[i] = (name, pos)
+            self.geometry_version += 1
+
+    def neighbors(self, name):
+        """Tập đỉnh kề của một đỉnh (không được sửa trực tiếp)"""
+        return self._adjacency.get(name, set())
+
+    def get_adjacency(self):
+        """Danh sách kề {đỉnh: tập đỉnh kề} dùng chung cho các thuật toán (chỉ đọc)"""
+        return self._adjacency
+
+    def has_edge(self, name1, name2):
+        return name2 in self._adjacency.get(name1, ())
+
+    def analysis(self):
+        """Dữ liệu phân tích (GraphAnalysis) của cấu trúc hiện tại, tạo lại khi topology_version đổi"""
+        if self._analysis is None or self._analysis.version != self.topology_version:
+            self._analysis = GraphAnalysis(self)
+        return self._analysis
+
+    def components(self):
+        """Miền liên thông dạng DisjointSet (chỉ đọc): find(đỉnh) cho đại diện miền, O(α(V)).
+
+        Được cập nhật dần khi thêm đỉnh / cạnh; sau khi xóa đỉnh, cạnh hoặc thay toàn bộ
+        đồ thị thì được dựng lại (O(V + E)) ở lần gọi kế tiếp.
+        """
+        if self._components is None:
+            components = DisjointSet(self._index)
+            for u, v in self._edges.values():
+                components.union(u, v)
+            self._components = components
+        return self._components
+
+    def component_count(self):
+        return self.components().count
+
+    def same_component(self, name1, name2):
+        return self.components().connected(name1, name2)
+
+    def fingerprint(self):
+        """Mã băm cấu trúc đồ thị: tên đỉnh theo thứ tự và tập cạnh (không phụ thuộc tọa độ).
+
+        Chỉ tính lại khi topology_version thay đổi.
+        """
+        if self._fingerprint_version != self.topology_version:
+            digest = hashlib.sha1()
+            for name, _ in self.vertices:
+                digest.update(str(name).encode("utf-8") + b"\0")
+            digest.update(b"\1")
+            edges = sorted(tuple(sorted((str(u), str(v)))) for u, v in self.edges)
+            for u, v in edges:
+                digest.update(u.encode("utf-8") + b"\0" + v.encode("utf-8") + b"\0")
+            self._fingerprint = digest.hexdigest()
+            self._fingerprint_version = self.topology_version
+        return self._fingerprint
 
     def add_vertex(self, vertex):
         name, _ = vertex
-        if name not in [v[0] for v in self.vertices]:
+        if name not in self._index:
+            self._index[name] = len(self.vertices)
+            self._adjacency[name] = set()
             self.vertices.append(vertex)
+            if self._components is not None:
+                self._components.add(name)
+            self.topology_version += 1
+            if self.history is not None:
+                self.history.record(("add_vertex", vertex))
+
+    def insert_vertex(self, index, vertex):
+        """Chèn đỉnh vào vị trí index của danh sách vertices (dùng khi hoàn tác xóa đỉnh)"""
+        name, _ = vertex
+        if name in self._index:
+            return
+        if index >= len(self.vertices):
+            self.add_vertex(vertex)
+            return
+        self.vertices.insert(index, vertex)
+        for i in range(index, len(self.vertices)):
+            self._index[self.vertices[i][0]] = i
+        self._adjacency[name] = set()
+        if self._components is not None:
+            self._components.add(name)
+        self.topology_version += 1
+        if self.history is not None:
+            self.history.record(("add_vertex", vertex))
 
     def add_edge(self, edge):
         name1, name2 = edge
-        if edge not in self.edges and (name2, name1) not in self.edges:
-            self.edges.append(edge)
+        if name1 not in self._index or name2 not in self._index:
+            return
+        if not self.has_edge(name1, name2):
+            self._edges[edge_key(name1, name2)] = edge
+            self._adjacency[name1].add(name2)
+            self._adjacency[name2].add(name1)
+            if self._components is not None:
+                self._components.union(name1, name2)
+            self.topology_version += 1
+            if self.history is not None:
+                self.history.record(("add_edge", edge))
             # Tạo điểm điều khiển mặc định cho cạnh mới
             self.create_default_control_point(edge)
 
     def create_default_control_point(self, edge):
         """Tạo điểm điều khiển mặc định cho cạnh"""
         name1, name2 = edge
-        pos1 = next((pos for n, pos in self.vertices if n == name1), None)
-        pos2 = next((pos for n, pos in self.vertices if n == name2), None)
+        pos1 = self.get_position(name1)
+        pos2 = self.get_position(name2)
         
-        if pos1 and pos2:
-            # Điểm điều khiển ở giữa cạnh, lệch lên trên một chút
-            mid_x = (pos1.x() + pos2.x()) / 2
-            mid_y = (pos1.y() + pos2.y()) / 2 - 30
-            control_point = QPointF(mid_x, mid_y)
-            
-            # Lưu cho cả hai hướng của cạnh
-            self.edge_control_points[edge] = control_point
-            self.edge_control_points[(name2, name1)] = control_point
+        if pos1 is not None and pos2 is not None:
+            self.set_control_point(edge, default_control_point(pos1, pos2))
 
     def get_control_point(self, edge):
         """Lấy điểm điều khiển của cạnh"""
@@ -47,80 +326,139 @@ class Graph:
     def set_control_point(self, edge, point):
         """Đặt điểm điều khiển cho cạnh"""
         name1, name2 = edge
+        if self.history is not None:
+            self.history.record(("control_point", edge, self.edge_control_points.get(edge), point))
+        # Lưu cho cả hai hướng của cạnh
         self.edge_control_points[edge] = point
         self.edge_control_points[(name2, name1)] = point
+        self.geometry_version += 1
+
+    def remove_control_point(self, edge):
+        """Xóa điểm điều khiển của cạnh (cạnh được vẽ thẳng)"""
+        name1, name2 = edge
+        old = self.edge_control_points.pop(edge, None)
+        self.edge_control_points.pop((name2, name1), None)
+        if old is not None:
+            self.geometry_version += 1
+            if self.history is not None:
+                self.history.record(("control_point", edge, old, None))
 
     def remove_vertex(self, vertex):
         name, _ = vertex
-        self.vertices = [v for v in self.vertices if v[0] != name]
+        self.remove_vertices([name])
+
+    def remove_vertices(self, names):
+        """Xóa nhiều đỉnh cùng lúc cùng các cạnh và điểm điều khiển liên quan.
+
+        Chi phí O(V + tổng bậc các đỉnh bị xóa): các cạnh được tìm qua danh sách kề.
+        """
+        names = {name for name in names if name in self._index}
+        if not names:
+            return
+        removed_vertices = sorted(((self._index[name], self.vertices[self._index[name]]) for name in names),
+                                  key=lambda item: item[0])
         # Xóa các cạnh và điểm điều khiển liên quan
-        edges_to_remove = [e for e in self.edges if name in e]
-        for edge in edges_to_remove:
-            self.edges.remove(edge)
-            self.edge_control_points.pop(edge, None)
-            # Xóa cả hướng ngược lại
-            reverse_edge = (edge[1], edge[0])
-            self.edge_control_points.pop(reverse_edge, None)
+        removed_edges = []
+        for name in names:
+            for neighbor in self._adjacency.pop(name):
+                edge = self._edges.pop(edge_key(name, neighbor), None)
+                if edge is None:
+                    # Cạnh giữa hai đỉnh cùng bị xóa đã được xử lý
+                    continue
+                control_point = self.edge_control_points.pop(edge, None)
+                # Xóa cả hướng ngược lại
+                self.edge_control_points.pop((edge[1], edge[0]), None)
+                removed_edges.append((edge, control_point))
+                if neighbor not in names:
+                    self._adjacency[neighbor].discard(name)
+        first = removed_vertices[0][0]
+        self.vertices[first:] = [v for v in self.vertices[first:] if v[0] not in names]
+        for name in names:
+            del self._index[name]
+        for i in range(first, len(self.vertices)):
+            self._index[self.vertices[i][0]] = i
+        # Union-find không hỗ trợ tách tập: dựng lại miền liên thông khi cần
+        self._components = None
+        self.topology_version += 1
+        if self.history is not None:
+            self.history.record(("remove_vertices", removed_vertices, removed_edges))
 
     def remove_edge(self, edge):
-        if edge in self.edges:
-            self.edges.remove(edge)
-            # Xóa điểm điều khiển
-            self.edge_control_points.pop(edge, None)
-            self.edge_control_points.pop((edge[1], edge[0]), None)
+        name1, name2 = edge
+        edge = self._edges.pop(edge_key(name1, name2), None)
+        if edge is None:
+            return
+        self._adjacency[name1].discard(name2)
+        self._adjacency[name2].discard(name1)
+        self._components = None
+        self.topology_version += 1
+        # Xóa điểm điều khiển
+        control_point = self.edge_control_points.pop(edge, None)
+        self.edge_control_points.pop((edge[1], edge[0]), None)
+        if self.history is not None:
+            self.history.record(("remove_edge", edge, control_point))
+
+    def copy(self):
+        """Bản sao độc lập của đồ thị (dùng khi chạy giải thuật ở luồng khác)"""
+        other = Graph()
+        other.set_state(list(self.vertices), list(self.edges), dict(self.edge_control_points))
+        return other
+
+    def set_state(self, vertices, edges, control_points):
+        """Thay toàn bộ trạng thái đồ thị (điểm điều khiển giữ nguyên như được truyền vào)"""
+        self._swap_state(*build_structures(vertices, edges), control_points)
+
+    def _state(self):
+        return self.vertices, list(self._edges.values()), self.edge_control_points
 
     def clear(self):
+        if self.history is not None:
+            # Giữ lại các danh sách cũ cho hoàn tác, đồ thị chuyển sang danh sách mới
+            self.history.record(("state", self._state(), ([], [], {})))
+            self.vertices, self.edge_control_points = [], {}
         self.vertices.clear()
-        self.edges.clear()
+        self._edges.clear()
         self.edge_control_points.clear()
+        self._index.clear()
+        self._adjacency.clear()
+        self._components = None
+        self.topology_version += 1
 
 def connected_components(graph):
-    vertices = [v[0] for v in graph.vertices]
-    adjacency = {v: set() for v in vertices}
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
-
-    visited = set()
-    components = []
-
-    def dfs(u, component):
-        visited.add(u)
-        component.append(u)
-        for v in adjacency[u]:
-            if v not in visited:
-                dfs(v, component)
-
-    for v in vertices:
-        if v not in visited:
-            component = []
-            dfs(v, component)
-            # components.append(sorted(component))  # Sắp xếp để dễ đọc
-            components.append(component)
-
-    return len(components), components
+    """Số miền liên thông và danh sách các miền (đỉnh trong mỗi miền theo thứ tự của đồ thị)"""
+    components = graph.components()
+    groups = {}
+    for name, _ in graph.vertices:
+        root = components.find(name)
+        group = groups.get(root)
+        if group is None:
+            groups[root] = [name]
+        else:
+            group.append(name)
+    return len(groups), list(groups.values())
 
 
 def generate_random_graph(graph, num_vertices=None, edge_probability=0.4, width=600, height=500):
     if num_vertices is None:
         num_vertices = random.randint(3, 6)
-    graph.clear()
-    spacing = 360 / num_vertices
+    spacing = 360 / num_vertices if num_vertices else 0
     center_x, center_y = width // 2, height // 2
     radius = min(center_x, center_y) - 60
 
+    vertices = []
     for i in range(num_vertices):
         name = chr(65 + i)
         angle_rad = math.radians(i * spacing)
         x = center_x + int(radius * math.cos(angle_rad))
         y = center_y + int(radius * math.sin(angle_rad))
-        graph.add_vertex((name, QPoint(x, y)))
+        vertices.append((name, Point(x, y)))
 
-    vertices = [v[0] for v in graph.vertices]
+    edges = []
     for i in range(num_vertices):
         for j in range(i + 1, num_vertices):
             if random.random() < edge_probability:
-                graph.add_edge((vertices[i], vertices[j]))
+                edges.append((vertices[i][0], vertices[j][0]))
+    graph.load(vertices, edges)
 
 
 def format_graph_circular(graph, width=600, height=500):
@@ -132,65 +470,41 @@ def format_graph_circular(graph, width=600, height=500):
     center_x, center_y = width // 2, height // 2
     radius = min(center_x, center_y) - 80
     
-    for i, (name, _) in enumerate(graph.vertices):
+    for i, name in enumerate(graph.vertex_names()):
         angle = 2 * math.pi * i / num_vertices
         x = center_x + int(radius * math.cos(angle))
         y = center_y + int(radius * math.sin(angle))
-        graph.vertices[i] = (name, QPoint(x, y))
+        graph.set_position(name, Point(x, y))
     
     # Reset control points for all edges
     for edge in graph.edges:
         graph.create_default_control_point(edge)
 
 def export_file(graph, file_path):
+    """Ghi đồ thị ra file; đuôi .hgb dùng dạng nhị phân, còn lại dùng JSON (xem graph_file)"""
     if not file_path:
         return
 
-    data = {
-        "vertices": [
-            {"name": name, "x": pos.x(), "y": pos.y()}
-            for name, pos in graph.vertices
-        ],
-        "edges": [
-            [v1, v2] for v1, v2 in graph.edges
-        ],
-        "control_points": {
-            f"{edge[0]}-{edge[1]}": {"x": point.x(), "y": point.y()}
-            for edge, point in graph.edge_control_points.items()
-        }
-    }
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    from graph_file import write_graph
+    write_graph(graph, file_path)
 
 
 def import_file(graph, file_path):
+    """Đọc đồ thị từ file nhị phân, JSON phiên bản 2 hoặc JSON định dạng cũ"""
     if not file_path:
         return
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    graph.clear()
-    
-    for v in data.get("vertices", []):
-        name = v["name"]
-        pos = QPoint(v["x"], v["y"])
-        graph.add_vertex((name, pos))
-    
-    for edge in data.get("edges", []):
-        if len(edge) == 2:
-            graph.add_edge(tuple(edge))
-    
-    # Import điểm điều khiển
-    control_points = data.get("control_points", {})
-    for edge_key, point_data in control_points.items():
-        if "-" in edge_key:
-            parts = edge_key.split("-")
-            if len(parts) == 2:
-                edge = (parts[0], parts[1])
-                control_point = QPointF(point_data["x"], point_data["y"])
-                graph.set_control_point(edge, control_point)
+    from graph_file import read_graph
+    vertices, edges, control_points = read_graph(file_path)
+    graph.load(vertices, edges, control_points)
 
 
+def import_topology(graph, file_path):
+    """Chỉ đọc cấu trúc (tên đỉnh, cạnh) từ file đồ thị.
 
+    Tọa độ và điểm điều khiển bị bỏ qua (không tạo Point cho từng đỉnh, cạnh);
+    dùng cho việc chạy giải thuật không giao diện.
+    """
+    from graph_file import read_graph
+    vertices, edges, _ = read_graph(file_path, positions=False)
+    graph.load(vertices, edges)
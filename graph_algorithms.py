@@ -1,624 +1,963 @@
-from collections import deque
-import itertools
+from array import array
+import random
+import sys
+from itertools import compress
 from graph import connected_components
+from step_trace import StepTrace
+from search_control import CHECK_EVERY, SearchCancelled
+from search_stats import SearchStats, PHASE_VALIDATION, PHASE_CONDITIONS, PHASE_SEARCH
+
+def dirac_violations(graph):
+    """Các đỉnh vi phạm định lý Dirac (bậc < n/2): trả về (chỉ số đỉnh đầu tiên hoặc None, số đỉnh vi phạm)"""
+    degrees = graph.analysis().degrees
+    half = len(degrees) / 2
+    first = None
+    count = 0
+    for i, degree in enumerate(degrees):
+        if degree < half:
+            if first is None:
+                first = i
+            count += 1
+    return first, count
+
+def ore_violations(graph):
+    """Các cặp vi phạm định lý Ore (không kề, tổng bậc < n).
+
+    Trả về (cặp chỉ số (i, j) đầu tiên theo thứ tự đỉnh hoặc None, số cặp vi phạm).
+    Không duyệt n² cặp: với mỗi đỉnh i (duyệt từ cuối lên), số đỉnh j > i có bậc
+    < n - bậc(i) được đếm bằng cây Fenwick theo bậc, rồi trừ đi các đỉnh kề thỏa cùng
+    điều kiện. Chi phí O((V + E) log V), bộ nhớ O(V).
+    """
+    analysis = graph.analysis()
+    vertices = analysis.vertices
+    adjacency = analysis.adjacency
+    index = analysis.index
+    degrees = analysis.degrees
+    n = len(vertices)
+
+    # tree: cây Fenwick đếm số đỉnh đã duyệt theo bậc (bậc d ở vị trí d + 1)
+    tree = [0] * (n + 2)
+    count = 0
+    first_row = None
+    for i in range(n - 1, -1, -1):
+        limit = n - degrees[i]
+        # Số đỉnh j > i có bậc <= limit - 1
+        below = 0
+        position = min(limit, n + 1)
+        while position > 0:
+            below += tree[position]
+            position -= position & -position
+        if below:
+            # Bỏ các đỉnh kề i (cặp kề không vi phạm)
+            for u in adjacency[vertices[i]]:
+                j = index[u]
+                if j > i and degrees[j] < limit:
+                    below -= 1
+            if below:
+                count += below
+                first_row = i
+        position = degrees[i] + 1
+        while position <= n + 1:
+            tree[position] += 1
+            position += position & -position
+
+    if first_row is None:
+        return None, 0
+    i = first_row
+    limit = n - degrees[i]
+    neighbors = adjacency[vertices[i]]
+    for j in range(i + 1, n):
+        if degrees[j] < limit and vertices[j] not in neighbors:
+            return (i, j), count
 
 def check_dirac_condition(graph):
     """Kiểm tra điều kiện đủ cho chu trình Hamilton dựa trên định lý Dirac"""
-    vertices = [v[0] for v in graph.vertices]
+    analysis = graph.analysis()
+    vertices = analysis.vertices
     n = len(vertices)
     if n < 3:
         return False, "Đồ thị cần ít nhất 3 đỉnh để có chu trình Hamilton"
     
-    adjacency = {v: set() for v in vertices}
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
-    
-    for v in vertices:
-        if len(adjacency[v]) < n / 2:
-            return False, f"Không thỏa định lý Dirac: Đỉnh {v} có bậc {len(adjacency[v])} < {n/2}"
+    first, count = dirac_violations(graph)
+    if first is not None:
+        v = vertices[first]
+        return False, f"Không thỏa định lý Dirac: Đỉnh {v} có bậc {analysis.degrees[first]} < {n/2} (tổng cộng {count} đỉnh vi phạm)"
     return True, "Thỏa định lý Dirac (mọi đỉnh có bậc >= n/2)"
 
 def check_ore_condition(graph):
     """Kiểm tra điều kiện đủ cho chu trình Hamilton dựa trên định lý Ore"""
-    vertices = [v[0] for v in graph.vertices]
+    analysis = graph.analysis()
+    vertices = analysis.vertices
     n = len(vertices)
     if n < 3:
         return False, "Đồ thị cần ít nhất 3 đỉnh để có chu trình Hamilton"
     
-    adjacency = {v: set() for v in vertices}
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
-    
-    degrees = {v: len(adjacency[v]) for v in vertices}
-    
-    for i in range(n):
-        for j in range(i + 1, n):
-            u, v = vertices[i], vertices[j]
-            if v not in adjacency[u]:
-                if degrees[u] + degrees[v] < n:
-                    return False, f"Không thỏa định lý Ore: Cặp {u}-{v} không kề, tổng bậc {degrees[u] + degrees[v]} < {n}"
+    first, count = ore_violations(graph)
+    if first is not None:
+        i, j = first
+        degrees = analysis.degrees
+        return False, f"Không thỏa định lý Ore: Cặp {vertices[i]}-{vertices[j]} không kề, tổng bậc {degrees[i] + degrees[j]} < {n} (tổng cộng {count} cặp vi phạm)"
     return True, "Thỏa định lý Ore (mọi cặp không kề có tổng bậc >= n)"
 
-def hamiltonian_cycle_with_steps(graph, start_vertex=None):
-    """Tìm chu trình Hamilton với chi tiết các bước, bắt đầu từ đỉnh được chỉ định"""
-    vertices = [v[0] for v in graph.vertices]
-    if len(vertices) == 0:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị rỗng - không có đỉnh nào'}],
-            'total_steps': 1
-        }
-    
-    if len(vertices) == 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [vertices[0]], 'action': 'Đồ thị chỉ có 1 đỉnh - không thể tạo chu trình'}],
-            'total_steps': 1
-        }
-    
-    adjacency = {v: set() for v in vertices}    
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
+def search_result(success, path, trace, nodes, stats=None):
+    """Kết quả chung của các giải thuật tìm chu trình Hamilton.
 
-    # Kiểm tra đồ thị liên thông
-    if connected_components(graph)[0] > 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị không liên thông - không thể có chu trình Hamilton'}],
-            'total_steps': 1
-        }
-    
-    # Kiểm tra điều kiện cần thiết (đỉnh cô lập)
-    # isolated_vertices = [v for v in vertices if len(adjacency[v]) == 0]
-    # if isolated_vertices:
-    #     return {
-    #         'success': False,
-    #         'path': None,
-    #         'steps': [
-    #             {'step': 1, 'path': [], 'action': f'Có đỉnh cô lập: {", ".join(isolated_vertices)}'},
-    #             {'step': 2, 'path': [], 'action': 'Không thể tạo chu trình Hamilton với đỉnh cô lập'}
-    #         ],
-    #         'total_steps': 2
-    #     }
-
-    # Nếu không có đỉnh bắt đầu được chỉ định, chọn đỉnh đầu tiên
-    start_vertex = start_vertex if start_vertex in vertices else vertices[0]
-    path = [start_vertex]
-    steps = []
-    step_count = 0
-
-
-    # Kiểm tra định lý Dirac và Ore
-    dirac_valid, dirac_msg = check_dirac_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': dirac_msg
-    })
-
-    ore_valid, ore_msg = check_ore_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': ore_msg
-    })
-
-    if dirac_valid or ore_valid:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Vì thỏa ít nhất một định lý đủ (Dirac hoặc Ore), tồn tại chu trình Hamilton. Đang tìm...'
-        })
-    else:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Không thỏa các định lý đủ Dirac hoặc Ore, nhưng chu trình có thể vẫn tồn tại. Thử tìm bằng thuật toán.'
-        })
-     # Bước khởi tạo
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': path.copy(),
-        'action': f"Khởi tạo: Bắt đầu từ đỉnh {start_vertex}"
-    })
-    
-    def backtrack(pos):
-        nonlocal step_count
-        
-        if len(path) == len(vertices):
-            step_count += 1
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Đã thăm tất cả {len(vertices)} đỉnh: {' → '.join(path)}"
-            })
-            
-            if path[0] in adjacency[path[-1]]:
-                step_count += 1
-                final_path = path + [path[0]]
-                steps.append({
-                    'step': step_count,
-                    'path': final_path,
-                    'action': f"Thành công! Có cạnh từ {path[-1]} về {path[0]}\nChu trình Hamilton là: {' → '.join(final_path)}"
-                })
-                return True
-            else:
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Không có cạnh từ {path[-1]} về {path[0]} - Không tạo được chu trình"
-                })
-                return False
-        
-        # Thử các đỉnh kề
-        current_vertex = path[-1]
-        neighbors = [v for v in vertices if v not in path and v in adjacency[current_vertex]]
-        
-        if not neighbors:
-            step_count += 1
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Không có đỉnh kề khả dụng từ {current_vertex}"
-            })
-            return False
-        
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': path.copy(),
-            'action': f"Từ {current_vertex}, thử các đỉnh: {', '.join(neighbors)}"
-        })
-        
-        for v in neighbors:
-            step_count += 1
-            path.append(v)
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Thêm đỉnh {v} vào đường đi: {' → '.join(path)}"
-            })
-            
-            if backtrack(pos + 1):
-                return True
-            
-            # Backtrack
-            path.pop()
-            step_count += 1
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Quay lui: Loại bỏ {v}, quay về {' → '.join(path) if path else 'rỗng'}"
-            })
-        
-        return False
-
-    success = backtrack(1)
-    
-    if not success and step_count > 1:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': f"Kết luận: Đã thử tất cả khả năng từ đỉnh {start_vertex} - Không tồn tại chu trình Hamilton"
-        })
-    
-    result_path = path + [path[0]] if success else None
-    
+    stats: SearchStats của lần chạy (tạo mới nếu không có); số nút được ghi vào
+    stats và giai đoạn đang tính giờ được kết thúc.
+    """
+    if stats is None:
+        stats = SearchStats()
+    stats.nodes = nodes
+    stats.finish()
     return {
         'success': success,
-        'path': result_path,
-        'steps': steps,
-        'total_steps': step_count
+        'path': path,
+        'steps': trace,
+        'total_steps': trace.count,
+        'nodes': nodes,
+        'stats': stats
     }
 
-def hamiltonian_cycle_branch_and_bound(graph, start_vertex=None):
-    """Tìm chu trình Hamilton bằng Branch and Bound với chi tiết các bước"""
-    vertices = [v[0] for v in graph.vertices]
+def stopped_result(trace, nodes, stop, stats=None):
+    """Kết quả khi lần chạy bị hủy hoặc hết thời gian (SearchControl)"""
+    if trace.active:
+        if stop.reason == "timeout":
+            trace.record('info', detail=f"Đã dừng: hết thời gian giới hạn sau {nodes} nút tìm kiếm")
+        else:
+            trace.record('info', detail=f"Đã dừng: người dùng hủy sau {nodes} nút tìm kiếm")
+    result = search_result(False, None, trace, nodes, stats)
+    result['cancelled'] = stop.reason
+    return result
+
+def begin_search(graph, start_vertex, trace, label=None, stats=None):
+    """Các bước kiểm tra chung trước khi tìm kiếm.
+
+    Trả về (kết quả, None) nếu kết luận được ngay (đồ thị rỗng, 1 đỉnh, không liên thông),
+    ngược lại trả về (None, (vertices, adjacency, start_vertex)); vertices và adjacency
+    lấy từ graph.analysis(), dùng chung nên không được sửa.
+    stats: SearchStats của lần chạy, được tính giờ các giai đoạn kiểm tra; khi trả về
+    (None, ...) giai đoạn tìm kiếm đã bắt đầu.
+    """
+    if stats is None:
+        stats = SearchStats()
+    stats.begin_phase(PHASE_VALIDATION)
+    analysis = graph.analysis()
+    vertices = analysis.vertices
     if len(vertices) == 0:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị rỗng - không có đỉnh nào'}],
-            'total_steps': 1
-        }
-    
+        if trace.active:
+            trace.record('info', detail='Đồ thị rỗng - không có đỉnh nào')
+        return search_result(False, None, trace, 0, stats), None
+
     if len(vertices) == 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [vertices[0]], 'action': 'Đồ thị chỉ có 1 đỉnh - không thể tạo chu trình'}],
-            'total_steps': 1
-        }
-    
-    adjacency = {v: set() for v in vertices}
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
+        if trace.active:
+            trace.advance(vertices[0], 0)
+            trace.record('info', depth=0, detail='Đồ thị chỉ có 1 đỉnh - không thể tạo chu trình')
+        return search_result(False, None, trace, 0, stats), None
+
+    adjacency = analysis.adjacency
 
     # Kiểm tra đồ thị liên thông
-    if connected_components(graph)[0] > 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị không liên thông - không thể có chu trình Hamilton'}],
-            'total_steps': 1
-        }
-    
-    # Kiểm tra điều kiện cần thiết (đỉnh cô lập)
-    # isolated_vertices = [v for v in vertices if len(adjacency[v]) == 0]
-    # if isolated_vertices:
-    #     return {
-    #         'success': False,
-    #         'path': None,
-    #         'steps': [
-    #             {'step': 1, 'path': [], 'action': f'Có đỉnh cô lập: {", ".join(isolated_vertices)}'},
-    #             {'step': 2, 'path': [], 'action': 'Không thể tạo chu trình Hamilton với đỉnh cô lập'}
-    #         ],
-    #         'total_steps': 2
-    #     }
+    if graph.component_count() > 1:
+        stats.prune('prune_disconnected')
+        if trace.active:
+            trace.record('info', detail='Đồ thị không liên thông - không thể có chu trình Hamilton')
+        return search_result(False, None, trace, 0, stats), None
 
     # Nếu không có đỉnh bắt đầu được chỉ định, chọn đỉnh đầu tiên
-    start_vertex = start_vertex if start_vertex in vertices else vertices[0]
-    path = [start_vertex]
-    steps = []
-    step_count = 0
-
-
-
-    # Kiểm tra định lý Dirac và Ore
-    dirac_valid, dirac_msg = check_dirac_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': dirac_msg
-    })
-
-    ore_valid, ore_msg = check_ore_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': ore_msg
-    })
-
-    if dirac_valid or ore_valid:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Vì thỏa ít nhất một định lý đủ (Dirac hoặc Ore), tồn tại chu trình Hamilton. Đang tìm...'
-        })
-    else:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Không thỏa các định lý đủ Dirac hoặc Ore, nhưng chu trình có thể vẫn tồn tại. Thử tìm bằng thuật toán.'
-        })
-
-    # Bước khởi tạo
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': path.copy(),
-        'action': f"Khởi tạo (Nhánh cận): Bắt đầu từ đỉnh {start_vertex}"
-    })
-
-    def is_promising(path, current_vertex):
-        """Kiểm tra xem việc thêm đỉnh current_vertex có tiềm năng dẫn đến lời giải"""
-        # Nếu không có cạnh từ đỉnh hiện tại đến các đỉnh chưa thăm
-        neighbors = [v for v in vertices if v not in path and v in adjacency[current_vertex]]
-        if not neighbors and len(path) < len(vertices):
-            return False, f"Không có đỉnh kề khả dụng từ {current_vertex}"
-        
-        # Nếu đã thăm đủ đỉnh, kiểm tra cạnh quay về đỉnh đầu
-        if len(path) == len(vertices):
-            if path[0] not in adjacency[current_vertex]:
-                return False, f"Không có cạnh từ {current_vertex} về {path[0]}"
-        
-        # Kiểm tra tính liên thông của các đỉnh chưa thăm
-        remaining_vertices = [v for v in vertices if v not in path]
-        if remaining_vertices:
-            temp_graph = {v: set(adjacency[v]) for v in remaining_vertices}
-            for v in remaining_vertices:
-                temp_graph[v] = {u for u in temp_graph[v] if u in remaining_vertices}
-            if connected_components_temp(temp_graph, remaining_vertices) > 1:
-                return False, f"Các đỉnh chưa thăm không liên thông"
-        
-        return True, ""
-
-    def connected_components_temp(temp_graph, vertices):
-        """Tính số miền liên thông trong tập đỉnh chưa thăm"""
-        visited = set()
-        count = 0
-
-        def dfs(u):
-            visited.add(u)
-            for v in temp_graph[u]:
-                if v not in visited:
-                    dfs(v)
-
-        for v in vertices:
-            if v not in visited:
-                dfs(v)
-                count += 1
-        return count
-
-    def branch_and_bound(pos):
-        nonlocal step_count
-        
-        if len(path) == len(vertices):
-            step_count += 1
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Đã thăm tất cả {len(vertices)} đỉnh: {' → '.join(path)}"
-            })
-            
-            if path[0] in adjacency[path[-1]]:
-                step_count += 1
-                final_path = path + [path[0]]
-                steps.append({
-                    'step': step_count,
-                    'path': final_path,
-                    'action': f"Thành công! Có cạnh từ {path[-1]} về {path[0]}\nChu trình Hamilton là: {' → '.join(final_path)}"
-                })
+    start_vertex = start_vertex if graph.has_vertex(start_vertex) else vertices[0]
+
+    # Kiểm tra định lý Dirac và Ore (chỉ để ghi vào nhật ký, không ảnh hưởng việc tìm kiếm)
+    if trace.active:
+        stats.begin_phase(PHASE_CONDITIONS)
+        dirac_valid, dirac_msg = check_dirac_condition(graph)
+        trace.record('info', detail=dirac_msg)
+        ore_valid, ore_msg = check_ore_condition(graph)
+        trace.record('info', detail=ore_msg)
+        if dirac_valid or ore_valid:
+            trace.record('info', detail='Vì thỏa ít nhất một định lý đủ (Dirac hoặc Ore), tồn tại chu trình Hamilton. Đang tìm...')
+        else:
+            trace.record('info', detail='Không thỏa các định lý đủ Dirac hoặc Ore, nhưng chu trình có thể vẫn tồn tại. Thử tìm bằng thuật toán.')
+        # Bước khởi tạo
+        trace.record('start', start_vertex, 0, label)
+
+    stats.begin_phase(PHASE_SEARCH)
+    return None, (vertices, adjacency, start_vertex)
+
+
+# Thứ tự thử các đỉnh kề của giải thuật quay lui
+ORDER_VERTEX = "vertex"                      # Theo thứ tự đỉnh (mặc định)
+ORDER_WARNSDORFF = "warnsdorff"              # Đỉnh còn ít đỉnh kề chưa thăm nhất trước (luật Warnsdorff)
+ORDER_MOST_CONSTRAINED = "most_constrained"  # Như Warnsdorff, thêm nước đi bắt buộc và cắt nhánh theo số đỉnh kề khả dụng
+BACKTRACK_ORDERS = (ORDER_VERTEX, ORDER_WARNSDORFF, ORDER_MOST_CONSTRAINED)
+
+
+class RestartSearch(Exception):
+    """Lần thử của giải thuật quay lui đã dùng hết số nút cho phép, cần khởi động lại"""
+
+
+def hamiltonian_cycle_with_steps(graph, start_vertex=None, trace=None, control=None, prefix=None,
+                                 order=ORDER_VERTEX, seed=None, restart_nodes=None):
+    """Tìm chu trình Hamilton với chi tiết các bước, bắt đầu từ đỉnh được chỉ định.
+
+    trace: chế độ ghi vết các bước, xem StepTrace.from_policy
+    control: SearchControl để hủy / giới hạn thời gian / báo tiến độ (tùy chọn)
+    prefix: đường đi ban đầu (bắt đầu bằng đỉnh xuất phát), chỉ tìm trong nhánh con của nó
+    order: thứ tự thử các đỉnh kề, một trong BACKTRACK_ORDERS
+      - ORDER_VERTEX: theo thứ tự đỉnh
+      - ORDER_WARNSDORFF: đỉnh còn ít đỉnh kề chưa thăm nhất trước
+      - ORDER_MOST_CONSTRAINED: như Warnsdorff; đỉnh kề chỉ còn 2 đỉnh kề khả dụng
+        (chưa thăm, đỉnh đầu, đỉnh cuối) là nước đi bắt buộc, còn ít hơn 2 thì cắt nhánh
+    seed: hạt giống ngẫu nhiên; khi có, các đỉnh cùng thứ hạng được thử theo thứ tự ngẫu nhiên
+    restart_nodes: số nút của lần thử đầu; hết số nút thì khởi động lại với thứ tự ngẫu
+      nhiên mới và giới hạn gấp đôi, nên vẫn tìm hết cây nếu không có chu trình.
+      Số lần khởi động lại được trả về trong result['restarts'].
+    """
+    if order not in BACKTRACK_ORDERS:
+        raise ValueError(f"Thứ tự thử đỉnh không hợp lệ: {order}")
+    trace = StepTrace.from_policy(trace)
+    if prefix:
+        start_vertex = prefix[0]
+    stats = SearchStats()
+    early, context = begin_search(graph, start_vertex, trace, stats=stats)
+    if early:
+        return early
+    vertices, adjacency, start_vertex = context
+
+    tracing = trace.active
+    analysis = graph.analysis()
+    index = analysis.index
+    adjacent = analysis.neighbor_indices
+    n = len(vertices)
+    # Trạng thái tìm kiếm theo chỉ số đỉnh: visited[i] = 1 nếu đỉnh i nằm trên đường đi,
+    # free[i]: số đỉnh kề chưa thăm của i (chỉ cập nhật khi sắp thứ tự theo số đỉnh kề)
+    start = index[start_vertex]
+    visited = bytearray(n)
+    visited[start] = 1
+    start_adjacent = bytearray(n)
+    for u in adjacent[start]:
+        start_adjacent[u] = 1
+    ranked = order != ORDER_VERTEX
+    constrained = order == ORDER_MOST_CONSTRAINED
+    free = [len(neighbors) for neighbors in adjacent] if ranked else None
+    if ranked:
+        for u in adjacent[start]:
+            free[u] -= 1
+    rng = random.Random(seed) if seed is not None or restart_nodes else None
+    path = [start]
+    prunes = stats.prunes
+    nodes = 0
+    backtracks = 0
+    max_depth = 0
+    limit = restart_nodes or sys.maxsize
+    restarts = 0
+
+    def finish(success):
+        if not success and tracing:
+            trace.record('fail', start_vertex)
+        result = search_result(success, [vertices[i] for i in path] + [start_vertex] if success else None,
+                               trace, nodes, stats)
+        if restart_nodes:
+            result['restarts'] = restarts
+        return result
+
+    # Đi theo tiền tố cho trước; tiền tố không hợp lệ thì nhánh con rỗng
+    for v in (prefix or [])[1:]:
+        i = index.get(v)
+        if i is None or visited[i] or v not in adjacency[vertices[path[-1]]]:
+            stats.prune('dead_end')
+            return finish(False)
+        path.append(i)
+        visited[i] = 1
+        if ranked:
+            for u in adjacent[i]:
+                free[u] -= 1
+        if tracing:
+            trace.record('push', v, len(path) - 1)
+    base = len(path)
+
+    def expand():
+        """Mở nút tìm kiếm tại đỉnh cuối của đường đi.
+
+        Trả về True nếu đường đi đã là chu trình Hamilton, None nếu nút không có
+        nhánh con, ngược lại là iterator qua các đỉnh cần thử.
+        """
+        nonlocal nodes, max_depth
+        nodes += 1
+        depth = len(path) - 1
+        if depth > max_depth:
+            max_depth = depth
+        if control is not None and not nodes & (CHECK_EVERY - 1):
+            stats.tally(nodes, backtracks, max_depth)
+            control.check(nodes, depth, stats)
+        if nodes > limit:
+            raise RestartSearch()
+
+        if len(path) == n:
+            if tracing:
+                trace.record('complete', depth=depth)
+            if start_adjacent[path[-1]]:
+                if tracing:
+                    trace.record('success', depth=depth)
                 return True
             else:
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Không có cạnh từ {path[-1]} về {path[0]} - Không tạo được chu trình"
-                })
-                return False
-        
-        current_vertex = path[-1]
-        neighbors = [v for v in vertices if v not in path and v in adjacency[current_vertex]]
-        
+                prunes['no_close'] = prunes.get('no_close', 0) + 1
+                if tracing:
+                    trace.record('no_close', depth=depth)
+                return None
+
+        # Các đỉnh kề chưa thăm (theo thứ tự đỉnh, hoặc xếp hạng theo order / ngẫu nhiên)
+        current = path[-1]
+        neighbors = [v for v in adjacent[current] if not visited[v]]
+
         if not neighbors:
-            step_count += 1
-            steps.append({
-                'step': step_count,
-                'path': path.copy(),
-                'action': f"Không có đỉnh kề khả dụng từ {current_vertex}"
-            })
-            return False
-        
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': path.copy(),
-            'action': f"Từ {current_vertex}, thử các đỉnh: {', '.join(neighbors)}"
-        })
-        
-        for v in neighbors:
-            path.append(v)
-            is_valid, reason = is_promising(path, v)
-            if is_valid:
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Thêm đỉnh {v} vào đường đi: {' → '.join(path)}"
-                })
-                
-                if branch_and_bound(pos + 1):
+            prunes['dead_end'] = prunes.get('dead_end', 0) + 1
+            if tracing:
+                trace.record('dead_end', vertices[current], depth)
+            return None
+
+        if rng is not None:
+            rng.shuffle(neighbors)
+        forced = None
+        if constrained:
+            # Đỉnh kề v không được đi tới bây giờ thì chỉ còn free[v] đỉnh chưa thăm
+            # (và đỉnh đầu) để vào / ra, nên cần ít nhất 2
+            last = len(path) + 1 == n
+            for v in neighbors:
+                usable = free[v] + start_adjacent[v] + 1
+                if usable < 2:
+                    reason, culprit = 'prune_degree', v
+                elif usable > 2:
+                    continue
+                elif forced is not None or (not free[v] and not last):
+                    reason, culprit = 'prune_forced', v
+                else:
+                    forced = v
+                    continue
+                prunes[reason] = prunes.get(reason, 0) + 1
+                if tracing:
+                    trace.record(reason, vertices[current], depth, vertices[culprit])
+                return None
+        if forced is not None:
+            neighbors = [forced]
+            if tracing:
+                trace.record('forced', vertices[current], depth, vertices[forced])
+        else:
+            if ranked:
+                neighbors.sort(key=free.__getitem__)
+            if tracing:
+                trace.record('try', vertices[current], depth, [vertices[v] for v in neighbors])
+        return iter(neighbors)
+
+    def pop():
+        v = path.pop()
+        visited[v] = 0
+        if ranked:
+            for u in adjacent[v]:
+                free[u] += 1
+        return v
+
+    def backtrack():
+        """Tìm kiếm theo chiều sâu không đệ quy: mỗi nút đang mở trên đường đi có một
+        iterator các đỉnh còn phải thử trong stack, nên độ sâu không bị giới hạn bởi
+        ngăn xếp lời gọi của Python."""
+        nonlocal backtracks
+        outcome = expand()
+        if outcome is True:
+            return True
+        stack = [outcome] if outcome is not None else []
+        while stack:
+            depth = len(path) - 1
+            for v in stack[-1]:
+                path.append(v)
+                visited[v] = 1
+                if ranked:
+                    for u in adjacent[v]:
+                        free[u] -= 1
+                if tracing:
+                    trace.record('push', vertices[v], depth + 1)
+
+                outcome = expand()
+                if outcome is True:
                     return True
-                
+                if outcome is not None:
+                    stack.append(outcome)
+                    break
+
                 # Backtrack
-                path.pop()
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Quay lui: Loại bỏ {v}, quay về {' → '.join(path) if path else 'rỗng'}"
-                })
+                pop()
+                backtracks += 1
+                if tracing:
+                    trace.record('pop', vertices[v], depth)
             else:
-                path.pop()
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Loại bỏ {v} vì: {reason}"
-                })
-        
+                # Đã thử hết các đỉnh của nút: quay lui khỏi đỉnh cuối
+                stack.pop()
+                if stack:
+                    v = pop()
+                    backtracks += 1
+                    if tracing:
+                        trace.record('pop', vertices[v], depth - 1)
         return False
 
-    success = branch_and_bound(1)
-    
-    if not success and step_count > 1:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': f"Kết luận: Đã thử tất cả khả năng từ đỉnh {start_vertex} - Không tồn tại chu trình Hamilton"
-        })
-    
-    result_path = path + [path[0]] if success else None
-    
-    return {
-        'success': success,
-        'path': result_path,
-        'steps': steps,
-        'total_steps': step_count
-    }
-
-def hamiltonian_cycle_brute_force(graph, start_vertex=None):
-    """Tìm chu trình Hamilton bằng Brute Force (hoán vị) với chi tiết các bước"""
-    vertices = [v[0] for v in graph.vertices]
-    if len(vertices) == 0:  
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị rỗng - không có đỉnh nào'}],
-            'total_steps': 1
-        }
-    
-    if len(vertices) == 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [vertices[0]], 'action': 'Đồ thị chỉ có 1 đỉnh - không thể tạo chu trình'}],
-            'total_steps': 1
-        }
-    
-    adjacency = {v: set() for v in vertices}
-    for u, v in graph.edges:
-        adjacency[u].add(v)
-        adjacency[v].add(u)
-
-    # Kiểm tra đồ thị liên thông
-    if connected_components(graph)[0] > 1:
-        return {
-            'success': False,
-            'path': None,
-            'steps': [{'step': 1, 'path': [], 'action': 'Đồ thị không liên thông - không thể có chu trình Hamilton'}],
-            'total_steps': 1
-        }
-    
-    # Kiểm tra điều kiện cần thiết (đỉnh cô lập)
-    # isolated_vertices = [v for v in vertices if len(adjacency[v]) == 0]
-    # if isolated_vertices:
-    #     return {
-    #         'success': False,
-    #         'path': None,
-    #         'steps': [
-    #             {'step': 1, 'path': [], 'action': f'Có đỉnh cô lập: {", ".join(isolated_vertices)}'},
-    #             {'step': 2, 'path': [], 'action': 'Không thể tạo chu trình Hamilton với đỉnh cô lập'}
-    #         ],
-    #         'total_steps': 2
-    #     }
+    while True:
+        try:
+            success = backtrack()
+            break
+        except RestartSearch:
+            # Bỏ phần đường đi sau tiền tố rồi thử lại với thứ tự ngẫu nhiên mới
+            while len(path) > base:
+                pop()
+            restarts += 1
+            limit = nodes + restart_nodes * (1 << restarts)
+            if tracing:
+                trace.record('info', depth=base - 1, detail=f"Khởi động lại lần {restarts} sau {nodes} nút với thứ tự ngẫu nhiên mới (thêm tối đa {limit - nodes} nút)")
+        except SearchCancelled as stop:
+            stats.tally(nodes, backtracks, max_depth)
+            result = stopped_result(trace, nodes, stop, stats)
+            if restart_nodes:
+                result['restarts'] = restarts
+            return result
+    stats.tally(nodes, backtracks, max_depth)
+    return finish(success)
+
+def hamiltonian_cycle_branch_and_bound(graph, start_vertex=None, trace=None, control=None, prefix=None):
+    """Tìm chu trình Hamilton bằng Branch and Bound với chi tiết các bước.
+
+    Tập đỉnh chưa thăm và số đỉnh kề chưa thăm của từng đỉnh được cập nhật dần
+    khi thêm/bớt đỉnh trên đường đi. Mỗi nút tìm kiếm áp dụng các luật cắt nhánh:
+      - đỉnh cuối không còn đỉnh kề chưa thăm (prune_dead_end)
+      - một đỉnh chưa thăm còn ít hơn 2 đỉnh kề khả dụng (prune_degree)
+      - mâu thuẫn cạnh bắt buộc qua các đỉnh chỉ còn 2 đỉnh kề (prune_forced);
+        nếu chỉ có một đỉnh như vậy kề đỉnh cuối thì bắt buộc đi tới đỉnh đó
+      - phần đồ thị còn lại (cùng đỉnh đầu, đỉnh cuối) không liên thông hoặc
+        có đỉnh khớp / cầu (prune_disconnected, prune_cut)
+    Số lần cắt theo từng luật được trả về trong result['prunes'] (cùng dict với
+    result['stats'].prunes).
+
+    trace: chế độ ghi vết các bước, xem StepTrace.from_policy
+    control: SearchControl để hủy / giới hạn thời gian / báo tiến độ (tùy chọn)
+    prefix: đường đi ban đầu (bắt đầu bằng đỉnh xuất phát), chỉ tìm trong nhánh con của nó
+    """
+    trace = StepTrace.from_policy(trace)
+    if prefix:
+        start_vertex = prefix[0]
+    stats = SearchStats()
+    early, context = begin_search(graph, start_vertex, trace, "Nhánh cận", stats)
+    if early:
+        return early
+    vertices, adjacency, start_vertex = context
+
+    tracing = trace.active
+    n = len(vertices)
+    path = [start_vertex]
+    nodes = 0
+    backtracks = 0
+    max_depth = 0
+    prunes = stats.prunes
+
+    # Đỉnh kề (bỏ khuyên) theo thứ tự đỉnh để kết quả ổn định
+    adjacent = graph.analysis().ordered_adjacency
+    remaining = set(vertices)
+    remaining.discard(start_vertex)
+    # free[v]: số đỉnh kề chưa thăm của v
+    free = {v: sum(1 for u in adjacent[v] if u in remaining) for v in vertices}
+    start_adjacent = set(adjacent[start_vertex])
+
+    def usable(u, end):
+        """Số đỉnh kề khả dụng của đỉnh chưa thăm u: đỉnh chưa thăm, đỉnh đầu và đỉnh cuối"""
+        count = free[u]
+        if u in start_adjacent:
+            count += 1
+        if end != start_vertex and end in adjacency[u]:
+            count += 1
+        return count
 
-    # Nếu không có đỉnh bắt đầu được chỉ định, chọn đỉnh đầu tiên
-    start_vertex = start_vertex if start_vertex in vertices else vertices[0]
-    steps = []
-    step_count = 0
+    def push(v):
+        remaining.discard(v)
+        for u in adjacent[v]:
+            free[u] -= 1
+        path.append(v)
+
+    def pop():
+        v = path.pop()
+        remaining.add(v)
+        for u in adjacent[v]:
+            free[u] += 1
+        return v
+
+    def neighbors_in_rest(x, end):
+        """Đỉnh kề của x trong đồ thị còn lại, thêm cạnh ảo nối đỉnh cuối với đỉnh đầu"""
+        for y in adjacent[x]:
+            if y in remaining:
+                yield y
+        if x in remaining:
+            if end != start_vertex and end in adjacency[x]:
+                yield end
+            if x in start_adjacent:
+                yield start_vertex
+        elif end != start_vertex:
+            yield start_vertex if x == end else end
+
+    def find_cut(end):
+        """Tìm đỉnh khớp trong đồ thị còn lại bằng DFS không đệ quy (Tarjan).
+
+        Trả về (loại lý do, đỉnh) hoặc None nếu đồ thị còn lại 2-liên thông.
+        """
+        total = len(remaining) + (1 if end == start_vertex else 2)
+        if total < 3:
+            return None
+        disc = {end: 0}
+        low = {end: 0}
+        counter = 1
+        root_children = 0
+        stack = [(end, None, neighbors_in_rest(end, end))]
+        while stack:
+            x, parent, it = stack[-1]
+            for y in it:
+                if y == parent:
+                    continue
+                if y in disc:
+                    if disc[y] < low[x]:
+                        low[x] = disc[y]
+                else:
+                    disc[y] = low[y] = counter
+                    counter += 1
+                    stack.append((y, x, neighbors_in_rest(y, end)))
+                    break
+            else:
+                stack.pop()
+                if stack:
+                    p = stack[-1][0]
+                    if low[x] < low[p]:
+                        low[p] = low[x]
+                    if p == end:
+                        root_children += 1
+                    elif low[x] >= disc[p]:
+                        return 'prune_cut', p
+        if len(disc) < total:
+            return 'prune_disconnected', None
+        if root_children > 1:
+            return 'prune_cut', end
+        return None
+
+    def check(old_end):
+        """Kiểm tra nút sau khi thêm đỉnh cuối mới.
+
+        Trả về (lý do, đỉnh liên quan, đỉnh bắt buộc kế tiếp); lý do là None nếu hợp lệ.
+        """
+        end = path[-1]
+        if not remaining:
+            if end not in start_adjacent:
+                return 'prune_no_return', None, None
+            return None, None, None
+        if free[end] == 0:
+            return 'prune_dead_end', None, None
+        if n < 3:
+            return None, None, None
+
+        # Chỉ các đỉnh kề với đỉnh cuối cũ có thể bị giảm số đỉnh kề khả dụng
+        if old_end != start_vertex:
+            for u in adjacent[old_end]:
+                if u in remaining and usable(u, end) < 2:
+                    return 'prune_degree', u, None
+
+        # Đỉnh chưa thăm chỉ còn 2 đỉnh kề khả dụng kề với đỉnh cuối phải là đỉnh kế tiếp
+        forced = None
+        for u in adjacent[end]:
+            if u in remaining and usable(u, end) == 2:
+                if forced is not None:
+                    return 'prune_forced', u, None
+                if u in start_adjacent and len(remaining) > 1:
+                    return 'prune_forced', u, None
+                forced = u
+        # Đỉnh đầu chỉ còn một cạnh trống để khép chu trình
+        closing = 0
+        for u in adjacent[start_vertex]:
+            if u in remaining and usable(u, end) == 2:
+                closing += 1
+                if closing > 1:
+                    return 'prune_forced', u, None
+
+        cut = find_cut(end)
+        if cut:
+            return cut[0], cut[1], None
+        return None, None, forced
+
+    def expand(forced):
+        """Mở nút tìm kiếm tại đỉnh cuối của đường đi.
+
+        Trả về True nếu đường đi đã là chu trình Hamilton, None nếu nút không có
+        nhánh con, ngược lại là iterator qua các đỉnh cần thử.
+        """
+        nonlocal nodes, max_depth
+        nodes += 1
+        depth = len(path) - 1
+        if depth > max_depth:
+            max_depth = depth
+        if control is not None and not nodes & (CHECK_EVERY - 1):
+            stats.tally(nodes, backtracks, max_depth)
+            control.check(nodes, depth, stats)
+        current_vertex = path[-1]
 
-    
+        if not remaining:
+            if tracing:
+                trace.record('complete', depth=depth)
+            if current_vertex in start_adjacent:
+                if tracing:
+                    trace.record('success', depth=depth)
+                return True
+            else:
+                prunes['no_close'] = prunes.get('no_close', 0) + 1
+                if tracing:
+                    trace.record('no_close', depth=depth)
+                return None
+
+        if forced is not None:
+            neighbors = [forced]
+            if tracing:
+                trace.record('forced', current_vertex, depth, forced)
+        else:
+            neighbors = [v for v in adjacent[current_vertex] if v in remaining]
+            if not neighbors:
+                prunes['dead_end'] = prunes.get('dead_end', 0) + 1
+                if tracing:
+                    trace.record('dead_end', current_vertex, depth)
+                return None
+            if tracing:
+                trace.record('try', current_vertex, depth, neighbors)
+        return iter(neighbors)
+
+    def branch_and_bound(forced):
+        """Tìm kiếm theo chiều sâu không đệ quy: mỗi nút đang mở trên đường đi có một
+        iterator các đỉnh còn phải thử trong stack, nên độ sâu không bị giới hạn bởi
+        ngăn xếp lời gọi của Python."""
+        nonlocal backtracks
+        outcome = expand(forced)
+        if outcome is True:
+            return True
+        stack = [outcome] if outcome is not None else []
+        while stack:
+            depth = len(path) - 1
+            current_vertex = path[-1]
+            for v in stack[-1]:
+                push(v)
+                reason, culprit, next_forced = check(current_vertex)
+                if reason is None:
+                    if tracing:
+                        trace.record('push', v, depth + 1)
+                    outcome = expand(next_forced)
+                    if outcome is True:
+                        return True
+                    if outcome is not None:
+                        stack.append(outcome)
+                        break
+
+                    # Backtrack
+                    pop()
+                    backtracks += 1
+                    if tracing:
+                        trace.record('pop', v, depth)
+                else:
+                    pop()
+                    prunes[reason] = prunes.get(reason, 0) + 1
+                    if tracing:
+                        trace.record(reason, v, depth, culprit)
+            else:
+                # Đã thử hết các đỉnh của nút: quay lui khỏi đỉnh cuối
+                stack.pop()
+                if stack:
+                    v = pop()
+                    backtracks += 1
+                    if tracing:
+                        trace.record('pop', v, depth - 1)
+        return False
 
-    # Kiểm tra định lý Dirac và Ore
-    dirac_valid, dirac_msg = check_dirac_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': dirac_msg
-    })
-
-    ore_valid, ore_msg = check_ore_condition(graph)
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': ore_msg
-    })
-
-    if dirac_valid or ore_valid:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Vì thỏa ít nhất một định lý đủ (Dirac hoặc Ore), tồn tại chu trình Hamilton. Đang tìm...'
-        })
+    def follow_prefix():
+        """Đi theo tiền tố cho trước, áp dụng các luật cắt nhánh như khi tìm kiếm.
+
+        Trả về (tiền tố hợp lệ, đỉnh bắt buộc kế tiếp).
+        """
+        forced = None
+        for v in (prefix or [])[1:]:
+            old_end = path[-1]
+            if v not in remaining or v not in adjacency[old_end]:
+                reason, culprit = 'prune_dead_end', None
+            elif forced is not None and v != forced:
+                reason, culprit = 'prune_forced', forced
+            else:
+                push(v)
+                reason, culprit, forced = check(old_end)
+                if reason is None:
+                    if tracing:
+                        trace.record('push', v, len(path) - 1)
+                    continue
+                pop()
+            prunes[reason] = prunes.get(reason, 0) + 1
+            if tracing:
+                trace.record(reason, v, len(path) - 1, culprit)
+            return False, None
+        return True, forced
+
+    # Kiểm tra ban đầu: mọi đỉnh cần ít nhất 2 đỉnh kề, đồ thị không có đỉnh khớp
+    root_failure = None
+    if n >= 3:
+        weak = next((u for u in vertices if u != start_vertex and usable(u, start_vertex) < 2), None)
+        if weak is not None or len(adjacent[start_vertex]) < 2:
+            root_failure = ('prune_degree', weak if weak is not None else start_vertex)
+        else:
+            root_failure = find_cut(start_vertex)
+
+    if root_failure:
+        reason, culprit = root_failure
+        prunes[reason] = prunes.get(reason, 0) + 1
+        if tracing:
+            if reason == 'prune_degree':
+                trace.record('info', depth=0, detail=f"Đỉnh {culprit} có ít hơn 2 đỉnh kề - không thể có chu trình Hamilton")
+            elif reason == 'prune_cut':
+                trace.record('info', depth=0, detail=f"Đỉnh {culprit} là đỉnh khớp của đồ thị - không thể có chu trình Hamilton")
+            else:
+                trace.record('info', depth=0, detail="Đồ thị không liên thông - không thể có chu trình Hamilton")
+        success = False
     else:
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': [],
-            'action': 'Không thỏa các định lý đủ Dirac hoặc Ore, nhưng chu trình có thể vẫn tồn tại. Thử tìm bằng thuật toán.'
-        })
-    # Bước khởi tạo
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [start_vertex],
-        'action': f"Khởi tạo (Brute Force): Bắt đầu từ đỉnh {start_vertex}"
-    })
-    # Tạo tất cả hoán vị của các đỉnh còn lại
+        valid, forced = follow_prefix()
+        try:
+            success = valid and branch_and_bound(forced)
+        except SearchCancelled as stop:
+            stats.tally(nodes, backtracks, max_depth)
+            result = stopped_result(trace, nodes, stop, stats)
+            result['prunes'] = prunes
+            return result
+        stats.tally(nodes, backtracks, max_depth)
+
+    if not success and tracing:
+        trace.record('fail', start_vertex)
+
+    result_path = path + [path[0]] if success else None
+    result = search_result(success, result_path, trace, nodes, stats)
+    result['prunes'] = prunes
+    return result
+
+def permutation_stream(start_vertex, remaining_vertices, adjacency):
+    """Sinh lười các hoán vị của remaining_vertices nối sau start_vertex.
+
+    Chỉ giữ một đường đi và một ngăn xếp iterator (bộ nhớ O(n)). Tiền tố nào
+    chứa cạnh không tồn tại bị loại ngay, và mỗi chu trình chỉ được sinh một lần:
+    đỉnh đầu cố định là start_vertex (bỏ phép xoay) và đỉnh thứ hai phải đứng
+    trước đỉnh cuối trong remaining_vertices (bỏ phép lấy đối xứng).
+
+    Sinh ra các bộ (sự kiện, đường đi, đỉnh):
+      ('extend', đường đi, v)     - v vừa được nối vào cuối đường đi
+      ('missing', tiền tố, v)     - không có cạnh từ cuối tiền tố đến v
+      ('complete', hoán vị, None) - một hoán vị đầy đủ, hợp lệ theo các cạnh liên tiếp
+    Danh sách đường đi được dùng lại giữa các lần sinh, cần sao chép nếu muốn lưu.
+    """
+    order = {v: i for i, v in enumerate(remaining_vertices)}
+    n = len(remaining_vertices) + 1
+    path = [start_vertex]
+    used = set()
+    stack = [iter(remaining_vertices)]
+    while stack:
+        for v in stack[-1]:
+            if v in used:
+                continue
+            if v not in adjacency[path[-1]]:
+                yield 'missing', path, v
+                continue
+            if len(path) == n - 1:
+                # Đỉnh cuối: chỉ nhận một trong hai chiều của cùng một chu trình
+                if n > 2 and order[path[1]] > order[v]:
+                    continue
+                path.append(v)
+                yield 'extend', path, v
+                yield 'complete', path, None
+                path.pop()
+                continue
+            path.append(v)
+            used.add(v)
+            yield 'extend', path, v
+            stack.append(iter(remaining_vertices))
+            break
+        else:
+            stack.pop()
+            if len(path) > 1:
+                used.discard(path.pop())
+
+
+def hamiltonian_cycle_brute_force(graph, start_vertex=None, trace=None, control=None):
+    """Tìm chu trình Hamilton bằng Brute Force (hoán vị) với chi tiết các bước.
+
+    trace: chế độ ghi vết các bước, xem StepTrace.from_policy
+    control: SearchControl để hủy / giới hạn thời gian / báo tiến độ (tùy chọn)
+    """
+    trace = StepTrace.from_policy(trace)
+    stats = SearchStats()
+    early, context = begin_search(graph, start_vertex, trace, "Brute Force", stats)
+    if early:
+        return early
+    vertices, adjacency, start_vertex = context
+
+    tracing = trace.active
+    nodes = 0
+    max_depth = 0
+    missing = 0
+    no_close = 0
+
+    def tally(depth):
+        # Mỗi đỉnh được nối vào đều bị bỏ ra khi quay lui, trừ các đỉnh còn trên đường đi
+        stats.tally(nodes, nodes - depth, max_depth)
+        if missing:
+            stats.prunes['perm_missing'] = missing
+        if no_close:
+            stats.prunes['perm_no_close'] = no_close
+
+    # Sinh lần lượt các hoán vị của các đỉnh còn lại (không lưu toàn bộ)
     remaining_vertices = [v for v in vertices if v != start_vertex]
-    permutations = list(itertools.permutations(remaining_vertices))
-
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [start_vertex],
-        'action': f"Tạo tất cả hoán vị của các đỉnh còn lại: {', '.join(remaining_vertices)}"
-    })
-
-    # Kiểm tra từng hoán vị
-    for perm in permutations:
-        path = [start_vertex] + list(perm)
-        step_count += 1
-        steps.append({
-            'step': step_count,
-            'path': path.copy(),
-            'action': f"Kiểm tra hoán vị: {' → '.join(path)}"
-        })
-
-        is_valid = True
-        # Kiểm tra các cạnh liên tiếp
-        for i in range(len(path) - 1):
-            if path[i+1] not in adjacency[path[i]]:
-                is_valid = False
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Hoán vị không hợp lệ: Không có cạnh từ {path[i]} đến {path[i+1]}"
-                })
-                break
-        
-        if is_valid:
-            # Kiểm tra cạnh từ đỉnh cuối về đỉnh đầu
-            if path[0] in adjacency[path[-1]]:
-                step_count += 1
-                final_path = path + [path[0]]
-                steps.append({
-                    'step': step_count,
-                    'path': final_path,
-                    'action': f"Thành công! Có cạnh từ {path[-1]} về {path[0]}\nChu trình Hamilton là: {' → '.join(final_path)}"
-                })
-                return {
-                    'success': True,
-                    'path': final_path,
-                    'steps': steps,
-                    'total_steps': step_count
-                }
-            else:
-                step_count += 1
-                steps.append({
-                    'step': step_count,
-                    'path': path.copy(),
-                    'action': f"Hoán vị không hợp lệ: Không có cạnh từ {path[-1]} về {path[0]}"
-                })
+    if tracing:
+        trace.record('info', depth=0, detail=f"Sinh lần lượt các hoán vị của các đỉnh còn lại: {', '.join(remaining_vertices)} (bỏ qua hoán vị đối xứng)")
+
+    # Kiểm tra từng hoán vị ngay khi được sinh ra
+    for event, path, v in permutation_stream(start_vertex, remaining_vertices, adjacency):
+        depth = len(path) - 1
+        if event == 'extend':
+            nodes += 1
+            if depth > max_depth:
+                max_depth = depth
+            if tracing:
+                trace.advance(v, depth)
+            if control is not None and not nodes & (CHECK_EVERY - 1):
+                tally(depth)
+                try:
+                    control.check(nodes, depth, stats)
+                except SearchCancelled as stop:
+                    return stopped_result(trace, nodes, stop, stats)
+            continue
+        if event == 'missing':
+            missing += 1
+            if tracing:
+                trace.record('perm_missing', v, depth)
+            continue
+
+        if tracing:
+            trace.record('perm_check', depth=depth)
+
+        # Kiểm tra cạnh từ đỉnh cuối về đỉnh đầu
+        if path[0] in adjacency[path[-1]]:
+            tally(depth)
+            if tracing:
+                trace.record('success', depth=depth)
+            return search_result(True, path + [path[0]], trace, nodes, stats)
+        else:
+            no_close += 1
+            if tracing:
+                trace.record('perm_no_close', depth=depth)
 
     # Nếu không tìm thấy chu trình Hamilton
-    step_count += 1
-    steps.append({
-        'step': step_count,
-        'path': [],
-        'action': f"Kết luận: Đã thử tất cả hoán vị từ đỉnh {start_vertex} - Không tồn tại chu trình Hamilton"
-    })
-
-    return {
-        'success': False,
-        'path': None,
-        'steps': steps,
-        'total_steps': step_count
-    }
-
+    tally(0)
+    if tracing:
+        trace.record('perm_fail', start_vertex)
+    return search_result(False, None, trace, nodes, stats)
+
+
+# Giới hạn số đỉnh cho quy hoạch động: bảng trạng thái có 2^(n-1) phần tử.
+# Mỗi đỉnh thêm gấp hơn đôi thời gian và bộ nhớ; với đồ thị dày mất khoảng 1-7 giây
+# ở 20 đỉnh và 5-30 giây ở 22 đỉnh (25 đỉnh: vài phút, bảng 64 MB)
+DP_MAX_VERTICES = 22
+# Trên số đỉnh này giao diện hỏi lại trước khi chạy quy hoạch động
+DP_WARN_VERTICES = 20
+
+
+def hamiltonian_cycle_dp(graph, start_vertex=None, trace=None, control=None):
+    """Tìm chu trình Hamilton bằng quy hoạch động trên tập con (Held-Karp, trạng thái bitmask).
+
+    trace: chế độ ghi vết các bước, xem StepTrace.from_policy
+    control: SearchControl để hủy / giới hạn thời gian / báo tiến độ (tùy chọn)
+
+    Ném ValueError nếu đồ thị có nhiều hơn DP_MAX_VERTICES đỉnh: không chạy được thì
+    không thể kết luận có hay không có chu trình.
+    """
+    num_vertices = len(graph.vertices)
+    if num_vertices > DP_MAX_VERTICES:
+        raise ValueError(f"Quy hoạch động chỉ hỗ trợ tối đa {DP_MAX_VERTICES} đỉnh (đồ thị có {num_vertices} đỉnh)")
+    trace = StepTrace.from_policy(trace)
+    stats = SearchStats()
+
+    early, context = begin_search(graph, start_vertex, trace, "Quy hoạch động", stats)
+    if early:
+        return early
+    vertices, adjacency, start_vertex = context
+    tracing = trace.active
+
+    # Đánh số các đỉnh còn lại 0..m-1; đỉnh bắt đầu không nằm trong mặt nạ.
+    # Bitset dùng chung (theo chỉ số đỉnh của đồ thị) được bỏ đi bit của đỉnh bắt đầu
+    analysis = graph.analysis()
+    s = analysis.index[start_vertex]
+    others = vertices[:s] + vertices[s + 1:]
+    m = len(others)
+    below = (1 << s) - 1
+    rows = [(row & below) | (row >> (s + 1) << s) for row in analysis.rows]
+    start_row = rows.pop(s)
+
+    # ends[mask]: bitset các đỉnh cuối j sao cho có đường đi từ đỉnh bắt đầu
+    # qua đúng tập đỉnh mask và kết thúc tại j
+    full = (1 << m) - 1
+    ends = array('I', bytes(4 * (full + 1)))
+    bit = start_row
+    while bit:
+        low = bit & -bit
+        ends[low] = low
+        bit ^= low
+
+    if tracing:
+        trace.record('info', depth=0, detail=f"Lập bảng trạng thái cho {full + 1} tập con của {m} đỉnh còn lại, các đỉnh kề {start_vertex}: {', '.join(others[i] for i in range(m) if start_row >> i & 1) or 'không có'}")
+
+    states = 0
+    for mask in range(1, full + 1):
+        if control is not None and not mask & (CHECK_EVERY - 1):
+            stats.nodes = states
+            try:
+                control.check(states, bin(mask).count("1"), stats)
+            except SearchCancelled as stop:
+                return stopped_result(trace, states, stop, stats)
+        current = ends[mask]
+        if not current:
+            continue
+        while current:
+            low = current & -current
+            current ^= low
+            states += 1
+            candidates = rows[low.bit_length() - 1] & ~mask
+            while candidates:
+                nxt = candidates & -candidates
+                candidates ^= nxt
+                ends[mask | nxt] |= nxt
+
+    if tracing:
+        trace.record('info', depth=0, detail=f"Đã duyệt {states} trạng thái (tập đỉnh, đỉnh cuối) đạt được")
+
+    closing = ends[full] & start_row
+    if not closing:
+        # Độ sâu lớn nhất: số đỉnh của tập lớn nhất có đường đi (compress bỏ qua các tập không đạt)
+        stats.max_depth = max((bin(mask).count("1") for mask in compress(range(full + 1), ends)), default=0)
+        if tracing:
+            trace.record('info', detail=f"Kết luận: Không có đường đi qua tất cả các đỉnh từ {start_vertex} quay về {start_vertex} - Không tồn tại chu trình Hamilton")
+        return search_result(False, None, trace, states, stats)
+
+    # Truy vết ngược từ tập đầy đủ để dựng lại đường đi
+    last = (closing & -closing).bit_length() - 1
+    reverse_path = [last]
+    mask = full
+    while mask != 1 << last:
+        mask ^= 1 << last
+        prev = ends[mask] & rows[last]
+        last = (prev & -prev).bit_length() - 1
+        reverse_path.append(last)
+    path = [start_vertex] + [others[i] for i in reversed(reverse_path)]
+
+    if tracing:
+        for depth, v in enumerate(path):
+            trace.advance(v, depth)
+        depth = len(path) - 1
+        trace.record('info', depth=depth, detail=f"Truy vết từ tập đầy đủ: {' → '.join(path)}")
+        trace.record('success', depth=depth)
+
+    stats.max_depth = m
+    return search_result(True, path + [start_vertex], trace, states, stats)
@@ -0,0 +1,57 @@
+from functools import cached_property
+
+
+class GraphAnalysis:
+    """Dữ liệu phân tích cấu trúc đồ thị dùng chung cho các kiểm tra và giải thuật.
+
+    Lấy qua Graph.analysis(): mỗi topology_version chỉ tạo một đối tượng, và mỗi
+    trường chỉ được tính ở lần dùng đầu tiên, nên kiểm tra Dirac / Ore, kiểm tra liên
+    thông và các giải thuật trong cùng một lần chạy không dựng lại cùng dữ liệu.
+    Đối tượng chỉ đúng cho phiên bản cấu trúc lúc tạo (version); Graph tạo đối tượng
+    mới sau mỗi lần thêm / xóa đỉnh, cạnh. Mọi trường đều chỉ đọc.
+    """
+
+    def __init__(self, graph):
+        self.version = graph.topology_version
+        # Tên đỉnh theo thứ tự trong đồ thị
+        self.vertices = graph.vertex_names()
+        # Tên đỉnh -> tập đỉnh kề (danh sách kề của Graph)
+        self.adjacency = graph.get_adjacency()
+
+    @cached_property
+    def index(self):
+        """Tên đỉnh -> chỉ số trong vertices"""
+        return {v: i for i, v in enumerate(self.vertices)}
+
+    @cached_property
+    def degrees(self):
+        """Bậc của từng đỉnh theo chỉ số (số đỉnh kề)"""
+        adjacency = self.adjacency
+        return [len(adjacency[v]) for v in self.vertices]
+
+    @cached_property
+    def ordered_adjacency(self):
+        """Tên đỉnh -> danh sách đỉnh kề theo thứ tự đỉnh, bỏ khuyên (kết quả tìm kiếm ổn định)"""
+        index = self.index
+        return {v: sorted((u for u in self.adjacency[v] if u != v), key=index.__getitem__)
+                for v in self.vertices}
+
+    @cached_property
+    def neighbor_indices(self):
+        """Chỉ số các đỉnh kề của từng đỉnh theo chỉ số, theo thứ tự đỉnh, bỏ khuyên"""
+        index = self.index
+        ordered = self.ordered_adjacency
+        return [[index[u] for u in ordered[v]] for v in self.vertices]
+
+    @cached_property
+    def rows(self):
+        """Danh sách kề dạng bitset: rows[i] bật bit j nếu vertices[i] kề vertices[j] (bỏ khuyên)"""
+        index = self.index
+        rows = []
+        for v in self.vertices:
+            row = 0
+            for u in self.adjacency[v]:
+                if u != v:
+                    row |= 1 << index[u]
+            rows.append(row)
+        return rows
@@ -1,9 +1,51 @@
-from math import hypot
-from copy import deepcopy
+from math import hypot, sqrt
 from PyQt5.QtWidgets import QWidget, QInputDialog, QPushButton
 from PyQt5.QtCore import Qt, QRect, QPointF
-from PyQt5.QtGui import QPainter, QBrush, QColor, QPen, QPainterPath
+from PyQt5.QtGui import QPainter, QBrush, QColor, QPen, QPainterPath, QPixmap, QFont
 import random  
+from graph import Point
+from spatial_grid import SpatialGrid
+from history import History
+
+# Bán kính đỉnh khi vẽ
+VERTEX_RADIUS = 20
+# Lề cộng thêm vào hình bao để tính cả độ dày bút (bút dày nhất là 5)
+PEN_MARGIN = 4
+# Khuyên (cạnh từ một đỉnh về chính nó) vẽ bằng đường cong bậc ba với điểm điều khiển
+# (x ± 60, y - 60): đường cong lệch tối đa 10·√3 theo chiều ngang và 45 lên trên
+LOOP_HALF_WIDTH = 10 * sqrt(3)
+LOOP_HEIGHT = 45
+
+
+def to_qpoint(point):
+    """Tọa độ của Graph (Point) -> QPointF để vẽ / tính toán hình học bằng Qt"""
+    return QPointF(point.x, point.y)
+
+
+def to_point(qpoint):
+    """Vị trí chuột (QPoint/QPointF) -> Point để lưu vào Graph"""
+    return Point(qpoint.x(), qpoint.y())
+
+
+def bezier_extent(p0, c, p2):
+    """Khoảng giá trị (nhỏ nhất, lớn nhất) của đường cong Bézier bậc hai theo một trục"""
+    lo, hi = min(p0, p2), max(p0, p2)
+    denom = p0 - 2 * c + p2
+    if denom != 0:
+        # Điểm cực trị: đạo hàm 2(1-t)(c-p0) + 2t(p2-c) bằng 0
+        t = (p0 - c) / denom
+        if 0 < t < 1:
+            v = (1 - t) ** 2 * p0 + 2 * (1 - t) * t * c + t ** 2 * p2
+            lo, hi = min(lo, v), max(hi, v)
+    return lo, hi
+
+
+def box_rect(box):
+    """Hình bao (x0, y0, x1, y1) -> QRect (làm tròn ra ngoài) để yêu cầu vẽ lại một vùng"""
+    x0, y0, x1, y1 = box
+    left, top = int(x0) - 1, int(y0) - 1
+    return QRect(left, top, int(x1) + 2 - left, int(y1) + 2 - top)
+
 
 class GraphArea(QWidget):
     def __init__(self, graph, mode_getter, parent=None):
@@ -20,8 +62,8 @@ class GraphArea(QWidget):
         self.area_selected_edges = []
         self.last_mouse_pos = None
 
-        self.undo_stack = []
-        self.redo_stack = []
+        # Lịch sử hoàn tác dạng delta: Graph tự báo các thay đổi cho History
+        self.history = History(graph)
 
         self.selected_control_point = None
         self.dragging_control_point = False
@@ -54,6 +96,18 @@ class GraphArea(QWidget):
         self.component_colors = None
         self.vertex_to_component = None
 
+        # Bộ đệm vẽ: chỉ mục không gian của đỉnh / cạnh và lớp tĩnh (QPixmap) chứa
+        # các phần tử không bị kéo; chỉ các phần tử đang kéo được vẽ lại ở mỗi khung hình
+        self.scene_grid = SpatialGrid()
+        self._scene_version = None
+        self._static_layer = None
+        self._static_key = None
+        # Tăng khi màu tô (đường đi Hamilton, miền liên thông) thay đổi
+        self._style_version = 0
+        self.hamilton_vertices = set()
+        self.hamilton_edges = set()
+        self.build_palette()
+
         # Nút kết nối
         self.btn_next_step.clicked.connect(self.show_next_step)
         self.btn_prev_step.clicked.connect(self.show_prev_step)
@@ -70,7 +124,7 @@ class GraphArea(QWidget):
 
     def clear_hamilton_visualization(self):
         """Xóa tất cả thông tin về đường đi Hamilton"""
-        self.hamilton_path = None
+        self.set_hamilton_path(None)
         self.current_step_index = -1
         self.hamilton_steps = []
         self.btn_next_step.setVisible(False)
@@ -81,7 +135,7 @@ class GraphArea(QWidget):
 
     def set_hamilton_visualization(self, path):
         """Cài đặt đường đi Hamilton"""
-        self.hamilton_path = path
+        self.set_hamilton_path(path)
         self.current_step_index = -1
         self.hamilton_steps = []
         self.btn_next_step.setVisible(False)
@@ -109,19 +163,20 @@ class GraphArea(QWidget):
 
     def show_next_step(self):
         """Hiển thị bước kế tiếp của giải thuật"""
-        if self.current_step_index < len(self.hamilton_steps) - 1:
-            self.current_step_index += 1
-            self.hamilton_path = self.hamilton_steps[self.current_step_index]['path']
-            self.update()
-            self.parent().update_step_display(self.current_step_index)
+        self.show_step(self.current_step_index + 1)
 
     def show_prev_step(self):
         """Hiển thị bước quay lại của giải thuật"""
         if self.current_step_index > 0:
-            self.current_step_index -= 1
-            self.hamilton_path = self.hamilton_steps[self.current_step_index]['path']
+            self.show_step(self.current_step_index - 1)
+
+    def show_step(self, index):
+        """Hiển thị bước thứ index của giải thuật (nhảy tới bước từ nhật ký các bước)"""
+        if 0 <= index < len(self.hamilton_steps) and index != self.current_step_index:
+            self.current_step_index = index
+            self.set_hamilton_path(self.hamilton_steps.path_at(index))
             self.update()
-            self.parent().update_step_display(self.current_step_index)
+            self.parent().update_step_display(index)
 
     def exit_step_mode(self):
         """Thoát chế độ từng bước"""
@@ -130,6 +185,10 @@ class GraphArea(QWidget):
 
     def stop_algorithm(self):
         """Dừng chế độ hiện tại: tô màu liên thông hoặc thuật toán Hamilton"""
+        # Giải thuật đang chạy trên luồng riêng: yêu cầu hủy
+        if self.parent().cancel_algorithm():
+            return
+
         if self.component_colors is not None:
             self.clear_components()
             self.btn_stop.setVisible(False)
@@ -140,18 +199,20 @@ class GraphArea(QWidget):
         self.clear_hamilton_visualization()
         self.parent().result_output.setPlainText("Đã dừng thuật toán.")
 
+    def set_hamilton_path(self, path):
+        """Đặt đường đi cần tô màu, kèm tập đỉnh / cạnh của nó để tra cứu O(1) khi vẽ"""
+        self.hamilton_path = path
+        self.hamilton_vertices = set(path) if path else set()
+        self.hamilton_edges = set()
+        if path:
+            for a, b in zip(path, path[1:]):
+                self.hamilton_edges.add((a, b))
+                self.hamilton_edges.add((b, a))
+        self._style_version += 1
+
     def is_edge_in_hamilton_path(self, edge_start, edge_end):
         """Kiểm tra xem cạnh có nằm trong đường đi Hamilton hay không"""
-        if not self.hamilton_path or len(self.hamilton_path) < 2:
-            return False
-        
-        for i in range(len(self.hamilton_path) - 1):
-            path_start = self.hamilton_path[i]
-            path_end = self.hamilton_path[i + 1]
-            if (edge_start == path_start and edge_end == path_end) or \
-               (edge_start == path_end and edge_end == path_start):
-                return True
-        return False
+        return (edge_start, edge_end) in self.hamilton_edges
 
     #Thiết lập màu cho các thành phần liên thông
     def set_components(self, component_list):
@@ -163,12 +224,18 @@ class GraphArea(QWidget):
             self.component_colors.append(color)
             for v in comp:
                 self.vertex_to_component[v] = i
+        # Bút / cọ của từng miền được tạo một lần thay vì mỗi lần vẽ
+        self.component_edge_pens = [QPen(color, 2) for color in self.component_colors]
+        self.component_vertex_pens = [QPen(color.darker(150), 2) for color in self.component_colors]
+        self.component_brushes = [QBrush(color.lighter(150)) for color in self.component_colors]
+        self._style_version += 1
         self.update()
 
     #Xóa màu của các thành phần liên thông
     def clear_components(self):
         self.component_colors = None
         self.vertex_to_component = None
+        self._style_version += 1
         self.update()
 
     def keyReleaseEvent(self, event):
@@ -190,60 +257,75 @@ class GraphArea(QWidget):
             self.update()
 
     def push_undo(self):
-        state = (
-            deepcopy(self.graph.vertices),
-            deepcopy(self.graph.edges),
-            deepcopy(self.graph.edge_control_points)
-        )
-        self.undo_stack.append(state)
-        self.redo_stack.clear()
+        """Bắt đầu một bước hoàn tác mới; các thay đổi đồ thị sau đó thuộc về bước này"""
+        self.history.begin()
     
     def undo(self):
-        if self.undo_stack:
-            current_state = (
-                deepcopy(self.graph.vertices),
-                deepcopy(self.graph.edges),
-                deepcopy(self.graph.edge_control_points)
-            )
-            self.redo_stack.append(current_state)
-            vertices, edges, control_points = self.undo_stack.pop()
-            self.graph.vertices = vertices
-            self.graph.edges = edges
-            self.graph.edge_control_points = control_points
+        if self.history.undo():
             self.update()
             self.parent().update_vertex_combo()
 
     def redo(self):
-        if not self.redo_stack:
+        if not self.history.redo():
             return
-        current_state = (
-            deepcopy(self.graph.vertices),
-            deepcopy(self.graph.edges),
-            deepcopy(self.graph.edge_control_points)
-        )
-        self.undo_stack.append(current_state)
-        vertices, edges, control_points = self.redo_stack.pop()
-        self.graph.vertices = vertices
-        self.graph.edges = edges
-        self.graph.edge_control_points = control_points
         self.update()
         self.parent().update_vertex_combo()
 
     def find_control_point_at_pos(self, pos):
-        for edge in self.graph.edges:
-            name1, name2 = edge
-            pos1 = next((pos for n, pos in self.graph.vertices if n == name1), None)
-            pos2 = next((pos for n, pos in self.graph.vertices if n == name2), None)
-            if not pos1 or not pos2 or name1 == name2:
+        return self.edge_at(pos, 15, include_loops=False)
+
+    def vertex_at(self, pos):
+        """(chỉ số, tên) của đỉnh dưới vị trí chuột; (None, None) nếu không có.
+
+        Chỉ xét các đỉnh trong các ô lưới quanh vị trí chuột; nếu nhiều đỉnh chồng nhau
+        thì chọn đỉnh đứng trước trong danh sách như trước đây.
+        """
+        self.sync_scene()
+        x, y = pos.x(), pos.y()
+        best = None
+        for kind, name in self.scene_grid.query(x - VERTEX_RADIUS, y - VERTEX_RADIUS, x + VERTEX_RADIUS, y + VERTEX_RADIUS):
+            if kind != 'v' or not self.is_point_on_vertex(pos, self.graph.get_position(name)):
                 continue
-            control_point = self.graph.get_control_point(edge)
-            if control_point:
-                if self.is_point_near_curve(pos, pos1, pos2, control_point, 15):
-                    return edge
-            else:
-                if self.is_point_near_line(pos, pos1, pos2, 15):
-                    return edge
-        return None
+            i = self.graph.index_of(name)
+            if best is None or i < best:
+                best = i
+        if best is None:
+            return None, None
+        return best, self.graph.vertices[best][0]
+
+    def edge_at(self, pos, tolerance, include_loops=True):
+        """Cạnh gần vị trí chuột nhất trong phạm vi tolerance; None nếu không có.
+
+        Chỉ đo khoảng cách tới các cạnh có hình bao chạm vùng quanh vị trí chuột.
+        """
+        self.sync_scene()
+        x, y = pos.x(), pos.y()
+        best, best_dist = None, None
+        for kind, edge in self.scene_grid.query(x - tolerance, y - tolerance, x + tolerance, y + tolerance):
+            if kind != 'e' or (edge[0] == edge[1] and not include_loops):
+                continue
+            dist = self.edge_distance(pos, edge)
+            if dist <= tolerance and (best is None or (dist, edge) < (best_dist, best)):
+                best, best_dist = edge, dist
+        return best
+
+    def items_in_rect(self, rect):
+        """Các đỉnh có tâm nằm trong rect và các cạnh có cả hai đầu nằm trong rect (theo thứ tự đồ thị)"""
+        self.sync_scene()
+        found = self.scene_grid.query(rect.left(), rect.top(), rect.right(), rect.bottom())
+        names = []
+        edges = []
+        for kind, item in found:
+            if kind == 'v':
+                pos = self.graph.get_position(item)
+                if rect.contains(int(pos.x), int(pos.y)):
+                    names.append(item)
+        inside = set(names)
+        for kind, item in found:
+            if kind == 'e' and item[0] in inside and item[1] in inside:
+                edges.append(item)
+        names.sort(key=self.graph.index_of)
+        return names, edges
 
     def mousePressEvent(self, event):
         if event.button() != Qt.LeftButton:
@@ -255,16 +337,16 @@ class GraphArea(QWidget):
 
         clicked_vertex = False
         clicked_vertex_name = None
-        for i, (name, vpos) in enumerate(self.graph.vertices):
-            if (pos - vpos).manhattanLength() <= 20:
-                self.selected_vertex_idx = i
-                clicked_vertex = True
-                clicked_vertex_name = name
-                break
+        index, name = self.vertex_at(pos)
+        if name is not None:
+            self.selected_vertex_idx = index
+            clicked_vertex = True
+            clicked_vertex_name = name
+            # Kéo một đỉnh cũng là một bước hoàn tác (bước rỗng nếu không kéo sẽ bị bỏ qua)
+            self.push_undo()
 
         if clicked_vertex and clicked_vertex_name in self.area_selected_vertices:
             self.dragging_area_selection = True
-            self.push_undo()
             return
 
         if not (clicked_vertex and clicked_vertex_name in self.area_selected_vertices):
@@ -278,7 +360,7 @@ class GraphArea(QWidget):
                 self.dragging_control_point = True
                 self.push_undo()
                 if not self.graph.get_control_point(control_edge):
-                    self.graph.set_control_point(control_edge, pos)
+                    self.graph.set_control_point(control_edge, to_point(pos))
                 self.update()
                 return
 
@@ -293,79 +375,75 @@ class GraphArea(QWidget):
             name, ok = QInputDialog.getText(self, "Thêm đỉnh", "Nhập tên đỉnh:")
             if ok and name:
                 self.push_undo()
-                self.graph.add_vertex((name, pos))
+                self.graph.add_vertex((name, to_point(pos)))
                 self.update()
                 self.parent().update_vertex_combo()
 
 
         if mode == "Thêm cạnh":
-            for name, vpos in self.graph.vertices:
-                if (pos - vpos).manhattanLength() <= 20:
-                    if event.modifiers() & Qt.ShiftModifier:
-                        self.selected_vertices.append(name)
-                        if len(self.selected_vertices) == 2:
-                            self.push_undo()
-                            self.graph.add_edge(tuple(self.selected_vertices))
-                            self.selected_vertices.clear()
-                        self.update()
-                    return
+            _, name = self.vertex_at(pos)
+            if name is not None:
+                if event.modifiers() & Qt.ShiftModifier:
+                    self.selected_vertices.append(name)
+                    if len(self.selected_vertices) == 2:
+                        self.push_undo()
+                        self.graph.add_edge(tuple(self.selected_vertices))
+                        self.selected_vertices.clear()
+                    self.update()
+                return
 
         if mode == "Xóa":
-            for i, (name, vpos) in enumerate(self.graph.vertices):
-                if (pos - vpos).manhattanLength() <= 20:
-                    self.push_undo()
-                    self.graph.remove_vertex((name, vpos))
-                    self.selected_vertices.clear()
-                    self.update()
-                    self.parent().update_vertex_combo()
-                    return
+            _, name = self.vertex_at(pos)
+            if name is not None:
+                self.push_undo()
+                self.graph.remove_vertices([name])
+                self.selected_vertices.clear()
+                self.update()
+                self.parent().update_vertex_combo()
+                return
             # Xóa cạnh nếu click vào cạnh
-            for edge in self.graph.edges:
-                name1, name2 = edge
-                pos1 = next((p for n, p in self.graph.vertices if n == name1), None)
-                pos2 = next((p for n, p in self.graph.vertices if n == name2), None)
-                if pos1 and pos2:
-                    control_point = self.graph.get_control_point(edge)
-                    if control_point:
-                        if self.is_point_near_curve(pos, pos1, pos2, control_point, 10):
-                            self.push_undo()
-                            self.graph.remove_edge(edge)
-                            self.update()
-                            return
-                    else:
-                        if self.is_point_near_line(pos, pos1, pos2, 10):
-                            self.push_undo()
-                            self.graph.remove_edge(edge)
-                            self.update()
-                            return
-                        
+            edge = self.edge_at(pos, 10)
+            if edge is not None:
+                self.push_undo()
+                self.graph.remove_edge(edge)
+                self.update()
+                return
+
     def mouseMoveEvent(self, event):
         if not (event.buttons() & Qt.LeftButton):
             return
 
         updated = False
+        # Chỉ mục không gian còn khớp với đồ thị thì chỉ cập nhật các phần tử vừa di chuyển
+        in_sync = self.scene_in_sync()
+        moved_vertices = ()
+        moved_edges = ()
 
         # Kéo control point để chỉnh cong cạnh
         if self.dragging_control_point and self.selected_control_point:
-            self.graph.set_control_point(self.selected_control_point, event.pos())
+            self.graph.set_control_point(self.selected_control_point, to_point(event.pos()))
+            moved_edges = (self.selected_control_point,)
             updated = True
 
         # Kéo nhóm đỉnh đã chọn (area selection)
         elif self.dragging_area_selection and self.area_selected_vertices and self.last_mouse_pos:
             dx = event.pos().x() - self.last_mouse_pos.x()
             dy = event.pos().y() - self.last_mouse_pos.y()
-            for i, (name, pos) in enumerate(self.graph.vertices):
-                if name in self.area_selected_vertices:
-                    self.graph.vertices[i] = (name, QPointF(pos.x() +   dx, pos.y() + dy))
+            for name in self.area_selected_vertices:
+                pos = self.graph.get_position(name)
+                if pos is not None:
+                    self.graph.set_position(name, Point(pos.x + dx, pos.y + dy))
             self.update_all_related_control_points()
             self.last_mouse_pos = event.pos()
+            moved_vertices = self.area_selected_vertices
             updated = True
 
         # Kéo một đỉnh đơn lẻ
         elif self.selected_vertex_idx is not None and 0 <= self.selected_vertex_idx < len(self.graph.vertices):
             name, _ = self.graph.vertices[self.selected_vertex_idx]
-            self.graph.vertices[self.selected_vertex_idx] = (name, event.pos())
+            self.graph.set_position(name, to_point(event.pos()))
             self.update_related_control_points(name)
+            moved_vertices = (name,)
             updated = True
 
         # Vẽ vùng chọn (chuột kéo để chọn nhiều đỉnh/cạnh)
@@ -374,52 +452,54 @@ class GraphArea(QWidget):
             updated = True
 
         if updated:
-            self.update()
+            if in_sync and (moved_vertices or moved_edges):
+                # Chỉ vẽ lại vùng phủ vị trí cũ và mới của các phần tử đang kéo
+                self.update(self.refresh_scene_items(moved_vertices, moved_edges))
+            else:
+                self.update()
 
     def update_all_related_control_points(self):
-        for edge in list(self.graph.edge_control_points.keys()):
-            name1, name2 = edge
-            if name1 in self.area_selected_vertices and name2 in self.area_selected_vertices:
-                self.update_control_point_for_edge(edge)
+        selected = set(self.area_selected_vertices)
+        for name in selected:
+            for neighbor in self.graph.neighbors(name):
+                if neighbor in selected:
+                    self.update_control_point_for_edge((name, neighbor))
 
     def update_related_control_points(self, vertex_name):
-        new_pos = next((p for n, p in self.graph.vertices if n == vertex_name), None)
-        if not new_pos:
+        if not self.graph.has_vertex(vertex_name):
             return
-        for edge in list(self.graph.edge_control_points.keys()):
-            if vertex_name in edge:
-                self.update_control_point_for_edge(edge)
+        for neighbor in self.graph.neighbors(vertex_name):
+            self.update_control_point_for_edge((vertex_name, neighbor))
 
     def update_control_point_for_edge(self, edge):
         name1, name2 = edge
-        pos1 = next((p for n, p in self.graph.vertices if n == name1), None)
-        pos2 = next((p for n, p in self.graph.vertices if n == name2), None)
-        if not pos1 or not pos2 or (pos1 == pos2):
+        pos1 = self.graph.get_position(name1)
+        pos2 = self.graph.get_position(name2)
+        if pos1 is None or pos2 is None or (pos1 == pos2):
             return
         control_point = self.graph.get_control_point(edge)
         if not control_point:
             return
 
         # Vector từ pos1 đến pos2
-        edge_vec = pos2 - pos1
-        if edge_vec.x() == 0 and edge_vec.y() == 0:
+        edge_x = pos2.x - pos1.x
+        edge_y = pos2.y - pos1.y
+        if edge_x == 0 and edge_y == 0:
             return
 
         # Vector vuông góc đơn vị
-        perp = QPointF(-edge_vec.y(), edge_vec.x())
-        length = (perp.x() ** 2 + perp.y() ** 2) ** 0.5
-        if length == 0:
-            return
-        perp /= length
+        length = hypot(edge_x, edge_y)
+        perp_x, perp_y = -edge_y / length, edge_x / length
 
         # Trung điểm cạnh
-        mid = (pos1 + pos2) * 0.5
+        mid_x = (pos1.x + pos2.x) * 0.5
+        mid_y = (pos1.y + pos2.y) * 0.5
 
         # Khoảng cách từ control_point đến đường thẳng, theo hướng vuông góc
-        dist = (control_point - mid).x() * perp.x() + (control_point - mid).y() * perp.y()
+        dist = (control_point.x - mid_x) * perp_x + (control_point.y - mid_y) * perp_y
 
         # Đặt lại control_point theo khoảng cách này
-        new_cp = mid + perp * dist
+        new_cp = Point(mid_x + perp_x * dist, mid_y + perp_y * dist)
         self.graph.set_control_point(edge, new_cp)
 
     def mouseReleaseEvent(self, event):
@@ -435,26 +515,13 @@ class GraphArea(QWidget):
                 self.selection_start.toPoint() if isinstance(self.selection_start, QPointF) else self.selection_start,
                 self.selection_end.toPoint() if isinstance(self.selection_end, QPointF) else self.selection_end
             ).normalized()
-            for name, pos in self.graph.vertices:
-                if rect.contains(pos.toPoint() if isinstance(pos, QPointF) else pos):
-                    self.area_selected_vertices.append(name)
-            for name1, name2 in self.graph.edges:
-                pos1 = next((p for n, p in self.graph.vertices if n == name1), None)
-                pos2 = next((p for n, p in self.graph.vertices if n == name2), None)
-                if pos1 and pos2 and rect.contains(pos1.toPoint() if isinstance(pos1, QPointF) else pos1) \
-                        and rect.contains(pos2.toPoint() if isinstance(pos2, QPointF) else pos2):
-                    self.area_selected_edges.append((name1, name2))
+            names, edges = self.items_in_rect(rect)
+            self.area_selected_vertices.extend(names)
+            self.area_selected_edges.extend(edges)
             self.update()
 
     def delete_selected(self):
-        self.graph.vertices = [(n, p) for (n, p) in self.graph.vertices if n not in self.area_selected_vertices]
-        self.graph.edges = [(a, b) for (a, b) in self.graph.edges if a not in self.area_selected_vertices and b not in self.area_selected_vertices]
-        edges_to_remove = []
-        for edge in self.graph.edge_control_points:
-            if edge[0] in self.area_selected_vertices or edge[1] in self.area_selected_vertices:
-                edges_to_remove.append(edge)
-        for edge in edges_to_remove:
-            self.graph.edge_control_points.pop(edge, None)
+        self.graph.remove_vertices(self.area_selected_vertices)
         self.area_selected_vertices.clear()
         self.area_selected_edges.clear()
         self.update()
@@ -468,46 +535,61 @@ class GraphArea(QWidget):
     def paste_selection(self):
         if not hasattr(self, '_copied') or not self._copied:
             return
-        offset = QPointF(40, 40)
+        offset = 40
         new_names = []
-        base_names = set(n for n, _ in self.graph.vertices)
         for name, pos in self._copied:
             new_name = name
             i = 1
-            while new_name in base_names:
+            while self.graph.has_vertex(new_name):
                 new_name = f"{name}_{i}"
                 i += 1
-            base_names.add(new_name)
-            self.graph.vertices.append((new_name, pos + offset))
+            self.graph.add_vertex((new_name, Point(pos.x + offset, pos.y + offset)))
             new_names.append((name, new_name))
         old_to_new = dict(new_names)
-        for a, b in self.graph.edges:
-            if a in old_to_new and b in old_to_new:
-                self.graph.edges.append((old_to_new[a], old_to_new[b]))
+        self.graph.add_edges_bulk([
+            (old_to_new[a], old_to_new[b]) for a, b in self.graph.edges
+            if a in old_to_new and b in old_to_new
+        ])
         self.update()
         self.parent().update_vertex_combo()
 
-    def is_point_near_line(self, p, a, b, tolerance=10):
+    def is_point_on_vertex(self, p, vpos, radius=20):
+        """p là vị trí chuột (QPoint), vpos là tọa độ đỉnh (Point)"""
+        return abs(p.x() - vpos.x) + abs(p.y() - vpos.y) <= radius
+
+    def edge_distance(self, pos, edge):
+        """Khoảng cách từ vị trí chuột tới cạnh (đường thẳng hoặc đường cong qua điểm điều khiển)"""
+        pos1 = to_qpoint(self.graph.get_position(edge[0]))
+        pos2 = to_qpoint(self.graph.get_position(edge[1]))
+        control_point = self.graph.get_control_point(edge)
+        if control_point:
+            return self.distance_to_curve(pos, pos1, pos2, to_qpoint(control_point))
+        return self.distance_to_line(pos, pos1, pos2)
+
+    def distance_to_line(self, p, a, b):
         ab = b - a
         ap = p - a
         ab_len_sq = ab.x() ** 2 + ab.y() ** 2
         if ab_len_sq == 0:
-            return (p - a).manhattanLength() <= tolerance
+            return (p - a).manhattanLength()
         t = max(0, min(1, (ap.x() * ab.x() + ap.y() * ab.y()) / ab_len_sq))
         projection = a + ab * t
         dx = projection.x() - p.x()
         dy = projection.y() - p.y()
-        return hypot(dx, dy) <= tolerance # Tương đương sqrt(dx**2 + dy**2)
+        return hypot(dx, dy) # Tương đương sqrt(dx**2 + dy**2)
 
-    def is_point_near_curve(self, point, start, end, control, tolerance=10):
+    def distance_to_curve(self, point, start, end, control):
+        """Khoảng cách (Manhattan) nhỏ nhất tới 21 điểm lấy mẫu trên đường cong"""
+        best = None
         for t in [i/20.0 for i in range(21)]:
             curve_point = QPointF(
                 (1-t)**2 * start.x() + 2*(1-t)*t * control.x() + t**2 * end.x(),
                 (1-t)**2 * start.y() + 2*(1-t)*t * control.y() + t**2 * end.y()
             )
-            if (point - curve_point).manhattanLength() <= tolerance:
-                return True
-        return False
+            dist = (point - curve_point).manhattanLength()
+            if best is None or dist < best:
+                best = dist
+        return best
 
     def draw_bezier_curve(self, painter, start, end, control):
         path = QPainterPath()
@@ -515,78 +597,240 @@ class GraphArea(QWidget):
         path.quadTo(control, end)
         painter.drawPath(path)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.fillRect(self.rect(), Qt.white)
-
-        # vẽ các cạnh với màu sắc khác nhau cho thành phần liên thông nếu hợp lệ
-        for start, end in self.graph.edges:
-            pos1 = next((p for n, p in self.graph.vertices if n == start), None)
-            pos2 = next((p for n, p in self.graph.vertices if n == end), None)
-            if not pos1 or not pos2:
-                continue
-            is_hamilton_edge = self.is_edge_in_hamilton_path(start, end)
-            if is_hamilton_edge:
-                painter.setPen(QPen(QColor("green"), 5))
-            elif (start, end) in self.area_selected_edges or (end, start) in self.area_selected_edges:
-                painter.setPen(QPen(QColor("deepskyblue"), 3))
-            elif self.component_colors and start in self.vertex_to_component and end in self.vertex_to_component:
-                comp_id = self.vertex_to_component[start] 
-                color = self.component_colors[comp_id]
-                painter.setPen(QPen(color, 2))
-            else:
-                painter.setPen(QPen(Qt.black, 2))
-            if start == end:
-                path = QPainterPath()
-                path.moveTo(pos1)
-                ctrl1 = QPointF(pos1.x() + 60, pos1.y() - 60)
-                ctrl2 = QPointF(pos1.x() - 60, pos1.y() - 60)
-                path.cubicTo(ctrl1, ctrl2, pos1)
-                painter.drawPath(path)
+    def build_palette(self):
+        """Dựng sẵn bút, cọ và phông chữ dùng khi vẽ (không tạo mới cho từng đỉnh / cạnh)"""
+        self.pens = {
+            'edge': QPen(Qt.black, 2),
+            'edge_hamilton': QPen(QColor("green"), 5),
+            'edge_selected': QPen(QColor("deepskyblue"), 3),
+            'vertex': QPen(Qt.black, 2),
+            'vertex_highlight': QPen(Qt.red, 4),
+            'vertex_selected': QPen(QColor("deepskyblue"), 4),
+            'vertex_hamilton': QPen(QColor("green"), 4),
+            'label': QPen(Qt.black, 2),
+            'label_hamilton': QPen(Qt.darkGreen, 2),
+            'selection': QPen(QColor(0, 120, 215, 200), 1, Qt.SolidLine),
+        }
+        self.brushes = {
+            'vertex': QBrush(Qt.white),
+            'vertex_highlight': QBrush(QColor("yellow")),
+            'vertex_hamilton': QBrush(QColor("lightgreen")),
+            'selection': QBrush(QColor(0, 120, 215, 60)),
+        }
+        self.label_font = QFont(self.font())
+        self.label_font.setBold(True)
+
+    def vertex_box(self, pos):
+        r = VERTEX_RADIUS + PEN_MARGIN
+        return (pos.x - r, pos.y - r, pos.x + r, pos.y + r)
+
+    def edge_box(self, edge):
+        """Hình bao sát của cạnh (đường thẳng, đường cong Bézier hoặc khuyên) cộng độ dày bút"""
+        start, end = edge
+        pos1 = self.graph.get_position(start)
+        pos2 = self.graph.get_position(end)
+        if pos1 is None or pos2 is None:
+            return None
+        m = PEN_MARGIN
+        x0, x1 = min(pos1.x, pos2.x), max(pos1.x, pos2.x)
+        y0, y1 = min(pos1.y, pos2.y), max(pos1.y, pos2.y)
+        control_point = self.graph.get_control_point(edge)
+        if control_point:
+            # Khi xóa, khuyên được bắt theo đường cong bậc hai qua điểm điều khiển nên cũng tính vào
+            cx0, cx1 = bezier_extent(pos1.x, control_point.x, pos2.x)
+            cy0, cy1 = bezier_extent(pos1.y, control_point.y, pos2.y)
+            x0, x1 = min(x0, cx0), max(x1, cx1)
+            y0, y1 = min(y0, cy0), max(y1, cy1)
+        if start == end:
+            x0, x1 = min(x0, pos1.x - LOOP_HALF_WIDTH), max(x1, pos1.x + LOOP_HALF_WIDTH)
+            y0 = min(y0, pos1.y - LOOP_HEIGHT)
+        return (x0 - m, y0 - m, x1 + m, y1 + m)
+
+    def edge_key(self, name1, name2):
+        """Cạnh theo đúng chiều được lưu trong graph.edges (khóa trong chỉ mục không gian)"""
+        return self.graph.get_edge(name1, name2) or (name1, name2)
+
+    def scene_in_sync(self):
+        return self._scene_version == (self.graph.topology_version, self.graph.geometry_version)
+
+    def sync_scene(self):
+        """Dựng lại chỉ mục không gian nếu đồ thị bị thay đổi từ bên ngoài
+        (nhập file, hoàn tác, sắp xếp lại, ...); khi đó lớp tĩnh cũng phải vẽ lại"""
+        if self.scene_in_sync():
+            return
+        grid = self.scene_grid
+        grid.clear()
+        for name, pos in self.graph.vertices:
+            if pos is not None:
+                grid.insert(('v', name), self.vertex_box(pos))
+        for edge in self.graph.edges:
+            box = self.edge_box(edge)
+            if box is not None:
+                grid.insert(('e', edge), box)
+        self._scene_version = (self.graph.topology_version, self.graph.geometry_version)
+        self._static_key = None
+
+    def refresh_scene_items(self, names=(), edges=()):
+        """Cập nhật hình bao của các đỉnh vừa di chuyển, các cạnh kề của chúng và các cạnh trong edges.
+
+        Trả về vùng cần vẽ lại (hợp của hình bao cũ và mới).
+        """
+        grid = self.scene_grid
+        items = {('e', self.edge_key(*edge)) for edge in edges}
+        for name in names:
+            items.add(('v', name))
+            for neighbor in self.graph.neighbors(name):
+                items.add(('e', self.edge_key(name, neighbor)))
+        dirty = QRect()
+        for item in items:
+            old = grid.box(item)
+            if old is not None:
+                dirty = dirty.united(box_rect(old))
+            if item[0] == 'v':
+                pos = self.graph.get_position(item[1])
+                box = self.vertex_box(pos) if pos is not None else None
             else:
-                control_point = self.graph.get_control_point((start, end))
-                if control_point:
-                    self.draw_bezier_curve(painter, pos1, pos2, control_point)
-                else:
-                    painter.drawLine(pos1, pos2)
+                box = self.edge_box(item[1])
+            if box is None:
+                grid.remove(item)
+                continue
+            grid.insert(item, box)
+            dirty = dirty.united(box_rect(box))
+        self._scene_version = (self.graph.topology_version, self.graph.geometry_version)
+        return dirty
+
+    def is_exposed(self, item, rect):
+        """Hình bao của phần tử có giao với vùng rect = (x0, y0, x1, y1) hay không"""
+        box = self.scene_grid.box(item)
+        if box is None:
+            return False
+        return box[0] <= rect[2] and rect[0] <= box[2] and box[1] <= rect[3] and rect[1] <= box[3]
 
-        # Draw vertices with component colors if available
+    def dynamic_items(self):
+        """Các đỉnh / cạnh đang bị kéo: vẽ lại ở mỗi khung hình, không nằm trong lớp tĩnh"""
+        names = set()
+        if self.dragging_area_selection:
+            names.update(self.area_selected_vertices)
+        elif self.selected_vertex_idx is not None and 0 <= self.selected_vertex_idx < len(self.graph.vertices):
+            names.add(self.graph.vertices[self.selected_vertex_idx][0])
+        edges = set()
+        for name in names:
+            for neighbor in self.graph.neighbors(name):
+                edges.add(self.edge_key(name, neighbor))
+        if self.dragging_control_point and self.selected_control_point:
+            edges.add(self.edge_key(*self.selected_control_point))
+        return names, edges
+
+    def style_key(self):
         highlight = self.selected_vertices if self.get_mode() == "Thêm cạnh" else []
-        for name, pos in self.graph.vertices:
-            if name in highlight:
-                pen = QPen(Qt.red, 4)
-                brush = QBrush(QColor("yellow"))
-            elif name in self.area_selected_vertices:
-                pen = QPen(QColor("deepskyblue"), 4)
-                brush = QBrush(Qt.white)
-            elif self.hamilton_path and name in self.hamilton_path:
-                pen = QPen(QColor("green"), 4)
-                brush = QBrush(QColor("lightgreen"))
-            elif self.component_colors and name in self.vertex_to_component:
-                comp_id = self.vertex_to_component[name]
-                color = self.component_colors[comp_id]
-                pen = QPen(color.darker(150), 2)  # Darker border for visibility
-                brush = QBrush(color.lighter(150))  # Lighter fill for vertices
-            else:
-                pen = QPen(Qt.black, 2)
-                brush = QBrush(Qt.white)
-            painter.setPen(pen)
-            painter.setBrush(brush)
-            painter.drawEllipse(pos, 20, 20)
-            label_rect = QRect(int(pos.x()) - 20, int(pos.y()) - 20, 40, 40)
-            font = painter.font()
-            font.setBold(True)
-            painter.setFont(font)
-            if self.hamilton_path and name in self.hamilton_path:
-                painter.setPen(QPen(Qt.darkGreen, 2))
+        return (self._style_version, tuple(highlight),
+                tuple(self.area_selected_vertices), tuple(self.area_selected_edges))
+
+    def draw_edge(self, painter, start, end):
+        pos1 = self.graph.get_position(start)
+        pos2 = self.graph.get_position(end)
+        if pos1 is None or pos2 is None:
+            return
+        pos1, pos2 = to_qpoint(pos1), to_qpoint(pos2)
+        if (start, end) in self.hamilton_edges:
+            painter.setPen(self.pens['edge_hamilton'])
+        elif (start, end) in self._paint_selected_edges or (end, start) in self._paint_selected_edges:
+            painter.setPen(self.pens['edge_selected'])
+        elif self.component_colors and start in self.vertex_to_component and end in self.vertex_to_component:
+            painter.setPen(self.component_edge_pens[self.vertex_to_component[start]])
+        else:
+            painter.setPen(self.pens['edge'])
+        if start == end:
+            path = QPainterPath()
+            path.moveTo(pos1)
+            ctrl1 = QPointF(pos1.x() + 60, pos1.y() - 60)
+            ctrl2 = QPointF(pos1.x() - 60, pos1.y() - 60)
+            path.cubicTo(ctrl1, ctrl2, pos1)
+            painter.drawPath(path)
+        else:
+            control_point = self.graph.get_control_point((start, end))
+            if control_point:
+                self.draw_bezier_curve(painter, pos1, pos2, to_qpoint(control_point))
             else:
-                painter.setPen(QPen(Qt.black, 2))
-            painter.drawText(label_rect, Qt.AlignCenter, name)
+                painter.drawLine(pos1, pos2)
+
+    def draw_vertex(self, painter, name, pos):
+        if name in self._paint_highlight:
+            pen, brush = self.pens['vertex_highlight'], self.brushes['vertex_highlight']
+        elif name in self._paint_selected_vertices:
+            pen, brush = self.pens['vertex_selected'], self.brushes['vertex']
+        elif name in self.hamilton_vertices:
+            pen, brush = self.pens['vertex_hamilton'], self.brushes['vertex_hamilton']
+        elif self.component_colors and name in self.vertex_to_component:
+            comp_id = self.vertex_to_component[name]
+            pen, brush = self.component_vertex_pens[comp_id], self.component_brushes[comp_id]
+        else:
+            pen, brush = self.pens['vertex'], self.brushes['vertex']
+        painter.setPen(pen)
+        painter.setBrush(brush)
+        painter.drawEllipse(to_qpoint(pos), VERTEX_RADIUS, VERTEX_RADIUS)
+        label_rect = QRect(int(pos.x) - 20, int(pos.y) - 20, 40, 40)
+        if name in self.hamilton_vertices:
+            painter.setPen(self.pens['label_hamilton'])
+        else:
+            painter.setPen(self.pens['label'])
+        painter.drawText(label_rect, Qt.AlignCenter, name)
+
+    def render_static_layer(self, dynamic_vertices, dynamic_edges):
+        """Vẽ các phần tử không bị kéo và nằm trong vùng nhìn thấy vào một QPixmap"""
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(Qt.white)
+        visible = self.scene_grid.query(0, 0, self.width(), self.height())
+
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self.label_font)
+        # Duyệt theo thứ tự trong đồ thị để thứ tự chồng lên nhau không đổi giữa các lần vẽ
+        for edge in self.graph.edges:
+            if ('e', edge) in visible and edge not in dynamic_edges:
+                self.draw_edge(painter, *edge)
+        for name, pos in self.graph.vertices:
+            if ('v', name) in visible and name not in dynamic_vertices:
+                self.draw_vertex(painter, name, pos)
+        painter.end()
+        return layer
+
+    def paintEvent(self, event):
+        self.sync_scene()
+        self._paint_highlight = set(self.selected_vertices) if self.get_mode() == "Thêm cạnh" else set()
+        self._paint_selected_vertices = set(self.area_selected_vertices)
+        self._paint_selected_edges = set(self.area_selected_edges)
+
+        dynamic_vertices, dynamic_edges = self.dynamic_items()
+        key = (self.width(), self.height(), self.devicePixelRatioF(), self.style_key(),
+               frozenset(dynamic_vertices), frozenset(dynamic_edges))
+        if self._static_layer is None or self._static_key != key:
+            self._static_layer = self.render_static_layer(dynamic_vertices, dynamic_edges)
+            self._static_key = key
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        # Painter đã bị giới hạn trong vùng cần vẽ lại nên chỉ phần đó của lớp tĩnh được chép
+        painter.drawPixmap(0, 0, self._static_layer)
+
+        # Các phần tử đang kéo: chỉ vẽ những phần tử giao với vùng cần vẽ lại
+        if dynamic_vertices or dynamic_edges:
+            rect = event.rect()
+            exposed = (rect.left(), rect.top(), rect.right() + 1, rect.bottom() + 1)
+            painter.setFont(self.label_font)
+            for edge in dynamic_edges:
+                if self.is_exposed(('e', edge), exposed):
+                    self.draw_edge(painter, *edge)
+            for name in dynamic_vertices:
+                pos = self.graph.get_position(name)
+                if pos is not None and self.is_exposed(('v', name), exposed):
+                    self.draw_vertex(painter, name, pos)
 
         if self.selecting_area:
-            painter.setPen(QPen(QColor(0, 120, 215, 200), 1, Qt.SolidLine))
-            painter.setBrush(QBrush(QColor(0, 120, 215, 60)))
+            painter.setPen(self.pens['selection'])
+            painter.setBrush(self.brushes['selection'])
             selection_rect = QRect(
                 self.selection_start.toPoint() if isinstance(self.selection_start, QPointF) else self.selection_start,
                 self.selection_end.toPoint() if isinstance(self.selection_end, QPointF) else self.selection_end
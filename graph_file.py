@@ -0,0 +1,265 @@
+from array import array
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+from graph import Point, default_control_point, paused_gc
+
+# Định dạng file đồ thị phiên bản 2 (phiên bản 1 là định dạng cũ của export_file)
+FORMAT_NAME = "hamilton-graph"
+FORMAT_VERSION = 2
+
+# JSON phiên bản 2: mỗi phần tử nằm trên một dòng để đọc dần từng dòng.
+# Đỉnh là [tên, x, y]; cạnh là [chỉ số đỉnh, chỉ số đỉnh] nên tên đỉnh chứa '-' không
+# còn gây nhầm lẫn; chỉ các điểm điều khiển khác điểm mặc định được lưu, mỗi cạnh một
+# lần: [chỉ số cạnh, x, y].
+JSON_HEADER = '{"format":"hamilton-graph","version":2,"vertices":['
+JSON_EDGES = '],"edges":['
+JSON_CONTROL_POINTS = '],"control_points":['
+JSON_END = ']}'
+
+# Dạng nhị phân (little-endian, đọc bằng mmap): phần đầu gồm mã nhận dạng, phiên bản,
+# số đỉnh n, số cạnh m, số điểm điều khiển k; sau đó lần lượt x, y của đỉnh (float64,
+# NaN nếu không có tọa độ), x, y của điểm điều khiển (float64), cạnh (int32, 2m),
+# chỉ số cạnh của điểm điều khiển (int32), vị trí tên (uint32, n + 1) và bảng tên UTF-8.
+BINARY_SUFFIX = ".hgb"
+BINARY_MAGIC = b"HGRB"
+BINARY_HEADER = struct.Struct("<4sIIII")
+# Đuôi file đồ thị đọc được (JSON và nhị phân)
+GRAPH_SUFFIXES = (".json", BINARY_SUFFIX)
+
+
+def write_graph(graph, file_path):
+    """Ghi đồ thị: file đuôi .hgb dùng dạng nhị phân, còn lại dùng JSON phiên bản 2"""
+    if os.fspath(file_path).lower().endswith(BINARY_SUFFIX):
+        write_binary(graph, file_path)
+    else:
+        write_json(graph, file_path)
+
+
+def custom_control_points(graph, edges):
+    """(chỉ số cạnh, điểm) của các cạnh có điểm điều khiển khác điểm mặc định"""
+    positions = dict(graph.vertices)
+    control_points = graph.edge_control_points
+    points = []
+    for i, edge in enumerate(edges):
+        point = control_points.get(edge)
+        if point is None:
+            continue
+        pos1, pos2 = positions[edge[0]], positions[edge[1]]
+        if pos1 is not None and pos2 is not None and point == default_control_point(pos1, pos2):
+            continue
+        points.append((i, point))
+    return points
+
+
+def write_json(graph, file_path):
+    index = {name: i for i, (name, _) in enumerate(graph.vertices)}
+    edges = list(graph.edges)
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def write_section(f, lines):
+        first = True
+        for line in lines:
+            if not first:
+                f.write(",\n")
+            f.write(line)
+            first = False
+        if not first:
+            f.write("\n")
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(JSON_HEADER + "\n")
+        write_section(f, (encode([name, pos.x, pos.y] if pos is not None else [name, None, None])
+                          for name, pos in graph.vertices))
+        f.write(JSON_EDGES + "\n")
+        write_section(f, (f"[{index[u]},{index[v]}]" for u, v in edges))
+        f.write(JSON_CONTROL_POINTS + "\n")
+        write_section(f, (encode([i, point.x, point.y]) for i, point in custom_control_points(graph, edges)))
+        f.write(JSON_END + "\n")
+
+
+def write_binary(graph, file_path):
+    index = {name: i for i, (name, _) in enumerate(graph.vertices)}
+    edges = list(graph.edges)
+    points = custom_control_points(graph, edges)
+
+    xs = array("d", (pos.x if pos is not None else math.nan for _, pos in graph.vertices))
+    ys = array("d", (pos.y if pos is not None else math.nan for _, pos in graph.vertices))
+    point_xs = array("d", (point.x for _, point in points))
+    point_ys = array("d", (point.y for _, point in points))
+    edge_array = array("i")
+    for u, v in edges:
+        edge_array.append(index[u])
+        edge_array.append(index[v])
+    point_edges = array("i", (i for i, _ in points))
+    blob = bytearray()
+    offsets = array("I", [0])
+    for name, _ in graph.vertices:
+        blob += name.encode("utf-8")
+        offsets.append(len(blob))
+
+    arrays = (xs, ys, point_xs, point_ys, edge_array, point_edges, offsets)
+    with open(file_path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, FORMAT_VERSION, len(graph.vertices), len(edges), len(points)))
+        for values in arrays:
+            if sys.byteorder == "big":
+                values.byteswap()
+            values.tofile(f)
+        f.write(blob)
+
+
+def read_graph(file_path, positions=True):
+    """Đọc file đồ thị (nhị phân, JSON phiên bản 2 hoặc JSON cũ).
+
+    Trả về (vertices, edges, control_points) để truyền cho Graph.load. positions=False
+    bỏ qua tọa độ và điểm điều khiển (chỉ cần cấu trúc để chạy giải thuật).
+    """
+    with open(file_path, "rb") as f:
+        magic = f.read(len(BINARY_MAGIC))
+    with paused_gc():
+        if magic == BINARY_MAGIC:
+            return read_binary(file_path, positions)
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return assemble(iter_json_records(f), positions)
+        except ValueError:
+            # Không phải bố cục từng dòng của phiên bản 2 (file cũ hoặc đã được định dạng lại)
+            pass
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") == FORMAT_NAME:
+            if data.get("version", 0) > FORMAT_VERSION:
+                raise ValueError(f"Phiên bản định dạng {data['version']} mới hơn phiên bản được hỗ trợ ({FORMAT_VERSION})")
+            records = [("vertices", item) for item in data.get("vertices", [])]
+            records += [("edges", item) for item in data.get("edges", [])]
+            records += [("control_points", item) for item in data.get("control_points", [])]
+            return assemble(records, positions)
+        return read_legacy(data, positions)
+
+
+def iter_json_records(f):
+    """Đọc dần JSON phiên bản 2 theo từng dòng, sinh (phần, phần tử); bộ nhớ không phụ thuộc kích thước file.
+
+    Ném ValueError nếu file không đúng bố cục từng dòng do write_json tạo ra.
+    """
+    if f.readline().strip() != JSON_HEADER:
+        raise ValueError("Không phải JSON phiên bản 2")
+    sections = {JSON_EDGES: "edges", JSON_CONTROL_POINTS: "control_points"}
+    section = "vertices"
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("]"):
+            if line == JSON_END:
+                return
+            if line not in sections:
+                raise ValueError(f"Dòng không hợp lệ: {line[:40]}")
+            section = sections[line]
+            continue
+        yield section, json.loads(line.rstrip(","))
+    raise ValueError("File JSON bị cắt cụt")
+
+
+def assemble(records, positions):
+    names = []
+    vertices = []
+    edges = []
+    control_points = {}
+    for section, item in records:
+        if section == "vertices":
+            name, x, y = item
+            names.append(name)
+            vertices.append((name, Point(x, y) if positions and x is not None else None))
+        elif section == "edges":
+            i, j = item
+            edges.append((names[i], names[j]))
+        elif positions:
+            i, x, y = item
+            control_points[edges[i]] = Point(x, y)
+    return vertices, edges, control_points
+
+
+def read_binary(file_path, positions=True):
+    with open(file_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    try:
+        magic, version, n, m, k = BINARY_HEADER.unpack_from(view)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Phiên bản định dạng {version} mới hơn phiên bản được hỗ trợ ({FORMAT_VERSION})")
+        offset = BINARY_HEADER.size
+
+        def take(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * count
+            if sys.byteorder == "little":
+                # Đọc thẳng từ vùng nhớ ánh xạ, không sao chép
+                part = view[offset:offset + size].cast(typecode)
+            else:
+                values.frombytes(view[offset:offset + size])
+                values.byteswap()
+                part = values
+            offset += size
+            return part
+
+        xs, ys = take("d", n), take("d", n)
+        point_xs, point_ys = take("d", k), take("d", k)
+        edge_array = take("i", 2 * m)
+        point_edges = take("i", k)
+        offsets = take("I", n + 1)
+        blob = view[offset:offset + offsets[n]]
+
+        names = [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(n)]
+        if positions:
+            vertices = [(name, None if math.isnan(x) else Point(x, y)) for name, x, y in zip(names, xs, ys)]
+        else:
+            vertices = [(name, None) for name in names]
+        edges = [(names[edge_array[2 * i]], names[edge_array[2 * i + 1]]) for i in range(m)]
+        control_points = {}
+        if positions:
+            for i, x, y in zip(point_edges, point_xs, point_ys):
+                control_points[edges[i]] = Point(x, y)
+        for part in (xs, ys, point_xs, point_ys, edge_array, point_edges, offsets, blob):
+            if isinstance(part, memoryview):
+                part.release()
+        return vertices, edges, control_points
+    finally:
+        view.release()
+        mm.close()
+
+
+def split_legacy_key(key, edge_set):
+    """Tách khóa "A-B" của định dạng cũ thành cạnh (A, B); tên đỉnh có thể chứa '-'.
+
+    Thử lần lượt từng vị trí dấu '-' và chọn cách tách cho ra một cạnh có thật.
+    """
+    start = 0
+    while True:
+        i = key.find("-", start)
+        if i < 0:
+            return None
+        edge = (key[:i], key[i + 1:])
+        if edge in edge_set or (edge[1], edge[0]) in edge_set:
+            return edge
+        start = i + 1
+
+
+def read_legacy(data, positions=True):
+    """Chuyển dữ liệu JSON định dạng cũ (phiên bản 1) sang (vertices, edges, control_points)"""
+    vertices = [(v["name"], Point(v["x"], v["y"]) if positions else None) for v in data.get("vertices", [])]
+    edges = [tuple(edge) for edge in data.get("edges", []) if len(edge) == 2]
+    control_points = {}
+    if positions:
+        edge_set = set(edges)
+        for key, point_data in data.get("control_points", {}).items():
+            edge = split_legacy_key(key, edge_set)
+            # File cũ lưu mỗi điểm cho cả hai chiều của cạnh: chỉ cần đọc một lần
+            if edge is not None and (edge[1], edge[0]) not in control_points:
+                control_points[edge] = Point(point_data["x"], point_data["y"])
+    return vertices, edges, control_points
@@ -1,18 +1,30 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTextEdit, QSizePolicy, QFileDialog, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QTextEdit, QSizePolicy, QFileDialog, QMessageBox, QSpinBox, QCheckBox
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
 from graph_area import GraphArea
 from graph import Graph
 from graph import generate_random_graph, export_file, import_file, format_graph_circular
-from graph_algorithms import hamiltonian_cycle_with_steps, hamiltonian_cycle_branch_and_bound, hamiltonian_cycle_brute_force, connected_components, check_dirac_condition, check_ore_condition
+from graph_algorithms import hamiltonian_cycle_with_steps, hamiltonian_cycle_branch_and_bound, hamiltonian_cycle_brute_force, hamiltonian_cycle_dp, connected_components, check_dirac_condition, check_ore_condition
+from graph_algorithms import ORDER_WARNSDORFF, ORDER_MOST_CONSTRAINED, DP_MAX_VERTICES, DP_WARN_VERTICES
+from solver_worker import SolverWorker
+from layout_worker import LayoutWorker
+from force_layout import apply_layout
+from parallel_search import hamiltonian_cycle_parallel
+from functools import partial
+from result_cache import ResultCache
+from run_profiler import RunProfiler, report_path
+from step_log import StepLogView
 from PyQt5.QtGui import QIcon
 import pathlib
 import random
 
+GRAPH_FILE_FILTER = "JSON Files (*.json);;Graph Binary (*.hgb);;All Files (*)"
+
 class GraphGUI(QWidget):
-    def __init__(self):
+    def __init__(self, result_cache_path=None):
+        """result_cache_path: file lưu bản tóm tắt kết quả ra đĩa (mặc định chỉ lưu trong RAM)"""
         super().__init__()
 
         css_path = pathlib.Path("style.css")
@@ -25,6 +37,31 @@ class GraphGUI(QWidget):
         self.setWindowTitle("Giải thuật tìm chu trình Hamilton")
         self.hamilton_steps = [] 
         self.is_step_mode = False
+        self.solver_worker = None
+        self.layout_worker = None
+        # File đồ thị vừa nhập / lưu, nơi đặt báo cáo hiệu năng
+        self.graph_file = None
+        # Kết quả đã tính được dùng lại khi cấu trúc đồ thị không đổi (bản tóm tắt lưu ra đĩa nếu có result_cache_path)
+        self.result_cache = ResultCache(path=result_cache_path)
+        self.solvers = {
+            "Quay lui": hamiltonian_cycle_with_steps,
+            "Nhánh cận": hamiltonian_cycle_branch_and_bound,
+            "Brute Force": hamiltonian_cycle_brute_force,
+            "Quy hoạch động": hamiltonian_cycle_dp,
+        }
+        # Các giải thuật có thể chia nhánh chạy song song trên nhiều lõi
+        self.parallel_engines = {
+            "Quay lui": "backtracking",
+            "Nhánh cận": "branch_and_bound",
+        }
+        # Thứ tự thử các đỉnh kề của Quay lui -> tham số của hamiltonian_cycle_with_steps
+        self.backtrack_orders = {
+            "Thứ tự: theo đỉnh": {},
+            "Thứ tự: Warnsdorff": {"order": ORDER_WARNSDORFF},
+            "Thứ tự: ràng buộc nhất": {"order": ORDER_MOST_CONSTRAINED},
+            # Hạt giống cố định: chạy lại cho cùng kết quả, và kết quả lưu đệm đúng với lần chạy lại
+            "Thứ tự: ngẫu nhiên, khởi động lại": {"order": ORDER_MOST_CONSTRAINED, "seed": 1, "restart_nodes": 1000},
+        }
 
         outer_layout = QVBoxLayout(self)
         heading = QLabel("ỨNG DỤNG VẼ VÀ XỬ LÝ ĐỒ THỊ VÔ HƯỚNG - ÁP DỤNG GIẢI THUẬT TÌM CHU TRÌNH HAMILTON")
@@ -57,10 +94,20 @@ class GraphGUI(QWidget):
         label_result.setStyleSheet("font-weight: bold;")
         result_layout.addWidget(label_result)
 
+        self.progress_label = QLabel("")
+        self.progress_label.setStyleSheet("color: #666; font-size: 11px;")
+        result_layout.addWidget(self.progress_label)
+
         self.result_output = QTextEdit()
         self.result_output.setReadOnly(True)
         self.result_output.setStyleSheet("background-color: white; border: 1px solid #ccc;")
-        result_layout.addWidget(self.result_output)
+        result_layout.addWidget(self.result_output, stretch=1)
+
+        # Nhật ký các bước: chỉ tạo chuỗi cho các dòng đang hiện, có tìm kiếm và nhảy tới bước
+        self.step_log = StepLogView()
+        self.step_log.setVisible(False)
+        self.step_log.step_selected.connect(self.on_step_selected)
+        result_layout.addWidget(self.step_log, stretch=2)
 
         info_layout = QVBoxLayout()
         bottom_layout.addLayout(info_layout, stretch=1)
@@ -94,10 +141,21 @@ class GraphGUI(QWidget):
         label_algo.setObjectName("label_algo")
         control_panel.addWidget(label_algo) 
         self.algorithm_combo = QComboBox()
-        self.algorithm_combo.addItems(["Quay lui", "Nhánh cận", "Brute Force"])
+        self.algorithm_combo.addItems(list(self.solvers))
         self.algorithm_combo.setStyleSheet("padding-left: 15px;")
         self.algorithm_combo.setObjectName("algorithm_combo")
         control_panel.addWidget(self.algorithm_combo)
+        self.order_combo = QComboBox()
+        self.order_combo.addItems(list(self.backtrack_orders))
+        self.order_combo.setStyleSheet("padding-left: 15px;")
+        self.order_combo.setObjectName("order_combo")
+        self.order_combo.setToolTip(
+            "Thứ tự thử các đỉnh kề của Quay lui:\n"
+            "- Warnsdorff: đỉnh còn ít đỉnh kề chưa thăm nhất trước\n"
+            "- Ràng buộc nhất: như Warnsdorff, đi ngay tới đỉnh chỉ còn 2 đỉnh kề khả dụng và cắt nhánh khi có đỉnh còn ít hơn 2\n"
+            "- Ngẫu nhiên: như ràng buộc nhất, thứ tự ngẫu nhiên giữa các đỉnh ngang nhau, khởi động lại sau mỗi 1000, 2000, 4000... nút (hạt giống cố định nên chạy lại cho cùng kết quả)")
+        control_panel.addWidget(self.order_combo)
+        self.algorithm_combo.currentTextChanged.connect(lambda algo: self.order_combo.setEnabled(algo == "Quay lui"))
 
         label_draw = QLabel("Lựa chọn vẽ")
         label_draw.setObjectName("label_draw")
@@ -157,6 +215,38 @@ class GraphGUI(QWidget):
         self.start_vertex_combo.setStyleSheet("padding-left: 15px;")
         self.start_vertex_combo.setObjectName("start_vertex_combo")
         control_panel.addWidget(self.start_vertex_combo)
+
+        control_panel.addSpacing(10)
+        label_timeout = QLabel("Giới hạn thời gian (giây, 0 = không giới hạn)")
+        label_timeout.setWordWrap(True)
+        label_timeout.setObjectName("label_timeout")
+        control_panel.addWidget(label_timeout)
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setValue(0)
+        self.timeout_spin.setObjectName("timeout_spin")
+        control_panel.addWidget(self.timeout_spin)
+
+        self.parallel_check = QCheckBox("Tìm song song (đa lõi)")
+        self.parallel_check.setToolTip("Chia cây tìm kiếm theo nhánh và chạy trên nhiều tiến trình (Quay lui, Nhánh cận)")
+        self.parallel_check.setObjectName("parallel_check")
+        control_panel.addWidget(self.parallel_check)
+
+        self.profile_check = QCheckBox("Đo hiệu năng (cProfile + tracemalloc)")
+        self.profile_check.setToolTip("Đo thời gian và bộ nhớ của giải thuật và phần hiển thị kết quả, lưu báo cáo cạnh file đồ thị")
+        self.profile_check.setObjectName("profile_check")
+        control_panel.addWidget(self.profile_check)
+
+        control_panel.addSpacing(10)
+        label_layout = QLabel("Kiểu format đồ thị")
+        label_layout.setObjectName("label_layout")
+        control_panel.addWidget(label_layout)
+        self.layout_combo = QComboBox()
+        self.layout_combo.addItems(["Hình tròn", "Lực đẩy"])
+        self.layout_combo.setToolTip("Lực đẩy: bố cục Fruchterman–Reingold, đồ thị được vẽ lại dần trong lúc hội tụ")
+        self.layout_combo.setStyleSheet("padding-left: 15px;")
+        self.layout_combo.setObjectName("layout_combo")
+        control_panel.addWidget(self.layout_combo)
         
         control_panel.addStretch()
 
@@ -191,28 +281,57 @@ class GraphGUI(QWidget):
         self.start_vertex_combo.addItem("Mặc định")
         for name, _ in self.graph.vertices:
             self.start_vertex_combo.addItem(name)
-        if current_start in [name for name, _ in self.graph.vertices] or current_start == "Mặc định":
+        if self.graph.has_vertex(current_start) or current_start == "Mặc định":
             self.start_vertex_combo.setCurrentText(current_start)
 
     def exit_step_mode(self):
         """Khởi động lại chế độ thực hiện từng bước và xóa kết quả hiển thị"""
         self.is_step_mode = False
         self.hamilton_steps = []
+        self.step_log.clear()
         self.result_output.setPlainText("")
 
     def auto_format_graph(self):
+        if self.layout_worker is not None:
+            # Bấm lại trong lúc đang sắp xếp: dừng bố cục lực đẩy
+            self.layout_worker.cancel()
+            return
         if not self.graph.vertices:
             QMessageBox.information(self, "Thông báo", "Không có đồ thị để format.")
             return
         self.graph_area.push_undo()
         width = self.graph_area.width()
         height = self.graph_area.height()
+        layout_name = self.layout_combo.currentText()
+        if layout_name == "Lực đẩy":
+            # Chạy trên luồng riêng, tọa độ được cập nhật dần qua on_layout_progress
+            self.layout_worker = LayoutWorker(self.graph, width, height, parent=self)
+            self.layout_worker.positions_ready.connect(self.on_layout_progress)
+            self.layout_worker.finished.connect(self.on_layout_finished)
+            self.btn_format.setText("Dừng format")
+            self.progress_label.setText("Đang sắp xếp đồ thị theo kiểu Lực đẩy...")
+            self.layout_worker.start()
+            return
         format_graph_circular(self.graph, width, height)
-        layout_name = "Hình tròn"
         self.graph_area.update()
         self.update_vertex_combo()
         QMessageBox.information(self, "Thành công", f"Đã format đồ thị theo kiểu {layout_name}.")
 
+    def on_layout_progress(self, iteration, names, coords):
+        apply_layout(self.graph, names, coords)
+        self.graph_area.update()
+        self.progress_label.setText(f"Đang sắp xếp đồ thị theo kiểu Lực đẩy: vòng lặp {iteration}")
+
+    def on_layout_finished(self):
+        cancelled = self.layout_worker.cancelled
+        self.layout_worker.deleteLater()
+        self.layout_worker = None
+        self.btn_format.setText("Format đồ thị")
+        if cancelled:
+            self.progress_label.setText("Đã dừng sắp xếp đồ thị.")
+        else:
+            self.progress_label.setText("Đã format đồ thị theo kiểu Lực đẩy.")
+
     def generate_random_graph(self):
         self.graph_area.push_undo()
         generate_random_graph(self.graph, num_vertices=random.randint(3,6))
@@ -223,6 +342,7 @@ class GraphGUI(QWidget):
         self.components.clear()
         self.info_box.clear()
         self.hamilton_steps = []
+        self.step_log.clear()
         self.is_step_mode = False
         self.update_vertex_combo()
         self.graph_area.clear_components()
@@ -242,13 +362,14 @@ class GraphGUI(QWidget):
         self.components.clear()
         self.info_box.clear()
         self.hamilton_steps = []
+        self.step_log.clear()
         self.is_step_mode = False
         self.update_vertex_combo()
         self.graph_area.clear_components()
 
     def check_condition_graph(self):
         
-        if connected_components(self.graph)[0] > 1:
+        if self.graph.component_count() > 1:
             self.result_output.setPlainText( 
             "Đồ thị không liên thông nên không thể có chu trình Hamilton.\n"
             "Vì vậy không cần kiểm các định lý đủ Dirac/Ore (chúng chắc chắn không thỏa).")
@@ -278,41 +399,163 @@ class GraphGUI(QWidget):
         
 
     def run_algorithm(self):
+        if self.solver_worker is not None:
+            return
         if not self.graph.vertices:
             self.result_output.setPlainText("Không có đồ thị để thực hiện.")
             self.graph_area.clear_hamilton_visualization()
             self.hamilton_steps = []
+            self.step_log.clear()
             self.is_step_mode = False
             return
         algo = self.algorithm_combo.currentText()
         start_vertex = self.start_vertex_combo.currentText()
         if start_vertex == "Mặc định":
             start_vertex = None
+        if algo == "Quy hoạch động" and len(self.graph.vertices) > DP_MAX_VERTICES:
+            QMessageBox.warning(self, "Không hỗ trợ",
+                                f"Quy hoạch động chỉ hỗ trợ tối đa {DP_MAX_VERTICES} đỉnh "
+                                f"(đồ thị có {len(self.graph.vertices)} đỉnh). Hãy chọn giải thuật khác.")
+            return
+        solver = self.solvers[algo]
+        cache_name = algo
+        options = {}
         if algo == "Quay lui":
-            result = hamiltonian_cycle_with_steps(self.graph, start_vertex=start_vertex)
-        elif algo == "Nhánh cận":
-            result = hamiltonian_cycle_branch_and_bound(self.graph, start_vertex=start_vertex)
-        elif algo == "Brute Force":
-            result = hamiltonian_cycle_brute_force(self.graph, start_vertex=start_vertex)
+            options = self.backtrack_orders[self.order_combo.currentText()]
+            if options:
+                solver = partial(solver, **options)
+                # Tên theo hằng số thứ tự (không theo nhãn hiển thị): dùng cho khóa bộ nhớ đệm và tên file báo cáo
+                variant = options["order"]
+                if options.get("restart_nodes"):
+                    variant += "-restart"
+                if options.get("seed") is not None:
+                    variant += f"-seed{options['seed']}"
+                cache_name = f"{algo} {variant}"
+        if self.parallel_check.isChecked() and algo in self.parallel_engines:
+            solver = partial(hamiltonian_cycle_parallel, engine=self.parallel_engines[algo], options=options)
+            cache_name = f"{cache_name} (song song)"
+
+        cache_key = self.result_cache.key(self.graph, cache_name, start_vertex)
+        # Khi đo hiệu năng luôn chạy lại giải thuật, không lấy từ bộ nhớ đệm
+        profiler = RunProfiler() if self.profile_check.isChecked() else None
+        cached = self.result_cache.get(cache_key, need_steps=self.is_step_mode) if profiler is None else None
+        if cached is not None:
+            self.on_algorithm_finished(cached)
+            self.progress_label.setText(f"Kết quả lấy từ bộ nhớ đệm ({cached.get('nodes', 0)} nút)")
+            return
+        num_vertices = len(self.graph.vertices)
+        if algo == "Quy hoạch động" and DP_WARN_VERTICES < num_vertices:
+            answer = QMessageBox.question(
+                self, "Xác nhận",
+                f"Quy hoạch động trên {num_vertices} đỉnh duyệt tới 2^{num_vertices - 1} trạng thái, "
+                f"có thể mất vài chục giây và hàng chục MB bộ nhớ. Tiếp tục?")
+            if answer != QMessageBox.Yes:
+                return
+
+        # Chạy giải thuật trên luồng riêng, giao diện vẫn phản hồi và có thể bấm "Dừng"
+        if profiler is not None:
+            profiler.start()
+        self.solver_worker = SolverWorker(solver, self.graph, start_vertex, self.timeout_spin.value(), self, profiler)
+        self.solver_worker.progress.connect(self.on_algorithm_progress)
+        self.solver_worker.result_ready.connect(lambda result: self.on_solver_result(cache_key, result, profiler, cache_name))
+        self.solver_worker.finished.connect(self.on_worker_finished)
+        self.btn_execute.setEnabled(False)
+        self.graph_area.btn_stop.setVisible(True)
+        self.progress_label.setText(f"Đang chạy {algo}...")
+        self.result_output.setPlainText("Đang tìm chu trình Hamilton... Bấm \"Dừng\" để hủy.")
+        self.step_log.clear()
+        self.solver_worker.start()
+
+    def on_solver_result(self, cache_key, result, profiler=None, algorithm=""):
+        self.result_cache.put(cache_key, result)
+        if profiler is None or result.get('error'):
+            # Lỗi: SolverWorker đã dừng profiler, không có báo cáo
+            self.on_algorithm_finished(result)
+            return
+        with profiler.phase("Hiển thị kết quả"):
+            self.on_algorithm_finished(result)
+        profiler.stop()
+        self.save_profile(profiler, algorithm)
+
+    def save_profile(self, profiler, algorithm):
+        """Lưu báo cáo hiệu năng cạnh file đồ thị (đồ thị chưa lưu: thư mục hiện tại)"""
+        graph_file = pathlib.Path(self.graph_file) if self.graph_file else pathlib.Path.cwd() / "do_thi"
+        path = report_path(graph_file, algorithm)
+        try:
+            profiler.save(path, f"{graph_file.name} - {algorithm}")
+        except OSError as e:
+            QMessageBox.warning(self, "Lỗi", f"Không thể lưu báo cáo hiệu năng: {str(e)}")
+            return
+        self.progress_label.setText(self.progress_label.text() + f" - Đã lưu báo cáo hiệu năng: {path}")
+
+    def on_algorithm_progress(self, nodes, depth, rate):
+        self.progress_label.setText(f"Đang chạy: {nodes} nút, độ sâu {depth}, {rate:,.0f} nút/giây")
+
+    def on_worker_finished(self):
+        self.solver_worker.deleteLater()
+        self.solver_worker = None
+        self.btn_execute.setEnabled(True)
+
+    def cancel_algorithm(self):
+        """Yêu cầu dừng giải thuật đang chạy; trả về False nếu không có giải thuật nào đang chạy"""
+        if self.solver_worker is None:
+            return False
+        self.solver_worker.cancel()
+        self.progress_label.setText("Đang dừng thuật toán...")
+        return True
+
+    def closeEvent(self, event):
+        if self.solver_worker is not None:
+            self.solver_worker.cancel()
+            self.solver_worker.wait()
+        if self.layout_worker is not None:
+            self.layout_worker.cancel()
+            self.layout_worker.wait()
+        super().closeEvent(event)
+
+    def on_algorithm_finished(self, result):
+        nodes = result.get('nodes', 0)
+        summary = f"Đã duyệt {nodes} nút trong {result.get('elapsed', 0):.3f} giây"
+        stats = result.get('stats')
+        if stats is not None:
+            summary += (f" ({stats.nodes_per_second:,.0f} nút/giây, {stats.backtracks} lần quay lui, "
+                        f"độ sâu tối đa {stats.max_depth}, {sum(stats.prunes.values())} lần cắt nhánh)")
+        self.progress_label.setText(summary)
         self.hamilton_steps = result.get('steps', [])
+        if result.get('error'):
+            self.step_log.clear()
+            self.graph_area.clear_hamilton_visualization()
+            self.is_step_mode = False
+            self.progress_label.setText("Giải thuật gặp lỗi")
+            self.result_output.setPlainText(f"Lỗi khi chạy giải thuật: {result['error']}")
+            return
+        if result.get('cancelled'):
+            self.step_log.clear()
+            self.graph_area.clear_hamilton_visualization()
+            self.is_step_mode = False
+            if result['cancelled'] == "timeout":
+                self.result_output.setPlainText(f"Hết thời gian giới hạn ({self.timeout_spin.value()} giây) - đã dừng thuật toán sau {nodes} nút.")
+            else:
+                self.result_output.setPlainText(f"Đã dừng thuật toán sau {nodes} nút.")
+            return
+        # Các bước được hiển thị trong danh sách ảo, không ghép thành một chuỗi lớn
+        self.step_log.set_steps(self.hamilton_steps)
         if self.is_step_mode:
             self.graph_area.set_hamilton_steps(self.hamilton_steps)
             self.update_step_display(0)
         else:
             self.graph_area.set_hamilton_visualization(result.get('path', []))
             if result.get('success'):
-                output = "Chu trình Hamilton tìm được:\n" + " → ".join(result.get('path', [])) + "\n\n"
-                output += "Các bước thực hiện:\n"
-                for step in self.hamilton_steps:
-                    output += f"Bước {step.get('step', '')}: {step.get('action', '')}\n"
-                output += f"\nTổng số bước: {result.get('total_steps', len(self.hamilton_steps))}"
-                self.result_output.setPlainText(output)
+                output = "Chu trình Hamilton tìm được:\n" + " → ".join(result.get('path', [])) + "\n"
             else:
-                output = "Không tìm thấy chu trình Hamilton.\n\nBởi vì:\n"
-                for step in self.hamilton_steps:
-                    output += f"Bước {step.get('step', '')}: {step.get('action', '')}\n"
-                output += f"\nTổng số bước: {result.get('total_steps', len(self.hamilton_steps))}"
-                self.result_output.setPlainText(output)
+                output = "Không tìm thấy chu trình Hamilton.\n"
+            total = result.get('total_steps', len(self.hamilton_steps))
+            output += f"\nTổng số bước: {total}"
+            if total > len(self.hamilton_steps):
+                output += f" (lưu lại {len(self.hamilton_steps)} bước)"
+            if self.hamilton_steps:
+                output += "\nCác bước thực hiện: xem danh sách bên dưới (tìm kiếm, nhảy tới bước)."
+            self.result_output.setPlainText(output)
 
     def update_step_display(self, step_index):
         """Cập nhật kết quả dựa trên bước đi hiện tại"""
@@ -324,25 +567,36 @@ class GraphGUI(QWidget):
         output += f"Đường đi hiện tại: {' → '.join(step['path']) if step['path'] else 'Rỗng'}\n"
         output += f"Tổng số bước: {len(self.hamilton_steps)}"
         self.result_output.setPlainText(output)
+        self.step_log.select_row(step_index)
+
+    def on_step_selected(self, row):
+        """Chọn một dòng trong nhật ký các bước: ở chế độ từng bước thì nhảy tới bước đó"""
+        if self.is_step_mode:
+            self.graph_area.show_step(row)
 
     def run_exportfile(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Lưu đồ thị", "", "JSON Files (*.json);;All Files (*)")
+        file_path, selected = QFileDialog.getSaveFileName(self, "Lưu đồ thị", "", GRAPH_FILE_FILTER)
         if file_path:
+            if selected.startswith("Graph Binary") and not file_path.lower().endswith(".hgb"):
+                file_path += ".hgb"
             export_file(self.graph, file_path)
+            self.graph_file = file_path
             QMessageBox.information(self, "Thành công", "Lưu đồ thị thành công!")
     
     def run_importfile(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Nhập đồ thị", "", "JSON Files (*.json);;All Files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Nhập đồ thị", "", GRAPH_FILE_FILTER)
         if file_path:
             try:
                 self.graph_area.push_undo()
                 import_file(self.graph, file_path)
+                self.graph_file = file_path
                 self.graph_area.selected_vertices.clear()
                 self.graph_area.clear_hamilton_visualization()
                 self.graph_area.update()
                 self.result_output.clear()
                 self.components.clear()
                 self.hamilton_steps = []
+                self.step_log.clear()
                 self.is_step_mode = False
                 self.update_vertex_combo()
                 self.graph_area.clear_components()
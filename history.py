@@ -0,0 +1,175 @@
+from collections import deque
+
+
+class History:
+    """Lịch sử hoàn tác / làm lại dạng delta: chỉ lưu những gì đã thay đổi.
+
+    Graph báo mỗi thay đổi qua record(op) khi graph.history trỏ tới đối tượng này.
+    Các thao tác (op) gồm:
+      ("add_vertex", (tên, tọa độ))
+      ("add_edge", cạnh)
+      ("position", tên, tọa độ cũ, tọa độ mới)
+      ("control_point", cạnh, điểm cũ, điểm mới)     - None: không có điểm điều khiển
+      ("remove_vertices", [(chỉ số, (tên, tọa độ))], [(cạnh, điểm điều khiển)])
+      ("remove_edge", cạnh, điểm điều khiển)
+      ("state", (vertices, edges, control_points) cũ, ... mới)   - xóa / thay toàn bộ đồ thị
+
+    begin() mở một mục lịch sử mới (một lần hoàn tác); các thay đổi sau đó được gộp
+    vào mục này. Trong một mục, các lần di chuyển liên tiếp cùng một đỉnh (hoặc cùng
+    một điểm điều khiển) được gộp thành một thao tác, nên kéo thả chỉ tốn O(số đỉnh bị kéo).
+    Hoàn tác / làm lại chi phí O(số thao tác của mục).
+
+    max_records giới hạn tổng số thao tác được giữ (thao tác "state" tính theo số phần tử
+    của đồ thị); khi vượt, các mục cũ nhất bị bỏ.
+    """
+
+    def __init__(self, graph, max_records=1_000_000):
+        self.graph = graph
+        self.max_records = max_records
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self._current = None
+        self._records = 0
+        # (loại, khóa) -> vị trí thao tác có thể gộp trong mục hiện tại
+        self._mergeable = {}
+        graph.history = self
+
+    def begin(self):
+        """Bắt đầu một mục lịch sử mới (gọi trước mỗi hành động của người dùng)"""
+        self._close()
+        self._current = []
+
+    def _close(self):
+        if self._current:
+            self.undo_stack.append(self._current)
+            self._records += self._cost(self._current)
+            self._trim()
+        self._current = None
+        self._mergeable = {}
+
+    def record(self, op):
+        if self._current is None:
+            self._current = []
+        if not self._current:
+            # Thay đổi mới làm mất các mục đã hoàn tác
+            self.redo_stack.clear()
+        kind = op[0]
+        if kind == "position" or kind == "control_point":
+            key = (kind, op[1] if kind == "position" else frozenset(op[1]))
+            i = self._mergeable.get(key)
+            if i is not None:
+                previous = self._current[i]
+                self._current[i] = (kind, previous[1], previous[2], op[3])
+                return
+            self._mergeable[key] = len(self._current)
+        else:
+            # Sau thay đổi cấu trúc, di chuyển tiếp theo phải được ghi riêng
+            self._mergeable = {}
+        self._current.append(op)
+
+    def can_undo(self):
+        return bool(self._current) or bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        self._close()
+        if not self.undo_stack:
+            return False
+        entry = self.undo_stack.pop()
+        self._records -= self._cost(entry)
+        self._replay(entry, undo=True)
+        self.redo_stack.append(entry)
+        return True
+
+    def redo(self):
+        self._close()
+        if not self.redo_stack:
+            return False
+        entry = self.redo_stack.pop()
+        self._replay(entry, undo=False)
+        self.undo_stack.append(entry)
+        self._records += self._cost(entry)
+        self._trim()
+        return True
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._current = None
+        self._records = 0
+        self._mergeable = {}
+
+    def _trim(self):
+        while len(self.undo_stack) > 1 and self._records > self.max_records:
+            self._records -= self._cost(self.undo_stack.popleft())
+
+    @staticmethod
+    def _cost(entry):
+        cost = 0
+        for op in entry:
+            if op[0] == "state":
+                cost += sum(len(part) for part in op[1]) + sum(len(part) for part in op[2])
+            elif op[0] == "remove_vertices":
+                cost += len(op[1]) + len(op[2])
+            else:
+                cost += 1
+        return cost
+
+    def _replay(self, entry, undo):
+        graph = self.graph
+        # Không ghi lại các thay đổi do chính hoàn tác / làm lại tạo ra
+        graph.history = None
+        try:
+            for op in (reversed(entry) if undo else entry):
+                apply_op(graph, op, undo)
+        finally:
+            graph.history = self
+
+
+def set_control_point(graph, edge, point):
+    if point is None:
+        graph.remove_control_point(edge)
+    else:
+        graph.set_control_point(edge, point)
+
+
+def apply_op(graph, op, undo):
+    """Thực hiện thao tác op (undo=False) hoặc thao tác ngược của nó (undo=True)"""
+    kind = op[0]
+    if kind == "add_vertex":
+        if undo:
+            graph.remove_vertices([op[1][0]])
+        else:
+            graph.add_vertex(op[1])
+    elif kind == "add_edge":
+        if undo:
+            graph.remove_edge(op[1])
+        else:
+            graph.add_edge(op[1])
+    elif kind == "position":
+        graph.set_position(op[1], op[2] if undo else op[3])
+    elif kind == "control_point":
+        set_control_point(graph, op[1], op[2] if undo else op[3])
+    elif kind == "remove_vertices":
+        _, removed_vertices, removed_edges = op
+        if undo:
+            # Chèn lại theo chỉ số tăng dần để mỗi đỉnh về đúng vị trí cũ
+            for index, vertex in removed_vertices:
+                graph.insert_vertex(index, vertex)
+            for edge, control_point in removed_edges:
+                graph.add_edge(edge)
+                set_control_point(graph, edge, control_point)
+        else:
+            graph.remove_vertices([vertex[0] for _, vertex in removed_vertices])
+    elif kind == "remove_edge":
+        _, edge, control_point = op
+        if undo:
+            graph.add_edge(edge)
+            set_control_point(graph, edge, control_point)
+        else:
+            graph.remove_edge(edge)
+    elif kind == "state":
+        vertices, edges, control_points = op[1] if undo else op[2]
+        graph.set_state(list(vertices), list(edges), dict(control_points))
@@ -0,0 +1,46 @@
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from force_layout import force_layout_steps, layout_input
+
+
+class LayoutWorker(QThread):
+    """Chạy bố cục lực đẩy (force_layout) trên luồng riêng để giao diện không bị treo.
+
+    Giải thuật chạy trên bản chụp tên đỉnh, tọa độ và cạnh lúc bắt đầu. Tọa độ trung
+    gian được gửi qua tín hiệu positions_ready(số vòng, tên đỉnh, tọa độ) không quá
+    một lần mỗi interval giây (và luôn gửi kết quả cuối) để người dùng thấy đồ thị
+    hội tụ dần; finished báo khi chạy xong hoặc bị hủy.
+    """
+
+    positions_ready = pyqtSignal(int, object, object)
+
+    def __init__(self, graph, width, height, iterations=300, interval=0.05, parent=None):
+        super().__init__(parent)
+        self.names, self.positions, self.edges = layout_input(graph)
+        self.width = width
+        self.height = height
+        self.iterations = iterations
+        self.interval = interval
+        self.cancelled = False
+
+    def run(self):
+        next_report = 0.0
+        pending = None
+        for iteration, coords in force_layout_steps(self.positions, self.edges, self.width, self.height,
+                                                    self.iterations):
+            if self.cancelled:
+                return
+            now = time.perf_counter()
+            if now >= next_report:
+                next_report = now + self.interval
+                self.positions_ready.emit(iteration, self.names, coords)
+                pending = None
+            else:
+                pending = (iteration, coords)
+        if pending is not None:
+            self.positions_ready.emit(pending[0], self.names, pending[1])
+
+    def cancel(self):
+        # Gán một biến bool là an toàn giữa các luồng; bố cục dừng ở vòng lặp kế tiếp
+        self.cancelled = True
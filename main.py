@@ -1,12 +1,21 @@
+import argparse
+import pathlib
 import sys
 from PyQt5.QtWidgets import QApplication
 from gui import GraphGUI
 
+# File bộ nhớ đệm kết quả khi dùng --result-cache không kèm đường dẫn
+DEFAULT_RESULT_CACHE = pathlib.Path.home() / ".hamilton_result_cache"
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = GraphGUI()
+    parser = argparse.ArgumentParser(description="Ứng dụng vẽ đồ thị và tìm chu trình Hamilton")
+    parser.add_argument("--result-cache", nargs="?", const=DEFAULT_RESULT_CACHE, default=None, metavar="FILE",
+                        help=f"lưu bản tóm tắt kết quả ra đĩa để dùng lại sau khi khởi động lại (mặc định: {DEFAULT_RESULT_CACHE})")
+    # Các tham số còn lại (của Qt) được chuyển cho QApplication
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = GraphGUI(result_cache_path=args.result_cache)
     window.showMaximized()
     window.show()
     sys.exit(app.exec_())
-
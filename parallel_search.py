@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing
+import os
+
+from graph import Graph
+from graph_algorithms import (
+    begin_search, search_result, stopped_result,
+    hamiltonian_cycle_with_steps, hamiltonian_cycle_branch_and_bound
+)
+from search_control import SearchControl, SearchCancelled
+from search_stats import SearchStats
+from step_trace import StepTrace
+
+# Các giải thuật có thể chạy song song theo nhánh
+ENGINES = {
+    "backtracking": hamiltonian_cycle_with_steps,
+    "branch_and_bound": hamiltonian_cycle_branch_and_bound,
+}
+
+# Trạng thái riêng của mỗi tiến trình con, được gán một lần trong init_worker
+_worker_graph = None
+_worker_stop = None
+
+
+def init_worker(names, edges, stop_event):
+    """Dựng lại đồ thị (chỉ tên đỉnh và cạnh) một lần cho mỗi tiến trình con"""
+    global _worker_graph, _worker_stop
+    graph = Graph()
+    graph.load([(name, None) for name in names], edges)
+    _worker_graph = graph
+    _worker_stop = stop_event
+
+
+def solve_branch(engine, prefix, options=None):
+    """Tìm chu trình trong nhánh con của tiền tố (chạy trong tiến trình con)"""
+    control = SearchControl(stop_event=_worker_stop)
+    result = ENGINES[engine](_worker_graph, trace="off", control=control, prefix=list(prefix), **(options or {}))
+    return prefix, result['success'], result['path'], result['stats']
+
+
+def branch_prefixes(adjacent, start_vertex, depth):
+    """Các tiền tố độ dài depth + 1 bắt đầu từ start_vertex, theo thứ tự đỉnh
+
+    adjacent: đỉnh kề đã sắp theo thứ tự đỉnh (GraphAnalysis.ordered_adjacency)
+    """
+    prefixes = [(start_vertex,)]
+    for _ in range(depth):
+        extended = []
+        for prefix in prefixes:
+            for v in adjacent[prefix[-1]]:
+                if v not in prefix:
+                    extended.append(prefix + (v,))
+        prefixes = extended
+    return prefixes
+
+
+def hamiltonian_cycle_parallel(graph, start_vertex=None, trace=None, control=None,
+                               engine="branch_and_bound", workers=None, split_depth=2, options=None):
+    """Tìm chu trình Hamilton song song trên nhiều lõi CPU.
+
+    Cây tìm kiếm được chia theo split_depth (1 hoặc 2) đỉnh đầu tiên sau đỉnh
+    bắt đầu; mỗi tiền tố là một công việc cho ProcessPoolExecutor. Các tiến trình
+    rảnh lấy công việc kế tiếp từ hàng đợi chung nên tải được cân bằng tự động.
+    Tiến trình đầu tiên tìm thấy chu trình sẽ làm các tiến trình khác dừng lại
+    (qua một multiprocessing.Event). Kết quả có cùng dạng với các giải thuật tuần tự,
+    'nodes', 'prunes' và các bộ đếm trong 'stats' là tổng của mọi nhánh đã chạy
+    (thời gian tìm kiếm trong 'stats' là thời gian thực của cả lần chạy song song).
+
+    engine: "backtracking" hoặc "branch_and_bound"
+    workers: số tiến trình, mặc định bằng số lõi CPU
+    options: tham số thêm cho giải thuật của mỗi nhánh (ví dụ order, seed của Quay lui)
+    """
+    # Đồ thị quá nhỏ để chia nhánh: chạy tuần tự, trước begin_search để các bước kiểm
+    # tra chung không bị ghi hai lần
+    depth = min(split_depth, len(graph.vertices) - 2)
+    if depth < 1:
+        return ENGINES[engine](graph, start_vertex, trace=trace, control=control, **(options or {}))
+
+    trace = StepTrace.from_policy(trace)
+    stats = SearchStats()
+    early, context = begin_search(graph, start_vertex, trace, "Song song", stats)
+    if early:
+        return early
+    vertices, adjacency, start_vertex = context
+    tracing = trace.active
+
+    prefixes = branch_prefixes(graph.analysis().ordered_adjacency, start_vertex, depth)
+    workers = workers or os.cpu_count() or 1
+    if tracing:
+        trace.record('info', depth=0, detail=f"Chia cây tìm kiếm thành {len(prefixes)} nhánh theo {depth} đỉnh đầu tiên sau {start_vertex}, chạy trên {workers} tiến trình")
+    if not prefixes:
+        if tracing:
+            trace.record('fail', start_vertex)
+        return search_result(False, None, trace, 0, stats)
+
+    context = multiprocessing.get_context()
+    stop_event = context.Event()
+    edges = [(u, v) for u, v in graph.edges]
+    found = None
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=init_worker, initargs=(vertices, edges, stop_event))
+    pending = {pool.submit(solve_branch, engine, prefix, options) for prefix in prefixes}
+    try:
+        while pending and found is None:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                prefix, success, path, branch_stats = future.result()
+                stats.merge(branch_stats)
+                if success and found is None:
+                    found = (prefix, path)
+            if control is not None and found is None:
+                control.check(stats.nodes, depth, stats)
+    except SearchCancelled as stop:
+        result = stopped_result(trace, stats.nodes, stop, stats)
+        result['prunes'] = stats.prunes
+        return result
+    finally:
+        # Dừng các nhánh đang chạy và bỏ các nhánh chưa bắt đầu
+        stop_event.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    if found is None:
+        if tracing:
+            trace.record('fail', start_vertex)
+        result = search_result(False, None, trace, stats.nodes, stats)
+    else:
+        prefix, path = found
+        if tracing:
+            for i, v in enumerate(path[:-1]):
+                trace.advance(v, i)
+            last = len(path) - 2
+            trace.record('info', depth=last, detail=f"Nhánh {' → '.join(prefix)} tìm thấy chu trình, dừng các nhánh còn lại")
+            trace.record('success', depth=last)
+        result = search_result(True, path, trace, stats.nodes, stats)
+    result['prunes'] = stats.prunes
+    result['branches'] = len(prefixes)
+    result['workers'] = workers
+    return result
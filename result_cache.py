@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import dbm
+import shelve
+
+from search_stats import SearchStats
+from step_trace import StepTrace, TRACE_FULL
+
+# Phiên bản dạng bản tóm tắt trên đĩa và ý nghĩa kết quả của các giải thuật; tăng khi
+# một trong hai thay đổi để các bản tóm tắt cũ không còn được dùng
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """Bộ nhớ đệm kết quả giải thuật, khóa theo mã băm cấu trúc đồ thị.
+
+    Khóa gồm Graph.fingerprint() (tên đỉnh và tập cạnh), tên giải thuật và đỉnh
+    bắt đầu, nên mọi thay đổi cấu trúc (thêm/xóa đỉnh, cạnh, nhập file) tự động
+    cho khóa mới, còn di chuyển đỉnh hay chỉnh điểm điều khiển thì không.
+
+    Trong bộ nhớ giữ kết quả đầy đủ (kể cả các bước), loại bỏ theo LRU khi vượt
+    max_entries kết quả hoặc max_steps bước được lưu. Nếu có path (mặc định không có),
+    bản tóm tắt (không có các bước) được ghi thêm vào file shelve để dùng lại sau khi
+    khởi động lại. Bản tóm tắt chỉ gồm dữ liệu thuần (stats lưu dạng as_dict()) và khóa
+    có CACHE_VERSION; bản tóm tắt không đọc được được coi như không có trong bộ nhớ đệm.
+    """
+
+    def __init__(self, max_entries=32, max_steps=2_000_000, path=None):
+        self.max_entries = max_entries
+        self.max_steps = max_steps
+        self.path = path
+        self._entries = OrderedDict()
+        self._stored_steps = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(graph, algorithm, start_vertex=None):
+        return f"v{CACHE_VERSION}|{graph.fingerprint()}|{algorithm}|{'' if start_vertex is None else start_vertex}"
+
+    def get(self, key, need_steps=False):
+        """Lấy kết quả đã lưu; need_steps=True chỉ nhận kết quả còn đủ các bước"""
+        entry = self._entries.get(key)
+        if entry is not None and (not need_steps or has_full_steps(entry)):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        if not need_steps and self.path:
+            summary = self._read_disk(key)
+            if summary is not None:
+                self.hits += 1
+                result = dict(summary)
+                result['steps'] = StepTrace("off")
+                if result.get('stats') is not None:
+                    result['stats'] = SearchStats.from_dict(result['stats'])
+                return result
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Lưu kết quả; kết quả bị hủy / hết thời gian / lỗi không được lưu"""
+        if result.get('cancelled') or result.get('error'):
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._stored_steps -= len(old['steps'])
+        self._entries[key] = result
+        self._stored_steps += len(result['steps'])
+        while self._entries and (len(self._entries) > self.max_entries or self._stored_steps > self.max_steps):
+            _, evicted = self._entries.popitem(last=False)
+            self._stored_steps -= len(evicted['steps'])
+
+        if self.path:
+            summary = {k: v for k, v in result.items() if k != 'steps'}
+            if isinstance(summary.get('stats'), SearchStats):
+                summary['stats'] = summary['stats'].as_dict()
+            try:
+                with shelve.open(str(self.path)) as store:
+                    store[key] = summary
+            except (OSError,) + dbm.error:
+                # Không ghi được file: chỉ dùng bộ nhớ đệm trong RAM
+                self.path = None
+
+    def _read_disk(self, key):
+        try:
+            with shelve.open(str(self.path)) as store:
+                try:
+                    summary = store.get(key)
+                except Exception:
+                    # Bản ghi hỏng hoặc của phiên bản khác (lỗi unpickle): coi như chưa có
+                    return None
+        except (OSError,) + dbm.error:
+            self.path = None
+            return None
+        return summary if isinstance(summary, dict) else None
+
+    def clear(self):
+        self._entries.clear()
+        self._stored_steps = 0
+
+
+def has_full_steps(result):
+    """Kết quả có đủ mọi bước: ghi vết toàn bộ (TRACE_FULL) và không bản ghi nào bị bỏ"""
+    steps = result.get('steps')
+    return isinstance(steps, StepTrace) and steps.mode == TRACE_FULL and len(steps) == steps.count
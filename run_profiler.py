@@ -0,0 +1,133 @@
+from contextlib import contextmanager, nullcontext
+import cProfile
+import io
+import pathlib
+import pstats
+import re
+import time
+import tracemalloc
+
+# Số dòng của mỗi bảng trong báo cáo
+TOP = 25
+# Bỏ các cấp phát của chính tracemalloc, của module này và của cơ chế import khỏi bảng bộ nhớ
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class RunProfiler:
+    """Đo hiệu năng một lần chạy giải thuật cùng phần hiển thị kết quả.
+
+    Mỗi giai đoạn (phase) có một cProfile.Profile riêng, bật trên luồng chạy khối
+    with, nên cả giải thuật trên SolverWorker lẫn phần hiển thị trên luồng giao diện
+    đều được đo. tracemalloc theo dõi cả tiến trình từ start() tới stop(); báo cáo
+    so sánh hai ảnh chụp bộ nhớ để chỉ ra các dòng cấp phát nhiều nhất. Các tiến
+    trình con của tìm kiếm song song không được đo.
+    """
+
+    def __init__(self, top=TOP):
+        self.top = top
+        # Các giai đoạn đã đo: (tên, số giây, cProfile.Profile)
+        self.phases = []
+        self.peak = 0
+        self._before = None
+        self._after = None
+        self._owns_tracing = False
+
+    def start(self):
+        """Bắt đầu theo dõi bộ nhớ và chụp trạng thái ban đầu"""
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def phase(self, name):
+        """Đo thời gian và cProfile của khối with trên luồng hiện tại"""
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.phases.append((name, time.perf_counter() - started, profile))
+
+    def stop(self):
+        """Chụp trạng thái bộ nhớ cuối và dừng tracemalloc (nếu start() đã bật)"""
+        if self._before is None:
+            return
+        self._after = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracing:
+            tracemalloc.stop()
+
+    def summary(self, title=""):
+        """Báo cáo dạng bảng: thời gian từng giai đoạn, các hàm tốn thời gian nhất, các dòng cấp phát nhiều nhất"""
+        lines = [f"Báo cáo hiệu năng: {title}" if title else "Báo cáo hiệu năng", ""]
+        lines.append("Thời gian theo giai đoạn:")
+        for name, seconds, _ in self.phases:
+            lines.append(f"  {name:<24} {seconds:10.4f} s")
+        lines.append(f"Bộ nhớ đỉnh (tracemalloc): {self.peak / 1048576:.2f} MiB")
+        lines.append("(Đo dưới cProfile và tracemalloc nên chậm hơn lần chạy thường; dùng để so sánh tỉ lệ giữa các phần)")
+
+        for name, _, profile in self.phases:
+            buffer = io.StringIO()
+            stats = pstats.Stats(profile, stream=buffer)
+            stats.strip_dirs().sort_stats("tottime", "cumulative").print_stats(self.top)
+            lines.append("")
+            lines.append(f"=== {name}: {self.top} hàm tốn thời gian nhất (tottime) ===")
+            lines.append(buffer.getvalue().strip("\n"))
+
+        if self._after is not None:
+            lines.append("")
+            lines.append(f"=== {self.top} dòng cấp phát nhiều bộ nhớ nhất (còn giữ sau lần chạy) ===")
+            lines.append(f"{'Tăng thêm':>12} {'Tổng':>12} {'Số khối':>9}  Vị trí")
+            before = self._before.filter_traces(SNAPSHOT_FILTERS)
+            after = self._after.filter_traces(SNAPSHOT_FILTERS)
+            for stat in after.compare_to(before, "lineno")[:self.top]:
+                frame = stat.traceback[0]
+                lines.append(f"{format_size(stat.size_diff):>12} {format_size(stat.size):>12} {stat.count:>9}  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path, title=""):
+        """Ghi báo cáo ra path và số liệu cProfile gộp mọi giai đoạn ra file cùng tên đuôi .prof
+
+        File .prof mở được bằng pstats, snakeviz... để xem chi tiết theo thời gian tích lũy.
+        """
+        path = pathlib.Path(path)
+        path.write_text(self.summary(title), encoding="utf-8")
+        if self.phases:
+            pstats.Stats(*(profile for _, _, profile in self.phases)).dump_stats(str(path.with_suffix(".prof")))
+        return path
+
+
+def phase(profiler, name):
+    """profiler.phase(name), hoặc khối rỗng khi không đo (profiler là None)"""
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+
+def report_path(graph_file, label):
+    """Đường dẫn báo cáo cạnh file đồ thị: <tên file>.<nhãn>.profile.txt
+
+    Các ký tự không an toàn trong tên file (khoảng trắng, dấu hai chấm, ngoặc...) của
+    nhãn được thay bằng "_".
+    """
+    graph_file = pathlib.Path(graph_file)
+    label = re.sub(r"[^\w.-]+", "_", label).strip("_") or "run"
+    return graph_file.with_name(f"{graph_file.stem}.{label}.profile.txt")
+
+
+def format_size(size):
+    """Số byte dạng dễ đọc"""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
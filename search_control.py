@@ -0,0 +1,60 @@
+import time
+
+# Số nút tìm kiếm giữa hai lần kiểm tra hủy / thời gian (phải là lũy thừa của 2)
+CHECK_EVERY = 1024
+
+
+class SearchCancelled(Exception):
+    """Ném ra bên trong giải thuật khi lần chạy bị hủy hoặc hết thời gian"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        # "cancelled": người dùng hủy, "timeout": hết thời gian giới hạn
+        self.reason = reason
+
+
+class SearchControl:
+    """Điều khiển một lần chạy giải thuật từ luồng khác: hủy, giới hạn thời gian và báo tiến độ.
+
+    Giải thuật gọi check() sau mỗi CHECK_EVERY nút; check() ném SearchCancelled
+    nếu đã bị hủy hoặc quá thời gian, và gọi on_progress(nodes, depth, nodes_per_second)
+    không quá một lần mỗi interval giây; on_sample(stats) được gọi cùng nhịp với
+    SearchStats của lần chạy (bộ đếm, số lần cắt nhánh theo lý do, thời gian từng
+    giai đoạn) để lấy mẫu số liệu trong lúc chạy. stop_event (multiprocessing.Event)
+    cho phép hủy từ tiến trình khác.
+    """
+
+    def __init__(self, timeout=None, on_progress=None, interval=0.2, stop_event=None, on_sample=None):
+        self.timeout = timeout if timeout else None
+        self.on_progress = on_progress
+        self.on_sample = on_sample
+        self.interval = interval
+        self.stop_event = stop_event
+        self.cancelled = False
+        self.restart()
+
+    def restart(self):
+        """Bắt đầu tính giờ lại từ thời điểm hiện tại"""
+        self.started = time.perf_counter()
+        self._next_report = self.started + self.interval
+
+    def cancel(self):
+        # Gán một biến bool là an toàn giữa các luồng; giải thuật sẽ dừng ở lần check() kế tiếp
+        self.cancelled = True
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def check(self, nodes, depth, stats=None):
+        if self.cancelled or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchCancelled("cancelled")
+        now = time.perf_counter()
+        elapsed = now - self.started
+        if self.timeout is not None and elapsed > self.timeout:
+            raise SearchCancelled("timeout")
+        if now >= self._next_report and (self.on_progress is not None or self.on_sample is not None):
+            self._next_report = now + self.interval
+            if self.on_progress is not None:
+                self.on_progress(nodes, depth, nodes / elapsed if elapsed > 0 else 0.0)
+            if self.on_sample is not None and stats is not None:
+                self.on_sample(stats)
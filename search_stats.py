@@ -0,0 +1,128 @@
+import time
+
+# Các giai đoạn của một lần chạy giải thuật
+PHASE_VALIDATION = "validation"  # Kiểm tra đồ thị rỗng / 1 đỉnh / liên thông, chọn đỉnh bắt đầu
+PHASE_CONDITIONS = "conditions"  # Kiểm tra định lý Dirac và Ore (chỉ khi có ghi vết)
+PHASE_SEARCH = "search"          # Tìm kiếm
+
+# Nhóm của từng lý do cắt nhánh (lý do là tên loại bước của StepTrace)
+PRUNE_GROUPS = {
+    "prune_disconnected": "connectivity",
+    "prune_cut": "connectivity",
+    "dead_end": "dead_end",
+    "prune_dead_end": "dead_end",
+    "perm_missing": "dead_end",
+    "no_close": "no_close",
+    "prune_no_return": "no_close",
+    "perm_no_close": "no_close",
+    "prune_degree": "degree",
+    "prune_forced": "forced",
+}
+
+
+class SearchStats:
+    """Số liệu của một lần chạy giải thuật, trả về trong result['stats'].
+
+    nodes       - số nút tìm kiếm đã mở (quy hoạch động: số trạng thái)
+    backtracks  - số lần bỏ đỉnh cuối khỏi đường đi để quay lui
+    prunes      - lý do -> số lần cắt nhánh; lý do là tên loại bước của StepTrace
+                  (prune_*, dead_end, no_close, perm_missing, perm_no_close)
+    max_depth   - độ sâu lớn nhất của đường đi đã đạt
+    phases      - giai đoạn -> số giây (PHASE_VALIDATION, PHASE_CONDITIONS, PHASE_SEARCH)
+
+    Giải thuật giữ bộ đếm trong biến cục bộ và chỉ ghi vào đối tượng (tally) khi
+    báo tiến độ và khi kết thúc, nên việc đo không làm chậm vòng tìm kiếm.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.prunes = {}
+        self.max_depth = 0
+        self.phases = {}
+        self._phase = None
+        self._phase_started = 0.0
+
+    def begin_phase(self, name):
+        """Kết thúc giai đoạn hiện tại (nếu có) và bắt đầu tính giờ giai đoạn name"""
+        now = time.perf_counter()
+        self._close_phase(now)
+        self._phase = name
+        self._phase_started = now
+
+    def finish(self):
+        """Kết thúc giai đoạn hiện tại"""
+        self._close_phase(time.perf_counter())
+        self._phase = None
+
+    def _close_phase(self, now):
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._phase_started
+
+    def phase_time(self, name):
+        """Số giây của giai đoạn name, tính cả phần đang chạy"""
+        seconds = self.phases.get(name, 0.0)
+        if self._phase == name:
+            seconds += time.perf_counter() - self._phase_started
+        return seconds
+
+    def tally(self, nodes, backtracks=0, max_depth=0):
+        """Ghi các bộ đếm giải thuật đang giữ"""
+        self.nodes = nodes
+        self.backtracks = backtracks
+        if max_depth > self.max_depth:
+            self.max_depth = max_depth
+
+    def prune(self, reason, count=1):
+        self.prunes[reason] = self.prunes.get(reason, 0) + count
+
+    @property
+    def nodes_per_second(self):
+        seconds = self.phase_time(PHASE_SEARCH)
+        return self.nodes / seconds if seconds > 0 else 0.0
+
+    def prune_groups(self):
+        """Số lần cắt nhánh theo nhóm (connectivity, dead_end, no_close, degree, forced)"""
+        groups = {}
+        for reason, count in self.prunes.items():
+            group = PRUNE_GROUPS.get(reason, reason)
+            groups[group] = groups.get(group, 0) + count
+        return groups
+
+    def merge(self, other):
+        """Cộng dồn bộ đếm của một lần chạy khác (các nhánh của tìm kiếm song song)"""
+        self.nodes += other.nodes
+        self.backtracks += other.backtracks
+        for reason, count in other.prunes.items():
+            self.prune(reason, count)
+        if other.max_depth > self.max_depth:
+            self.max_depth = other.max_depth
+
+    def as_dict(self):
+        """Dạng dict có thể ghi ra JSON"""
+        names = list(self.phases)
+        if self._phase is not None and self._phase not in self.phases:
+            names.append(self._phase)
+        return {
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "prunes": dict(self.prunes),
+            "max_depth": self.max_depth,
+            "phases": {name: self.phase_time(name) for name in names},
+            "nodes_per_second": self.nodes_per_second,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Tạo lại SearchStats từ as_dict() (ví dụ bản tóm tắt trong bộ nhớ đệm trên đĩa)"""
+        stats = cls()
+        stats.nodes = data.get("nodes", 0)
+        stats.backtracks = data.get("backtracks", 0)
+        stats.prunes = dict(data.get("prunes", {}))
+        stats.max_depth = data.get("max_depth", 0)
+        stats.phases = dict(data.get("phases", {}))
+        return stats
+
+    def __repr__(self):
+        return (f"SearchStats(nodes={self.nodes}, backtracks={self.backtracks}, "
+                f"max_depth={self.max_depth}, prunes={self.prunes})")
@@ -0,0 +1,47 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from graph_algorithms import search_result
+from search_control import SearchControl
+from run_profiler import phase
+from step_trace import StepTrace
+
+
+class SolverWorker(QThread):
+    """Chạy một giải thuật tìm chu trình Hamilton trên luồng riêng để giao diện không bị treo.
+
+    Giải thuật chạy trên bản sao của đồ thị nên người dùng vẫn có thể chỉnh sửa
+    trong lúc chờ. Tiến độ (số nút, độ sâu, số nút/giây) được gửi qua tín hiệu
+    progress, kết quả cuối cùng qua result_ready. Nếu có profiler (RunProfiler) thì
+    lần chạy giải thuật được đo thành giai đoạn "Giải thuật" trên luồng này.
+    Lỗi của giải thuật không thoát khỏi run() (PyQt5 sẽ dừng cả tiến trình) mà được
+    gửi qua result_ready dưới dạng kết quả có khóa 'error'; khi đó profiler được dừng luôn.
+    """
+
+    progress = pyqtSignal(int, int, float)
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, solver, graph, start_vertex=None, timeout=None, parent=None, profiler=None):
+        super().__init__(parent)
+        self.solver = solver
+        self.graph = graph.copy()
+        self.start_vertex = start_vertex
+        self.control = SearchControl(timeout=timeout, on_progress=self.progress.emit)
+        self.profiler = profiler
+
+    def run(self):
+        self.control.restart()
+        result = None
+        try:
+            with phase(self.profiler, "Giải thuật"):
+                result = self.solver(self.graph, start_vertex=self.start_vertex, control=self.control)
+        except Exception as e:
+            result = search_result(False, None, StepTrace("off"), 0)
+            result['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            # Không có kết quả bình thường thì cũng không có giai đoạn hiển thị để đo tiếp
+            if self.profiler is not None and (result is None or 'error' in result):
+                self.profiler.stop()
+        result['elapsed'] = self.control.elapsed()
+        self.result_ready.emit(result)
+
+    def cancel(self):
+        self.control.cancel()
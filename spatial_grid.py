@@ -0,0 +1,90 @@
+import math
+
+
+class SpatialGrid:
+    """Chỉ mục không gian dạng lưới đều cho các phần tử có hình chữ nhật bao.
+
+    Mặt phẳng được chia thành các ô vuông cạnh cell; mỗi phần tử (đỉnh, cạnh, ...)
+    được ghi vào mọi ô mà hình bao (x0, y0, x1, y1) của nó chạm tới. Truy vấn một
+    vùng chỉ xét các ô giao với vùng đó nên chi phí tỉ lệ với số phần tử gần vùng
+    chứ không phải toàn bộ đồ thị. Thêm / cập nhật / xóa một phần tử là O(số ô nó phủ).
+    Không phụ thuộc Qt.
+    """
+
+    def __init__(self, cell=64):
+        self.cell = cell
+        # (cx, cy) -> tập phần tử có hình bao chạm ô
+        self._cells = {}
+        # phần tử -> hình bao (x0, y0, x1, y1)
+        self._boxes = {}
+
+    def _cell_range(self, box):
+        x0, y0, x1, y1 = box
+        cell = self.cell
+        return (math.floor(x0 / cell), math.floor(y0 / cell),
+                math.floor(x1 / cell), math.floor(y1 / cell))
+
+    def insert(self, item, box):
+        """Thêm phần tử hoặc cập nhật hình bao nếu phần tử đã có"""
+        if item in self._boxes:
+            self.remove(item)
+        self._boxes[item] = box
+        cx0, cy0, cx1, cy1 = self._cell_range(box)
+        cells = self._cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = {item}
+                else:
+                    bucket.add(item)
+
+    def remove(self, item):
+        box = self._boxes.pop(item, None)
+        if box is None:
+            return
+        cx0, cy0, cx1, cy1 = self._cell_range(box)
+        cells = self._cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(item)
+                    if not bucket:
+                        del cells[(cx, cy)]
+
+    def box(self, item):
+        return self._boxes.get(item)
+
+    def query(self, x0, y0, x1, y1):
+        """Tập phần tử có hình bao giao với hình chữ nhật (x0, y0, x1, y1)"""
+        found = set()
+        cx0, cy0, cx1, cy1 = self._cell_range((x0, y0, x1, y1))
+        cells = self._cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Vùng truy vấn lớn hơn số ô đang dùng: duyệt các ô có phần tử
+            buckets = (bucket for (cx, cy), bucket in cells.items()
+                       if cx0 <= cx <= cx1 and cy0 <= cy <= cy1)
+        else:
+            buckets = (cells.get((cx, cy)) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1))
+        boxes = self._boxes
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for item in bucket:
+                if item in found:
+                    continue
+                bx0, by0, bx1, by1 = boxes[item]
+                if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                    found.add(item)
+        return found
+
+    def clear(self):
+        self._cells.clear()
+        self._boxes.clear()
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, item):
+        return item in self._boxes
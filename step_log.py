@@ -0,0 +1,185 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView, QHeaderView, QAbstractItemView, QLineEdit, QPushButton,
+    QSpinBox, QLabel, QApplication
+)
+
+
+class StepLogModel(QAbstractListModel):
+    """Mô hình danh sách các bước của giải thuật cho StepLogView.
+
+    Chỉ giữ tham chiếu tới StepTrace (các bản ghi gọn); chuỗi mô tả của một dòng chỉ
+    được tạo khi view cần vẽ dòng đó, nên nhật ký hàng triệu bước vẫn hiển thị ngay
+    và không tốn thêm bộ nhớ cho chuỗi.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._steps = []
+
+    def set_steps(self, steps):
+        self.beginResetModel()
+        self._steps = steps if steps is not None else []
+        self.endResetModel()
+
+    def steps(self):
+        return self._steps
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._steps)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        step = self._steps[index.row()]
+        text = f"Bước {step['step']}: {step['action']}"
+        # Mỗi dòng chỉ cao một dòng chữ; chú thích hiện đầy đủ
+        return text.replace("\n", " - ") if role == Qt.DisplayRole else text
+
+    def row_of_step(self, step):
+        """Dòng của bước số step (hoặc dòng đầu tiên sau nó nếu bước đó không được lưu)"""
+        if hasattr(self._steps, "index_of_step"):
+            return min(self._steps.index_of_step(step), len(self._steps) - 1)
+        for row, item in enumerate(self._steps):
+            if item['step'] >= step:
+                return row
+        return len(self._steps) - 1
+
+    def find(self, text, start=0, backward=False):
+        """Dòng đầu tiên từ start (xoay vòng) có mô tả chứa text; -1 nếu không có"""
+        if hasattr(self._steps, "find"):
+            return self._steps.find(text, start, backward)
+        total = len(self._steps)
+        text = text.casefold()
+        for offset in range(total if text else 0):
+            row = (start + (-offset if backward else offset)) % total
+            if text in self._steps[row]['action'].casefold():
+                return row
+        return -1
+
+
+class StepLogView(QWidget):
+    """Nhật ký các bước dạng danh sách ảo (StepLogModel), có tìm kiếm và nhảy tới bước.
+
+    Dùng QTableView một cột với chiều cao dòng cố định thay cho QListView: QListView
+    vẫn tính bố cục cho từng dòng khi đặt model (hai lần gọi rowCount mỗi dòng, vài
+    giây với nửa triệu bước), còn QTableView chỉ chạm tới các dòng đang hiện.
+
+    Tín hiệu step_selected(dòng) được gửi khi người dùng chọn một dòng (bấm chuột,
+    tìm kiếm, nhảy tới bước); select_row() chọn dòng từ chương trình mà không gửi tín hiệu.
+    """
+
+    step_selected = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = StepLogModel(self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        tools = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Tìm trong các bước...")
+        self.search_edit.setObjectName("step_search_edit")
+        self.btn_find_prev = QPushButton("Trước")
+        self.btn_find_next = QPushButton("Tiếp")
+        self.step_spin = QSpinBox()
+        self.step_spin.setObjectName("step_spin")
+        self.btn_goto = QPushButton("Đến bước")
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #666; font-size: 11px;")
+        for widget in (self.search_edit, self.btn_find_prev, self.btn_find_next, self.step_spin, self.btn_goto):
+            tools.addWidget(widget)
+        layout.addLayout(tools)
+        layout.addWidget(self.status_label)
+
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.horizontalHeader().hide()
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        rows = self.table_view.verticalHeader()
+        rows.hide()
+        # Mọi dòng cùng chiều cao: view không phải đo từng dòng, chỉ vẽ các dòng đang hiện
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(self.fontMetrics().height() + 4)
+        self.table_view.setShowGrid(False)
+        self.table_view.setWordWrap(False)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_view.setStyleSheet("background-color: white; border: 1px solid #ccc;")
+        layout.addWidget(self.table_view)
+
+        self._selecting = False
+        self.table_view.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
+        self.search_edit.returnPressed.connect(self.find_next)
+        self.btn_find_next.clicked.connect(self.find_next)
+        self.btn_find_prev.clicked.connect(self.find_prev)
+        self.btn_goto.clicked.connect(self.goto_step)
+        self.step_spin.editingFinished.connect(self.goto_step)
+
+    def set_steps(self, steps):
+        self.model.set_steps(steps)
+        count = len(self.model.steps())
+        if count:
+            self.step_spin.setRange(self.model.steps()[0]['step'], self.model.steps()[count - 1]['step'])
+            self.status_label.setText(f"{count} bước")
+        else:
+            self.step_spin.setRange(0, 0)
+            self.status_label.setText("")
+        self.setVisible(count > 0)
+
+    def clear(self):
+        self.set_steps([])
+
+    def select_row(self, row):
+        """Chọn và cuộn tới dòng row mà không gửi step_selected"""
+        if not 0 <= row < self.model.rowCount():
+            return
+        self._selecting = True
+        try:
+            self._show_row(row)
+        finally:
+            self._selecting = False
+
+    def _show_row(self, row):
+        index = self.model.index(row)
+        self.table_view.setCurrentIndex(index)
+        self.table_view.scrollTo(index, QAbstractItemView.PositionAtCenter)
+
+    def on_current_row_changed(self, current, previous):
+        if not self._selecting and current.isValid():
+            self.step_selected.emit(current.row())
+
+    def goto_step(self):
+        if not self.model.rowCount():
+            return
+        self._show_row(self.model.row_of_step(self.step_spin.value()))
+
+    def find_next(self):
+        self._find(backward=False)
+
+    def find_prev(self):
+        self._find(backward=True)
+
+    def _find(self, backward):
+        text = self.search_edit.text().strip()
+        if not text or not self.model.rowCount():
+            return
+        current = self.table_view.currentIndex().row()
+        if current < 0:
+            start = self.model.rowCount() - 1 if backward else 0
+        else:
+            start = current + (-1 if backward else 1)
+        # Tìm kiếm phải tạo chuỗi mô tả cho từng dòng nên có thể mất vài giây với nhật ký rất lớn
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            row = self.model.find(text, start, backward)
+        finally:
+            QApplication.restoreOverrideCursor()
+        if row < 0:
+            self.status_label.setText(f"Không tìm thấy \"{text}\" ({self.model.rowCount()} bước)")
+            return
+        self.status_label.setText(f"Bước {self.model.steps()[row]['step']} ({row + 1}/{self.model.rowCount()} dòng)")
+        self._show_row(row)
@@ -0,0 +1,222 @@
+from collections import deque
+
+# Các chế độ ghi vết
+TRACE_FULL = "full"          # Ghi toàn bộ các bước (mặc định, dùng cho chế độ từng bước)
+TRACE_OFF = "off"            # Không ghi gì, chỉ lấy kết quả và số nút
+TRACE_COUNTERS = "counters"  # Chỉ đếm số bước theo từng loại
+TRACE_RING = "ring"          # Giữ K bước cuối cùng
+TRACE_SAMPLE = "sample"      # Giữ 1 bước sau mỗi N bước
+
+# Các loại bước luôn được giữ lại ở chế độ lấy mẫu (số lượng ít, mang tính kết luận)
+ALWAYS_KEEP = {"info", "start", "success", "fail", "perm_fail"}
+
+
+class StepTrace:
+    """Nhật ký các bước của giải thuật, lưu gọn dưới dạng bản ghi (loại, đỉnh, độ sâu).
+
+    Mỗi bản ghi là bộ (số bước, loại, đỉnh, độ sâu, nút đường đi, chi tiết).
+    Đường đi không được sao chép mà lưu dạng danh sách liên kết dùng chung tiền tố
+    (đỉnh, nút cha), nên mỗi bước chỉ tốn O(1) bộ nhớ. Chuỗi mô tả chỉ được tạo
+    khi truy cập trace[i], do đó trace vẫn dùng được như danh sách các dict
+    {'step', 'path', 'action'} như trước.
+
+    Các loại bước:
+      info                - chi tiết là chuỗi mô tả có sẵn
+      start               - khởi tạo tại đỉnh, chi tiết là tên giải thuật (hoặc None)
+      try                 - từ đỉnh, thử các đỉnh trong chi tiết
+      forced              - từ đỉnh, bắt buộc đi tới đỉnh trong chi tiết
+      dead_end            - không có đỉnh kề khả dụng từ đỉnh
+      push / pop          - thêm / loại bỏ đỉnh khỏi đường đi
+      prune_dead_end      - loại đỉnh vì không còn đỉnh kề khả dụng
+      prune_no_return     - loại đỉnh vì không có cạnh quay về đỉnh đầu
+      prune_disconnected  - loại đỉnh vì các đỉnh chưa thăm không liên thông
+      prune_degree        - loại đỉnh vì đỉnh chưa thăm trong chi tiết còn ít hơn 2 đỉnh kề
+      prune_forced        - loại đỉnh vì mâu thuẫn cạnh bắt buộc tại đỉnh trong chi tiết
+      prune_cut           - loại đỉnh vì đỉnh trong chi tiết là đỉnh khớp của phần còn lại
+      complete            - đã thăm tất cả các đỉnh
+      success / no_close  - có / không có cạnh quay về đỉnh đầu
+      fail                - kết luận không tồn tại chu trình
+      perm_check, perm_missing, perm_no_close, perm_fail - các bước của Brute Force
+    """
+
+    def __init__(self, mode=TRACE_FULL, size=1000, every=100):
+        if mode not in (TRACE_FULL, TRACE_OFF, TRACE_COUNTERS, TRACE_RING, TRACE_SAMPLE):
+            raise ValueError(f"Chế độ ghi vết không hợp lệ: {mode}")
+        self.mode = mode
+        self.size = max(1, int(size))
+        self.every = max(1, int(every))
+        # active = False: giải thuật bỏ qua hoàn toàn việc ghi vết
+        self.active = mode != TRACE_OFF
+        self.count = 0
+        self.counts = {}
+        if mode == TRACE_RING:
+            self._records = deque(maxlen=self.size)
+        else:
+            self._records = []
+        self._store = mode in (TRACE_FULL, TRACE_RING, TRACE_SAMPLE)
+        self._links = []
+
+    @classmethod
+    def from_policy(cls, policy=None):
+        """Tạo StepTrace từ tham số trace của giải thuật.
+
+        policy có thể là None (ghi toàn bộ), một StepTrace, tên chế độ
+        ("full", "off", "counters"), hoặc bộ ("ring", K) / ("sample", N).
+        """
+        if policy is None:
+            return cls()
+        if isinstance(policy, cls):
+            return policy
+        if isinstance(policy, str):
+            return cls(policy)
+        mode, value = policy
+        if mode == TRACE_RING:
+            return cls(mode, size=value)
+        if mode == TRACE_SAMPLE:
+            return cls(mode, every=value)
+        return cls(mode)
+
+    def advance(self, vertex, depth):
+        """Đặt đỉnh ở độ sâu depth của đường đi hiện tại mà không ghi thành một bước"""
+        links = self._links
+        node = (vertex, links[depth - 1] if depth > 0 else None)
+        if depth < len(links):
+            links[depth] = node
+        else:
+            links.append(node)
+
+    def record(self, kind, vertex=None, depth=-1, detail=None):
+        """Ghi một bước. depth là độ sâu của đường đi hiện tại (-1: đường đi rỗng)"""
+        if kind == "push" or kind == "start":
+            self.advance(vertex, depth)
+        self.count += 1
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if not self._store:
+            return
+        if self.mode == TRACE_SAMPLE and (self.count - 1) % self.every and kind not in ALWAYS_KEEP:
+            return
+        link = self._links[depth] if depth >= 0 else None
+        self._records.append((self.count, kind, vertex, depth, link, detail))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __bool__(self):
+        return len(self._records) > 0
+
+    def __getitem__(self, index):
+        return render_step(self._records[index])
+
+    def __iter__(self):
+        for record in self._records:
+            yield render_step(record)
+
+    def path_at(self, index):
+        """Đường đi của bước thứ index mà không cần tạo chuỗi mô tả"""
+        return record_path(self._records[index])
+
+    def index_of_step(self, step):
+        """Vị trí của bản ghi có số bước step, hoặc bản ghi đầu tiên sau nó nếu bước đó
+        không được giữ (chế độ ring / sample); len(self) nếu không có bản ghi nào như vậy.
+
+        Số bước của các bản ghi tăng dần nên chỉ cần tìm kiếm nhị phân.
+        """
+        records = self._records
+        low, high = 0, len(records)
+        while low < high:
+            middle = (low + high) // 2
+            if records[middle][0] < step:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, text, start=0, backward=False):
+        """Vị trí bản ghi đầu tiên từ start (xoay vòng) có mô tả chứa text, không phân biệt hoa thường; -1 nếu không có.
+
+        Chuỗi mô tả được tạo lần lượt cho từng bản ghi và bỏ đi ngay, không lưu lại.
+        """
+        total = len(self._records)
+        if not total or not text:
+            return -1
+        text = text.casefold()
+        direction = -1 if backward else 1
+        records = self._records
+        for offset in range(total):
+            index = (start + direction * offset) % total
+            if text in render_step(records[index])['action'].casefold():
+                return index
+        return -1
+
+
+def link_to_path(link):
+    path = []
+    while link is not None:
+        path.append(link[0])
+        link = link[1]
+    path.reverse()
+    return path
+
+
+def record_path(record):
+    _, kind, _, _, link, _ = record
+    path = link_to_path(link)
+    if kind == "success":
+        path.append(path[0])
+    return path
+
+
+def render_step(record):
+    """Tạo dict {'step', 'path', 'action'} cho một bản ghi"""
+    step, kind, vertex, depth, link, detail = record
+    path = link_to_path(link)
+    walk = " → ".join(path)
+
+    if kind == "info":
+        action = detail
+    elif kind == "start":
+        label = f" ({detail})" if detail else ""
+        action = f"Khởi tạo{label}: Bắt đầu từ đỉnh {vertex}"
+    elif kind == "try":
+        action = f"Từ {vertex}, thử các đỉnh: {', '.join(detail)}"
+    elif kind == "forced":
+        action = f"Từ {vertex}, bắt buộc đi tới {detail} (đỉnh {detail} chỉ còn 2 đỉnh kề khả dụng)"
+    elif kind == "dead_end":
+        action = f"Không có đỉnh kề khả dụng từ {vertex}"
+    elif kind == "push":
+        action = f"Thêm đỉnh {vertex} vào đường đi: {walk}"
+    elif kind == "pop":
+        action = f"Quay lui: Loại bỏ {vertex}, quay về {walk if path else 'rỗng'}"
+    elif kind == "prune_dead_end":
+        action = f"Loại bỏ {vertex} vì: Không có đỉnh kề khả dụng từ {vertex}"
+    elif kind == "prune_no_return":
+        action = f"Loại bỏ {vertex} vì: Không có cạnh từ {vertex} về {path[0]}"
+    elif kind == "prune_disconnected":
+        action = f"Loại bỏ {vertex} vì: Các đỉnh chưa thăm không liên thông"
+    elif kind == "prune_degree":
+        action = f"Loại bỏ {vertex} vì: Đỉnh {detail} chỉ còn ít hơn 2 đỉnh kề khả dụng"
+    elif kind == "prune_forced":
+        action = f"Loại bỏ {vertex} vì: Mâu thuẫn cạnh bắt buộc tại đỉnh {detail} (chỉ còn 2 đỉnh kề khả dụng)"
+    elif kind == "prune_cut":
+        action = f"Loại bỏ {vertex} vì: Đỉnh {detail} là đỉnh khớp của phần đồ thị còn lại"
+    elif kind == "complete":
+        action = f"Đã thăm tất cả {len(path)} đỉnh: {walk}"
+    elif kind == "success":
+        path.append(path[0])
+        action = f"Thành công! Có cạnh từ {path[-2]} về {path[0]}\nChu trình Hamilton là: {' → '.join(path)}"
+    elif kind == "no_close":
+        action = f"Không có cạnh từ {path[-1]} về {path[0]} - Không tạo được chu trình"
+    elif kind == "fail":
+        action = f"Kết luận: Đã thử tất cả khả năng từ đỉnh {vertex} - Không tồn tại chu trình Hamilton"
+    elif kind == "perm_check":
+        action = f"Kiểm tra hoán vị: {walk}"
+    elif kind == "perm_missing":
+        action = f"Loại mọi hoán vị bắt đầu bằng {walk} → {vertex}: Không có cạnh từ {path[-1]} đến {vertex}"
+    elif kind == "perm_no_close":
+        action = f"Hoán vị không hợp lệ: Không có cạnh từ {path[-1]} về {path[0]}"
+    elif kind == "perm_fail":
+        action = f"Kết luận: Đã thử tất cả hoán vị từ đỉnh {vertex} - Không tồn tại chu trình Hamilton"
+    else:
+        action = kind
+
+    return {'step': step, 'path': path, 'action': action}